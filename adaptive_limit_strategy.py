@@ -1,10 +1,12 @@
 from strategy_base import StrategyBase
 import numpy as np
 import logging
-from datetime import datetime
 import os
 import math
 import pandas as pd
+from indicators import RollingVolatility
+from order_book_features import FEATURE_ASK_DEPTH, get_tick_features
+from session_schedule import SessionSchedule
 
 class AdaptiveLimitStrategy(StrategyBase):
     """
@@ -18,7 +20,11 @@ class AdaptiveLimitStrategy(StrategyBase):
         trade_size (int): 每次交易数量
     """
     
-    def __init__(self, engine, threshold=0.005, trade_size=100, min_trade_amount=10000, logger=None):
+    required_features = (FEATURE_ASK_DEPTH,)
+    state_fields = ('threshold', 'buy_point', 'sell_point', 'daily_stats', 'calculated_trade_size',
+                    'day_initialized', 'last_base_price', 'last_threshold')
+    
+    def __init__(self, engine, threshold=0.005, trade_size=100, min_trade_amount=10000, volatility_threshold=None, logger=None):
         """
         初始化浮动限价策略
         
@@ -26,6 +32,7 @@ class AdaptiveLimitStrategy(StrategyBase):
             engine: 交易引擎实例
             threshold (float): 浮动限价阈值（百分比），默认0.5%
             trade_size (int): 每次交易数量，默认100股
+            volatility_threshold (float): 5分钟收益率波动率上限，超过则中止买入，默认None不检查
             logger: 日志记录器，如果为None则使用默认logger
         """
         super().__init__(engine)
@@ -33,6 +40,10 @@ class AdaptiveLimitStrategy(StrategyBase):
         self.initial_threshold_everyday = threshold
         self.trade_size = trade_size
         self.min_trade_amount = min_trade_amount
+        self.volatility_threshold = volatility_threshold
+        self.price_volatility = RollingVolatility(window=100)  # 5分钟窗口（每3秒1个tick）
+        # 全天不限制超买，不启用尾盘平仓（如需启用，在rules中加入EARLY_LIMIT_RULES和TAIL_SESSION_RULES）
+        self.session_schedule = SessionSchedule(rules=(('00:00', '23:59', {'limit_extra_ratio': 1.0}),))
         
         # 使用传入的logger或创建新的logger
         self.logger = logger or logging.getLogger('LiveTrade')
@@ -44,9 +55,19 @@ class AdaptiveLimitStrategy(StrategyBase):
         }
         self.buy_point = None
         self.sell_point = None
+        self.day_initialized = False  # 当日是否已按首个可交易tick的价格完成初始化
 
         self.logger.info(f"股票代码: {self.engine.stock_code}, 浮动限价策略初始化，阈值={self.threshold}, 最小交易数量={self.trade_size}, 最小交易金额={self.min_trade_amount}")
                 
+    def on_day_open(self, trading_date):
+        """
+        新交易日开始，等待当日首个可交易tick按最新价初始化
+        
+        Args:
+            trading_date (str): 交易日，格式YYYYMMDD
+        """
+        self.day_initialized = False
+
     def on_bar(self, bar_data):
         """
         处理K线数据，执行交易逻辑
@@ -67,31 +88,25 @@ class AdaptiveLimitStrategy(StrategyBase):
             if current_price <= 0:
                 return
                         
-            # 当前时间处理
-            dt = datetime.fromtimestamp(tick_data['time'] / 1000)  # 除以1000转换为秒
-            current_time = dt.strftime('%Y-%m-%d %H:%M:%S')
-            current_date = dt.strftime('%Y%m%d')
-            
-            # 计算时间限制
-            hour = dt.hour
-            minute = dt.minute
+            self.price_volatility.update(current_price)
 
-            # 避开开盘和收盘前的波动时间
-            if hour < 9 or (hour == 9 and minute < 31) or (hour == 14 and minute > 55) or hour > 14: # 14:55后禁止交易，如果交易则禁用市价单【DeepSeek：70%的算法交易在收盘前30分钟停止新开市价单】
+            # 查询当前所处交易时段，避开开盘和收盘前的波动时间
+            slot = self.session_schedule.lookup(tick_data['time'])
+            if not slot.tradable:
                 return
             
+            # 当前时间处理（交易日由引擎切换，这里只格式化当日时间）
+            current_time = self.engine.format_tick_time(tick_data['time'])
+            current_date = self.engine.trading_date
+            
             #获取仓位信息
             current_volume = self.engine.get_volume(stock_code)
             current_can_use_volume = self.engine.get_can_use_volume(stock_code)
             target_position = self.engine.target_position
 
-            # 新交易日处理
-            if current_date != self.daily_stats['date'] and self.daily_stats['date'] is not None:
-                #回测模式，非首日的新的一天，更新可用持仓量为当前持仓量
-                if hasattr(self.engine, 'is_backtest') and self.engine.is_backtest:
-                    self.engine.update_account_info(stock_code=stock_code, volume=0, can_use_volume=current_volume - current_can_use_volume, open_price=current_price)
-
-            if current_date != self.daily_stats['date']:
+            # 新交易日首个可交易tick，按当日价格初始化
+            if not self.day_initialized:
+                self.day_initialized = True
                 #每笔交易不少于min_trade_amount元（基于当前价格初略计算）
                 min_trade_size1 = math.ceil(self.min_trade_amount / current_price / 100) * 100                
                                 
@@ -114,41 +129,19 @@ class AdaptiveLimitStrategy(StrategyBase):
                     f"初始仓位: {self.daily_stats['initial_position']}, "
                     f"初始成本: {self.daily_stats['initial_cost']:.2f}, "
                     f"目标仓位: {target_position}, "
-                    f"当前价格：{current_price:.3f}" if stock_code.startswith(('1', '5')) else f"当前价格：{current_price:.2f}"
+                    f"当前价格：{current_price:.{self.engine.get_instrument(stock_code).precision}f}"
                 )
 
                 self.threshold = self.initial_threshold_everyday
 
                 self.buy_point, self.sell_point = self.calculate_trade_points(stock_code, current_price, self.threshold)  # 更新基准价
+                self.state_changed()
 
-            position_limit = target_position+current_can_use_volume
-            position_keep = 0
-
-            '''#早盘超买限制
-            if hour == 9 and minute <= 60:
-                position_limit = target_position  + current_can_use_volume
-                position_keep = 0
-            elif hour == 10 and minute < 60:
-                position_limit = target_position  + math.ceil(current_can_use_volume/200) * 100
-                position_keep = 0
-            else:
-                position_limit = target_position
-                position_keep = 0
+            # 持仓上限、保留仓位和交易阈值由时段表决定
+            position_limit = self.session_schedule.position_limit(slot, target_position, current_can_use_volume)
+            position_keep = self.session_schedule.position_keep(slot, target_position)
+            self.threshold = self.initial_threshold_everyday * slot.threshold_scale
 
-            #尾盘平仓策略（缩小阈值加快交易频率）和控制卖出（即使有可卖数量，也不执行卖出）
-            if hour == 13 and minute >= 31:
-                self.threshold = self.initial_threshold_everyday * 3 / 4
-                position_keep = math.ceil(target_position*0.8 / 100) * 100
-            if hour == 14 and minute >= 1:
-                self.threshold = self.initial_threshold_everyday * 2 / 4
-                position_keep = target_position
-            if hour == 14 and minute >= 31:
-                self.threshold = self.initial_threshold_everyday * 1 / 4
-                position_keep = target_position
-            if hour == 14 and minute >= 46:
-                self.threshold = self.initial_threshold_everyday * 0.5 / 4
-                position_keep = target_position
-            '''
             # 执行交易逻辑
             self.execute_trades(stock_code, current_price, self.buy_point, self.sell_point, 
                               current_volume, current_can_use_volume, position_limit, position_keep, current_time, tick_data)
@@ -172,6 +165,7 @@ class AdaptiveLimitStrategy(StrategyBase):
         
         bidPrices = tick_data['bidPrice']
         askPrices = tick_data['askPrice']
+        p = self.engine.get_instrument(stock_code).precision  # 价格精度
 
         # 每个tick更新引擎的买一到买五和卖一到卖五价，用于下单和订单重试确定价格
         self.engine.bidPrices = bidPrices
@@ -219,7 +213,7 @@ class AdaptiveLimitStrategy(StrategyBase):
                 if bidPrices[0] < current_price*0.90:
                     self.logger.warning(
                         f"股票代码: {stock_code}, "
-                        f"卖出委托风险控制: 最新价={current_price:.2f}," if stock_code.startswith(('1', '5')) else f"卖出委托风险控制: 最新价={current_price:.3f},"
+                        f"卖出委托风险控制: 最新价={current_price:.{p}f},"
                         f"卖出数量={sell_volume}, 买1价={bidPrices[0]:.2f}<=最新价*0.90, 中止市价卖出"
                     )
                     return
@@ -231,6 +225,7 @@ class AdaptiveLimitStrategy(StrategyBase):
                 #    f"卖出委托成功: 当前价格={current_price:.2f}, 卖点={sell_point:.2f}, 买一价={bidPrices[0]:.2f}，卖出数量={sell_volume}"
                 #)
                 self.buy_point, self.sell_point = self.calculate_trade_points(stock_code, current_price, self.threshold)
+                self.state_changed()
 
         # 检查买入条件
         elif current_price <= buy_point:
@@ -271,34 +266,35 @@ class AdaptiveLimitStrategy(StrategyBase):
             # 策略风险控制
             if tick_data is not None: #针对on_tick模式，进行风险控制
                 # 卖一价格异常监控
-                askVolumes = tick_data['askVol']
+                features = get_tick_features(tick_data, self.required_features)
                 
                 if askPrices[0] < current_price:
                     self.logger.warning(
                         f"股票代码: {stock_code}, "
                         f"买入委托风险控制: 买入数量={buy_volume}, 卖1价={askPrices[0]:.3f}<"
-                        f"当前价={current_price:.3f}, " if stock_code.startswith(('1', '5')) else f"当前价={current_price:.2f}, "
+                        f"当前价={current_price:.{p}f}, "
                         f"中止市价买入"
                     )
                     return
                 # 流动性多维评估
-                depth_liquidity = sum(askVolumes)*100
+                depth_liquidity = features[FEATURE_ASK_DEPTH]*100
                 if depth_liquidity < buy_volume * 2:
                     self.logger.warning(
                         f"股票代码: {stock_code}, "
-                        f"买入委托风险控制: 最新价={current_price:.3f}," if stock_code.startswith(('1', '5')) else f"买入委托风险控制: 最新价={current_price:.2f},"
+                        f"买入委托风险控制: 最新价={current_price:.{p}f},"
                         f"五档卖盘总量={depth_liquidity} < 买入数量={buy_volume} * 2, 中止市价买入"
                     )
                     return
-                '''# 波动率自适应检查
-                volatility = calculate_5min_volatility(stock_code)
-                if volatility > self.volatility_threshold:
-                    self.logger.warning(
-                        f"股票代码: {stock_code}, "
-                        f"买入委托风险控制: 当前价格={current_price:.2f}, 数量={buy_volume}, 波动率{volatility}超过阈值, 中止市价买入"
-                    )
-                    return
-                # 涨跌幅动态限制
+                # 波动率自适应检查（未设置阈值时不检查）
+                if self.volatility_threshold is not None:
+                    volatility = self.price_volatility.value
+                    if volatility > self.volatility_threshold:
+                        self.logger.warning(
+                            f"股票代码: {stock_code}, "
+                            f"买入委托风险控制: 当前价格={current_price:.2f}, 数量={buy_volume}, 波动率{volatility:.5f}超过阈值{self.volatility_threshold}, 中止市价买入"
+                        )
+                        return
+                '''# 涨跌幅动态限制
                 # 计算有效涨跌幅限制
                 effective_upper = tick_data['upperLimit'] * 0.99  # 留1%缓冲  
                 if tick_data['askPrice'][0] >= effective_upper:
@@ -311,10 +307,11 @@ class AdaptiveLimitStrategy(StrategyBase):
             if success:
                 self.logger.info(
                     f"股票代码: {stock_code}, "
-                    f"买入委托成功: 当前价格={current_price:.2f}," if stock_code.startswith(('1', '5')) else f"买入委托成功: 最新价={current_price:.3f},"
+                    f"买入委托成功: 最新价={current_price:.{p}f},"
                     f"买点={buy_point:.2f}, 卖一价={askPrices[0]:.2f}，买入数量={buy_volume}"
                 )                
                 self.buy_point, self.sell_point = self.calculate_trade_points(stock_code, current_price, self.threshold)
+                self.state_changed()
             
     def get_account_status(self):
         """
@@ -343,31 +340,24 @@ class AdaptiveLimitStrategy(StrategyBase):
             self.logger.error(f"股票代码: {stock_code}, 基准价异常={base_price}！")
             return 10000, 0
         
-        if stock_code.startswith('1') or stock_code.startswith('5'):
-            buy_point = round(base_price * (1 - threshold), 3)
-            sell_point = round(base_price * (1 + threshold), 3)
-            if buy_point == base_price:
-                buy_point -= 0.001
-            if sell_point == base_price:
-                sell_point += 0.001
-        else:
-            buy_point = round(base_price * (1 - threshold), 2)
-            sell_point = round(base_price * (1 + threshold), 2)
-            if buy_point == base_price:
-                buy_point -= 0.01
-            if sell_point == base_price:
-                sell_point += 0.01
+        instrument = self.engine.get_instrument(stock_code)
+        buy_point = round(base_price * (1 - threshold), instrument.precision)
+        sell_point = round(base_price * (1 + threshold), instrument.precision)
+        if buy_point == base_price:
+            buy_point -= instrument.tick_size
+        if sell_point == base_price:
+            sell_point += instrument.tick_size
 
         # 避免重复写logger（如果base_price和threshold都与上一次相同，则不写logger）
         if hasattr(self, 'last_threshold') and hasattr(self, 'last_base_price'):
             if self.last_base_price != base_price or self.last_threshold != threshold:
-                base_price_text = f"基准价={base_price:.3f}，" if stock_code.startswith(('1', '5')) else f"基准价={base_price:.2f}，"
+                base_price_text = f"基准价={base_price:.{instrument.precision}f}，"
                 self.logger.info(f"股票代码: {stock_code}, 计算买卖点价格，"
                                  f"{base_price_text}"
                                  f"买入点={buy_point}，卖出点={sell_point}"
                                  )
         else:
-            base_price_text = f"基准价={base_price:.3f}，" if stock_code.startswith(('1', '5')) else f"基准价={base_price:.2f}，"
+            base_price_text = f"基准价={base_price:.{instrument.precision}f}，"
             self.logger.info(f"股票代码: {stock_code}, 计算买卖点价格，"
                              f"{base_price_text}"
                              f"买入点={buy_point}，卖出点={sell_point}")
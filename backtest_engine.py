@@ -4,9 +4,12 @@ from datetime import datetime
 from xtquant import xtdata
 import time
 import logging
-import os
 import numpy as np
 from drawdown_calculator import DrawdownCalculator
+from order_book_features import compute_feature_columns
+from session_schedule import DAY_MS, BEIJING_OFFSET_MS
+from tick_archive import load_ticks
+from instrument_registry import to_qmt_code
 
 def symbol2stock(symbol):
     """
@@ -16,21 +19,7 @@ def symbol2stock(symbol):
     Returns:
         str: QMT格式的股票代码（例如：000001.SZ、600001.SH等）
     """
-    symbol = symbol.strip()
-    
-    if '.SZ' in symbol or '.SH' in symbol or '.BJ' in symbol:
-        return symbol
-        
-    symbol = symbol.zfill(6)
-    
-    if symbol.startswith(('0', '1', '3')):
-        return f"{symbol}.SZ"  # 深交所
-    elif symbol.startswith(('5', '6')):
-        return f"{symbol}.SH"  # 上交所
-    elif symbol.startswith(('4', '8')):
-        return f"{symbol}.BJ"  # 北交所
-    else:
-        raise ValueError(f"无效的股票代码: {symbol}")
+    return to_qmt_code(symbol)
     
 class BacktestEngine(TradeEngine):
     """
@@ -68,10 +57,9 @@ class BacktestEngine(TradeEngine):
         # 设置初始账户信息
         self.setup_account_info(stock_code, base_position, can_use_position, target_position, avg_cost, initial_capital)
 
-        if self.stock_code.startswith('1') or self.stock_code.startswith('5'):
-            self.slippage = 0.001
-        else:
-            self.slippage = 0.01
+        # 证券元数据（最小报价单位、T+0、费用类型），滑点取一个最小报价单位
+        self.instrument = self.get_instrument(stock_code)
+        self.slippage = self.instrument.tick_size
         
         # 交易费用设置
         self.commission_rate = 0.0001  # 佣金费率，双向收取，万分之1
@@ -93,22 +81,8 @@ class BacktestEngine(TradeEngine):
         self.start_date = None  # 新增
         self.end_date = None    # 新增
 
-        data_dir = os.path.join(os.path.dirname(__file__), 'data')
-        # 检查是否存在all_a_stocks.csv文件
-        csv_file = os.path.join(data_dir, 'all_a_stocks.csv')
-        if os.path.exists(csv_file):
-            try:
-                self.all_a_stocks = pd.read_csv(csv_file, dtype={'证券代码': str})
-                self.logger.info(f"已从{csv_file}文件读取全A股股票和基金名称信息")
-            except Exception as e:
-                self.logger.error(f"读取{csv_file}文件时出错: {e}")
-
     def get_stock_name(self, stock_code):
-        # 查找匹配的股票代码
-        result = self.all_a_stocks[self.all_a_stocks['证券代码'] == stock_code[:6]]
-        if not result.empty:
-            return result['证券简称'].values[0]
-        return "未知名称"
+        return self.get_instrument(stock_code).name or "未知名称"
 
     def load_data(self, stock_code, start_date, end_date, period="tick"):
         """带缓存的数据加载方法"""
@@ -136,6 +110,18 @@ class BacktestEngine(TradeEngine):
         self.logger.info(f"加载股票数据: {stock}, 时间范围: {startdate} - {enddate}, 周期: {period}")
         print("startdate:", startdate, "enddate:", enddate)
         
+        # 实盘记录的tick存档覆盖全部交易日时直接使用，不再下载
+        if period == "tick":
+            local_data = load_ticks(stock, start_date, end_date)
+            if local_data is not None:
+                self.logger.info(f"从本地tick存档加载股票{stock}的数据，共{len(local_data)}条记录")
+                self.current_idx = 0
+                self.current_datetime = None
+                processed_data = self._process_data(local_data)
+                self._data_cache[cache_key] = processed_data
+                self.data = processed_data[processed_data['lastPrice'] > 0]
+                return True
+        
         # 获取历史行情数据
         code_list = [stock]  # 定义要下载和订阅的股票代码列表
         count = -1  # 设置count参数，使gmd_ex返回全部数据
@@ -203,13 +189,21 @@ class BacktestEngine(TradeEngine):
         
         self.logger.info(f"开始回测 - 股票代码：{self.stock_code}, 初始资金: {self.initial_cash}, 初始持仓市值: {self.initial_market_value}")
         
+        # 预先计算策略需要的盘口特征列和每个交易日的起始行
+        self.prepare_features()
+        day_starts = self.prepare_day_index()
+        self.trading_date = None
+        self.day_index = None
+        
         self.portfolio_values = []  # 重置净值记录
-        for idx, row in self.data.iterrows():
+        for pos, (idx, row) in enumerate(self.data.iterrows()):
             self.current_idx = idx
             self.current_datetime = row.get('time', 0)
             
             # 根据数据周期调用相应的策略方法
             if self.period == "tick":
+                if pos in day_starts:
+                    self.switch_trading_day(day_starts[pos], row['lastPrice'])
                 self.strategy.on_tick(row)
             else:
                 self.strategy.on_bar(row)
@@ -217,6 +211,8 @@ class BacktestEngine(TradeEngine):
             current_value = self.get_portfolio_value()
             
             self.portfolio_values.append(current_value)
+        if self.trading_date is not None:
+            self.strategy.on_day_close(self.trading_date)
         # 回测的最后，取最后一条数据的最新价作为收盘价，以便统一市值的计算口径，便于比较不同阈值的回测结果。
         last_price = self.data.loc[self.data.index[-1], 'lastPrice']
         print("====================================================================")
@@ -231,6 +227,71 @@ class BacktestEngine(TradeEngine):
         print("self.positions:", self.positions)
         return True
 
+    def prepare_features(self):
+        """
+        按策略声明的required_features，为整段逐笔数据一次性计算盘口特征列
+        
+        已存在的特征列不会重复计算（参数优化时多个引擎共享同一份数据副本）。
+        Returns:
+            list: 本次新计算的特征列名
+        """
+        if self.period != "tick" or self.data is None or len(self.data) == 0:
+            return []
+        required = getattr(self.strategy, 'required_features', ())
+        missing = [name for name in required if name not in self.data.columns]
+        if not missing:
+            return []
+        start = time.perf_counter()
+        columns = compute_feature_columns(self.data, missing)
+        self.data = self.data.assign(**columns)
+        self.logger.info(f"预计算盘口特征 {missing}，共{len(self.data)}条记录，耗时{time.perf_counter() - start:.3f}秒")
+        return missing
+
+    def prepare_day_index(self):
+        """
+        根据逐笔数据的时间戳预先找出每个交易日的起始行
+        
+        Returns:
+            dict: 起始行位置到日序号的映射
+        """
+        if self.period != "tick" or self.data is None or len(self.data) == 0:
+            return {}
+        days = (self.data['time'].to_numpy(dtype=np.int64) + BEIJING_OFFSET_MS) // DAY_MS
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(days)) + 1))
+        return dict(zip(starts.tolist(), days[starts].tolist()))
+
+    def switch_trading_day(self, new_day_index, open_price):
+        """
+        切换交易日：通知策略前一交易日结束，完成T+1结算，再通知策略新交易日开始
+        
+        回测首日不做结算，保留设置的初始可用持仓。
+        Args:
+            new_day_index (int): 新交易日的日序号
+            open_price (float): 新交易日第一条行情的最新价，用于持仓市值计价
+        """
+        if self.trading_date is not None:
+            self.strategy.on_day_close(self.trading_date)
+            self.settle_positions(open_price)
+        self.begin_trading_day(new_day_index)
+        self.strategy.on_day_open(self.trading_date)
+
+    def settle_positions(self, price):
+        """
+        T+1结算：前一交易日买入的持仓在新交易日全部变为可用，并按最新价重新计价
+        
+        Args:
+            price (float): 最新价
+        """
+        stock_code = self.stock_code
+        volume = self.get_volume(stock_code)
+        can_use_volume = self.get_can_use_volume(stock_code)
+        self.update_account_info(
+            stock_code=stock_code,
+            volume=0,
+            can_use_volume=volume - can_use_volume,
+            open_price=price if price > 0 else self.get_open_price(stock_code)
+        )
+
     def set_strategy(self, strategy):
         """
         设置回测策略
@@ -347,13 +408,7 @@ class BacktestEngine(TradeEngine):
             commission,stamp_duty,total_fee  = self.calculate_total_cost('buy',stock_code, amount)
 
             # 判断是否为T+0 ETF
-            is_t0_etf = False
-            if stock_code.startswith(('159', '511', '518', '513')):  # ETF代码前缀
-                # 检查是否为T+0 ETF
-                t0_keywords = ['港股', '恒生', '债券', '货币', '黄金', '原油', 'QDII', '现金', '短债', '超短债', '国债', '信用债', '可转债']
-                stock_name = self.get_stock_name(stock_code)
-                if any(keyword in stock_name for keyword in t0_keywords):
-                    is_t0_etf = True
+            is_t0_etf = self.get_instrument(stock_code).is_t0
             # 记录交易
             trade = {
                 'time': datetime,
@@ -487,13 +542,14 @@ class BacktestEngine(TradeEngine):
         Returns:
             float: 佣金金额
         """
+        instrument = self.get_instrument(stock_code)
         commission = amount * self.commission_rate
 
-        if not stock_code.startswith(('1', '5')):
+        if instrument.min_commission:
             commission = max(commission, self.min_commission)
         transfer_fee = amount * self.transfer_fee_rate
 
-        if direction == 'sell' and not stock_code.startswith(('1', '5')):
+        if direction == 'sell' and instrument.stamp_duty:
             stamp_duty = amount * self.stamp_duty_rate
         else:
             stamp_duty = 0
@@ -1,5 +1,7 @@
 import warnings
 import sys
+from startup_profile import get_profiler
+get_profiler().install_import_hook()  # 带--profile-startup启动时统计各模块的导入耗时
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QMessageBox, 
                             QTableWidgetItem, QHeaderView, QComboBox, QTableWidget, QWidget, QVBoxLayout, QFormLayout, QLineEdit, QPushButton)
 from PyQt5 import QtWidgets, QtGui
@@ -12,13 +14,13 @@ import time
 from backtest_engine import BacktestEngine
 from adaptive_limit_strategy import AdaptiveLimitStrategy
 from order_book_strategy import OrderBookStrategy
+from instrument_registry import get_registry
 # 导入其他策略类（后续添加）
 from PyQt5.QtGui import QColor
 import numpy as np
 import logging
 import os
 from PyQt5.QtWidgets import QAction
-from param_optimizer import GridSearchOptimizer
 from PyQt5.QtCore import Qt
 
 # 在程序开始时忽略特定警告
@@ -422,10 +424,8 @@ class BacktestWindow(QMainWindow, Ui_MainWindow):
             self.ui.tableWidget.setItem(current_row, 1, QTableWidgetItem(str(trade['stock_code'])))
             direct = '买入' if trade['direction'] == 'buy' else '卖出'
             self.ui.tableWidget.setItem(current_row, 2, QTableWidgetItem(direct))
-            if trade['stock_code'].startswith('1') or trade['stock_code'].startswith('5'):
-                self.ui.tableWidget.setItem(current_row, 3, QTableWidgetItem(f"{float(trade['price']):.3f}"))
-            else:
-                self.ui.tableWidget.setItem(current_row, 3, QTableWidgetItem(f"{float(trade['price']):.2f}"))
+            precision = get_registry().get(trade['stock_code']).precision
+            self.ui.tableWidget.setItem(current_row, 3, QTableWidgetItem(f"{float(trade['price']):.{precision}f}"))
             self.ui.tableWidget.setItem(current_row, 4, QTableWidgetItem(str(trade['volume'])))
             
             # 计算并显示总费用
@@ -584,6 +584,7 @@ class BacktestWindow(QMainWindow, Ui_MainWindow):
         data = self.load_data()  # 复用原有数据加载方法
         
         # 执行优化
+        from param_optimizer import GridSearchOptimizer  # 依赖tqdm，用到时再导入
         optimizer = GridSearchOptimizer(param_grid)
         best_params, results_df = optimizer.optimize(
             data, 
@@ -663,9 +664,16 @@ class BacktestThread(QThread):
         #    self.finished.emit()
 
 def main():
-    app = QApplication(sys.argv)
-    window = BacktestWindow()
+    profiler = get_profiler()
+    profiler.mark('导入模块完成')
+    with profiler.phase('创建QApplication'):
+        app = QApplication(sys.argv)
+    with profiler.phase('创建主窗口'):
+        window = BacktestWindow()
     window.show()
+    app.processEvents()
+    profiler.mark('首次绘制')
+    profiler.report(window.logger)
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
@@ -0,0 +1,207 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import pandas as pd
+
+BOARD_INDUSTRY = 'industry'
+BOARD_CONCEPT = 'concept'
+CODE_COLUMN = '代码'
+BOARD_NAMES = {BOARD_INDUSTRY: '行业', BOARD_CONCEPT: '概念'}
+
+
+def _fetch_industry_cons(sector):
+    import akshare as ak  # 导入很慢，只在需要联网获取时导入
+    return ak.stock_board_industry_cons_em(symbol=sector)
+
+
+def _fetch_concept_cons(sector):
+    import akshare as ak
+    return ak.stock_board_concept_cons_em(symbol=sector)
+
+
+# 板块类型 -> 获取成分股的函数
+DEFAULT_FETCHERS = {
+    BOARD_INDUSTRY: _fetch_industry_cons,
+    BOARD_CONCEPT: _fetch_concept_cons,
+}
+
+
+class _BoardEntry:
+    """一个板块最近一次获取成功的成分股"""
+
+    __slots__ = ('frame', 'codes', 'fetched_at', 'version')
+
+    def __init__(self, frame, codes, fetched_at):
+        self.frame = frame
+        self.codes = codes          # 成分股代码集合，用于判断成分是否变化
+        self.fetched_at = fetched_at
+        self.version = 1            # 成分股每变化一次加1
+
+
+class BoardConstituentCache:
+    """
+    板块成分股缓存
+
+    按(板块类型, 板块名称)缓存最近一次获取成功的成分股，get()立即返回缓存（过期时同时在后台刷新），
+    只有从未获取过的板块才同步获取。刷新由固定大小的线程池并发执行，同一板块正在获取时不重复提交；
+    获取失败或结果为空时保留原来的缓存。成分股代码集合变化时版本号加1并记录增减的股票，
+    使用方可以按版本号判断是否需要重新计算。每轮refresh()记录耗时统计。
+
+    Attributes:
+        ttl (float): 缓存有效期（秒）
+        max_workers (int): 并发获取的线程数
+        last_stats (dict): 最近一轮刷新的统计
+    """
+
+    def __init__(self, ttl=60, max_workers=4, fetchers=None, logger=None):
+        """
+        初始化板块成分股缓存
+
+        Args:
+            ttl (float): 缓存有效期（秒）
+            max_workers (int): 并发获取的线程数
+            fetchers (dict): 板块类型 -> 获取成分股的函数，None表示行业和概念板块
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.fetchers = fetchers or DEFAULT_FETCHERS
+        self.logger = logger or logging.getLogger('mytrade')
+        self._entries = {}
+        self._inflight = {}     # (板块类型, 板块名称) -> Future
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='BoardCache')
+        self.last_stats = {}
+
+    def _fetch(self, key):
+        """获取一个板块的成分股并更新缓存，返回(是否成功, 成分是否变化, 耗时秒数)"""
+        kind, sector = key
+        name = BOARD_NAMES.get(kind, kind)
+        started = time.perf_counter()
+        try:
+            frame = self.fetchers[kind](sector)
+        except Exception as e:
+            self.logger.error(f"获取{name}板块 {sector} 的股票列表时出错，错误信息：{str(e)}")
+            return False, False, time.perf_counter() - started
+        elapsed = time.perf_counter() - started
+        if frame is None or frame.empty:
+            self.logger.warning(f"获取到的{name}板块 {sector} 股票列表为空，保留上次的结果")
+            return False, False, elapsed
+
+        codes = frozenset(frame[CODE_COLUMN].astype(str)) if CODE_COLUMN in frame.columns else frozenset()
+        changed = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = _BoardEntry(frame, codes, time.time())
+            else:
+                if codes != entry.codes:
+                    added = sorted(codes - entry.codes)
+                    removed = sorted(entry.codes - codes)
+                    entry.version += 1
+                    changed = True
+                    self.logger.info(f"{name}板块 {sector} 成分股变化，新增{added}，移除{removed}")
+                entry.frame = frame
+                entry.codes = codes
+                entry.fetched_at = time.time()
+        return True, changed, elapsed
+
+    def _submit(self, key):
+        """提交一个板块的获取任务，已在获取中时返回原来的任务"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None and not future.done():
+                return future
+            future = self._executor.submit(self._fetch, key)
+            self._inflight[key] = future
+            return future
+
+    def _is_stale(self, key, now):
+        entry = self._entries.get(key)
+        return entry is None or now - entry.fetched_at >= self.ttl
+
+    def get(self, kind, sector):
+        """
+        获取板块成分股
+
+        Args:
+            kind (str): 板块类型（BOARD_INDUSTRY或BOARD_CONCEPT）
+            sector (str): 板块名称
+        Returns:
+            pd.DataFrame: 最近一次获取成功的成分股，从未成功获取时为空DataFrame
+        """
+        key = (kind, sector)
+        entry = self._entries.get(key)
+        if entry is None:
+            # 从未获取过，只能同步等待
+            self._submit(key).result()
+            entry = self._entries.get(key)
+            return pd.DataFrame() if entry is None else entry.frame
+        if self._is_stale(key, time.time()):
+            self._submit(key)
+        return entry.frame
+
+    def version(self, kind, sector):
+        """
+        板块成分股的版本号，成分股变化时加1
+
+        Args:
+            kind (str): 板块类型
+            sector (str): 板块名称
+        Returns:
+            int: 版本号，从未获取成功时为0
+        """
+        entry = self._entries.get((kind, sector))
+        return 0 if entry is None else entry.version
+
+    def refresh(self, boards, force=False):
+        """
+        并发刷新一批板块并等待完成
+
+        Args:
+            boards (list): [(板块类型, 板块名称), ...]
+            force (bool): 是否忽略有效期全部刷新
+        Returns:
+            dict: 本轮统计（板块数、获取数、成功数、变化数、失败数、总耗时、单个板块最长耗时）
+        """
+        started = time.perf_counter()
+        now = time.time()
+        keys = [key for key in dict.fromkeys(boards) if force or self._is_stale(key, now)]
+        futures = [self._submit(key) for key in keys]
+        wait(futures)
+        results = [future.result() for future in futures]
+        stats = {
+            'boards': len(boards),
+            'fetched': len(keys),
+            'updated': sum(1 for ok, _, _ in results if ok),
+            'changed': sum(1 for _, changed, _ in results if changed),
+            'failed': sum(1 for ok, _, _ in results if not ok),
+            'elapsed': time.perf_counter() - started,
+            'max_fetch': max((elapsed for _, _, elapsed in results), default=0.0),
+        }
+        self.last_stats = stats
+        if keys:
+            self.logger.info(
+                f"板块成分股刷新：{stats['fetched']}/{stats['boards']}个板块，成功{stats['updated']}个，"
+                f"成分变化{stats['changed']}个，失败{stats['failed']}个，耗时{stats['elapsed']:.2f}秒"
+                f"（最慢{stats['max_fetch']:.2f}秒）"
+            )
+        return stats
+
+    def refresh_async(self, boards, force=False):
+        """
+        在后台刷新一批板块，不等待完成
+
+        Args:
+            boards (list): [(板块类型, 板块名称), ...]
+            force (bool): 是否忽略有效期全部刷新
+        """
+        now = time.time()
+        for key in dict.fromkeys(boards):
+            if force or self._is_stale(key, now):
+                self._submit(key)
+
+    def shutdown(self):
+        """停止线程池（不等待正在进行的获取）"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,204 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+
+
+class EventDispatcher:
+    """
+    回调事件分发器
+
+    用一个常驻线程按到达顺序处理柜台推送的委托、成交等事件，替代每个事件新建一个线程。
+    队列有上限，队列满时回调线程最多等待put_timeout秒（反压），仍放不进去才丢弃并计数；
+    分发线程自己提交事件（处理函数中再提交）时不等待，队列满立即丢弃，避免自己等自己。
+    同一个key的合并事件（如持仓刷新）只执行最后成功入队的那一个，排在它前面的同key事件直接跳过，
+    保证刷新发生在最后一个触发它的事件之后。
+
+    Attributes:
+        name (str): 分发线程名称
+        maxsize (int): 队列容量
+        report_interval (float): 统计日志的输出间隔（秒）
+    """
+
+    _STOP = object()
+
+    def __init__(self, name='EventDispatcher', maxsize=1000, put_timeout=1.0, report_interval=60, logger=None):
+        """
+        初始化分发器
+
+        Args:
+            name (str): 分发线程名称
+            maxsize (int): 队列容量
+            put_timeout (float): 队列满时提交方的最长等待时间（秒）
+            report_interval (float): 统计日志的输出间隔（秒），0表示不输出
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.put_timeout = put_timeout
+        self.report_interval = report_interval
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._pending = {}  # 合并键 -> 最后一次成功入队的序号
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        """清空统计信息"""
+        self.processed = 0          # 已处理事件数
+        self.dropped = 0            # 队列满被丢弃的事件数
+        self.coalesced = 0          # 被合并掉的事件数
+        self.errors = 0             # 处理出错的事件数
+        self.max_depth = 0          # 最大队列深度
+        self.total_wait = 0.0       # 排队总耗时（秒）
+        self.max_wait = 0.0         # 最长排队耗时（秒）
+        self.total_handle = 0.0     # 处理总耗时（秒）
+        self.max_handle = 0.0       # 最长处理耗时（秒）
+        self._last_report = time.monotonic()
+
+    def start(self):
+        """启动分发线程（重复调用无副作用）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        处理完已入队的事件后停止分发线程
+
+        Args:
+            timeout (float): 等待线程结束的最长时间（秒）
+        """
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, handler, *args):
+        """
+        提交一个事件，按提交顺序执行handler(*args)
+
+        Args:
+            handler: 事件处理函数
+            args: 处理函数参数
+        Returns:
+            bool: 是否成功入队
+        """
+        return self._put((None, handler, args, time.monotonic()))
+
+    def submit_coalesced(self, key, handler, *args):
+        """
+        提交一个可合并的事件：队列中同一个key的更早事件会被跳过，只执行最后一次提交
+
+        Args:
+            key: 合并键
+            handler: 事件处理函数
+            args: 处理函数参数
+        Returns:
+            bool: 是否成功入队
+        """
+        seq = next(self._sequence)
+        # 入队成功后才登记序号：入队失败时队列中更早的同key事件照常执行；
+        # 入队后、登记前分发线程就取出本事件时，它看到的序号更小，照常执行本事件
+        if not self._put(((key, seq), handler, args, time.monotonic())):
+            return False
+        with self._lock:
+            if self._pending.get(key, 0) < seq:
+                self._pending[key] = seq
+        return True
+
+    def _put(self, item):
+        """入队，队列满时等待put_timeout秒（分发线程自己提交时不等待），仍失败则丢弃"""
+        try:
+            if threading.current_thread() is self._thread:
+                self._queue.put_nowait(item)
+            else:
+                self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            self.dropped += 1
+            self.logger.error(f"{self.name}队列已满（{self.maxsize}），丢弃事件: {getattr(item[1], '__name__', item[1])}")
+            return False
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+    @property
+    def depth(self):
+        """当前队列深度"""
+        return self._queue.qsize()
+
+    def stats(self):
+        """
+        获取统计信息
+
+        Returns:
+            dict: 队列深度、处理数量和排队/处理耗时（毫秒）
+        """
+        processed = self.processed or 1
+        return {
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'avg_wait_ms': self.total_wait / processed * 1000,
+            'max_wait_ms': self.max_wait * 1000,
+            'avg_handle_ms': self.total_handle / processed * 1000,
+            'max_handle_ms': self.max_handle * 1000,
+        }
+
+    def log_stats(self):
+        """输出统计日志"""
+        s = self.stats()
+        self.logger.info(
+            f"{self.name}统计: 队列深度={s['depth']}(最大{s['max_depth']}), 已处理={s['processed']}, "
+            f"合并={s['coalesced']}, 丢弃={s['dropped']}, 出错={s['errors']}, "
+            f"排队耗时均值={s['avg_wait_ms']:.1f}ms(最大{s['max_wait_ms']:.1f}ms), "
+            f"处理耗时均值={s['avg_handle_ms']:.1f}ms(最大{s['max_handle_ms']:.1f}ms)"
+        )
+
+    def _run(self):
+        """分发线程主循环"""
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            coalesce, handler, args, enqueued = item
+            if coalesce is not None:
+                # 后面还有已入队的同key事件时跳过本次，处理最后一个时移除合并键
+                key, seq = coalesce
+                with self._lock:
+                    latest = self._pending.get(key, 0)
+                    if latest > seq:
+                        self.coalesced += 1
+                        continue
+                    if latest == seq:
+                        del self._pending[key]
+            started = time.monotonic()
+            try:
+                handler(*args)
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"{self.name}处理事件{getattr(handler, '__name__', handler)}出错: {str(e)}")
+            finished = time.monotonic()
+
+            wait = started - enqueued
+            handle = finished - started
+            self.processed += 1
+            self.total_wait += wait
+            self.total_handle += handle
+            if wait > self.max_wait:
+                self.max_wait = wait
+            if handle > self.max_handle:
+                self.max_handle = handle
+
+            if self.report_interval and finished - self._last_report >= self.report_interval:
+                self._last_report = finished
+                self.log_stats()
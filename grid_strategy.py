@@ -5,6 +5,9 @@ from datetime import datetime
 import os
 import math
 import pandas as pd
+from indicators import RollingVolatility
+from order_book_features import FEATURE_ASK_DEPTH, get_tick_features
+from session_schedule import SessionSchedule, DEFAULT_SLOT, TAIL_SESSION_RULES, PHASE_TAIL_2, PHASE_TAIL_3, PHASE_TAIL_4
 
 class GridStrategy(StrategyBase):
     """
@@ -19,7 +22,10 @@ class GridStrategy(StrategyBase):
         base_price (float): 当前网格基准价格
     """
     
-    def __init__(self, engine, grid_step=0.004, grid_size=100, logger=None):
+    required_features = (FEATURE_ASK_DEPTH,)
+    state_fields = ('base_price', 'buy_point', 'sell_point', 'trade_size', 'daily_stats', 'day_initialized')
+    
+    def __init__(self, engine, grid_step=0.004, grid_size=100, volatility_threshold=None, logger=None):
         """
         初始化网格策略
         
@@ -27,12 +33,19 @@ class GridStrategy(StrategyBase):
             engine: 交易引擎实例
             grid_step (float): 网格间距（百分比），默认0.5%
             grid_size (int): 每次交易数量，默认100股
+            volatility_threshold (float): 5分钟收益率波动率上限，超过则中止买入，默认None不检查
             logger: 日志记录器，如果为None则使用默认logger
         """
         super().__init__(engine)
         self.threshold = grid_step
+        self.initial_threshold = grid_step
         self.trade_size = grid_size
         self.base_price = 0
+        self.volatility_threshold = volatility_threshold
+        self.price_volatility = RollingVolatility(window=100)  # 5分钟窗口（每3秒1个tick）
+        # 尾盘平仓策略：按时段缩小网格间距（只使用阈值倍数）
+        self.session_schedule = SessionSchedule(rules=TAIL_SESSION_RULES)
+        self.session_slot = DEFAULT_SLOT
         
         # 使用传入的logger或创建默认logger
         self.logger = logger or logging.getLogger('GridStrategy')
@@ -43,7 +56,17 @@ class GridStrategy(StrategyBase):
         }
         self.buy_point = None
         self.sell_point = None
+        self.day_initialized = False  # 当日是否已按首个可交易tick的价格完成初始化
                 
+    def on_day_open(self, trading_date):
+        """
+        新交易日开始，等待当日首个可交易tick按最新价初始化
+        
+        Args:
+            trading_date (str): 交易日，格式YYYYMMDD
+        """
+        self.day_initialized = False
+
     def on_bar(self, bar_data):
         """
         处理K线数据，执行交易逻辑
@@ -125,24 +148,24 @@ class GridStrategy(StrategyBase):
                 return
             
             
-            # 当前时间处理
-            dt = datetime.fromtimestamp(tick_data['time'] / 1000)  # 除以1000转换为秒
-            current_time = dt.strftime('%Y-%m-%d %H:%M:%S')
-            current_date = dt.strftime('%Y%m%d')
-            
-            # 计算时间限制
-            hour = dt.hour
-            minute = dt.minute
+            self.price_volatility.update(current_price)
 
-            # 避开开盘和收盘前的波动时间
-            if (hour == 9 and minute < 31) or (hour == 14 and minute > 55): # 14:55后禁止交易，如果交易则禁用市价单【DeepSeek：70%的算法交易在收盘前30分钟停止新开市价单】
+            # 查询当前所处交易时段，避开开盘和收盘前的波动时间
+            slot = self.session_schedule.lookup(tick_data['time'])
+            if not slot.tradable:
                 return
+            self.session_slot = slot
+            
+            # 当前时间处理（交易日由引擎切换，这里只格式化当日时间）
+            current_time = self.engine.format_tick_time(tick_data['time'])
+            current_date = self.engine.trading_date
             
             current_volume = self.engine.get_volume(stock_code)
             current_can_use_volume = self.engine.get_can_use_volume(stock_code)
 
-            # 新交易日处理
-            if current_date != self.daily_stats['date']:
+            # 新交易日首个可交易tick，按当日价格初始化
+            if not self.day_initialized:
+                self.day_initialized = True
                 
                 #每笔交易不少于5000元（基于当前价格初略计算）
                 min_trade_size1 = math.ceil(5000 / current_price) / 100 * 100
@@ -172,16 +195,10 @@ class GridStrategy(StrategyBase):
                 )
                 self.base_price = current_price
                 self.buy_point, self.sell_point = self.calculate_trade_points(stock_code, self.base_price, self.threshold)  # 更新基准价
+                self.state_changed()
 
-            #尾盘平仓策略            
-            if hour == 13 and minute >= 31:
-                self.threshold = 0.003
-            if hour == 14 and minute >= 1:
-                self.threshold = 0.002  
-            if hour == 14 and minute >= 31:
-                self.threshold = 0.001
-            if hour == 14 and minute >= 46:
-                self.threshold = 0.0005
+            #尾盘平仓策略（缩小网格间距）
+            self.threshold = self.initial_threshold * slot.threshold_scale
             buy_point, sell_point = self.calculate_trade_points(stock_code, self.base_price, self.threshold)  # 更新基准价
 
             # 执行交易逻辑
@@ -229,7 +246,7 @@ class GridStrategy(StrategyBase):
                 sell_volume = current_can_use_volume
 
             # 尾盘平仓策略
-            if self.threshold <= 0.002: #2点以后
+            if self.session_slot.phase in (PHASE_TAIL_2, PHASE_TAIL_3, PHASE_TAIL_4): #2点以后
                 if current_volume < position_limit:
                     condition_key = 'position_limit_sell'
                     if not hasattr(self, f'last_{condition_key}') or not getattr(self, f'last_{condition_key}'):
@@ -262,6 +279,7 @@ class GridStrategy(StrategyBase):
                 )
                 self.base_price = current_price
                 self.buy_point, self.sell_point = self.calculate_trade_points(stock_code, self.base_price, self.threshold)
+                self.state_changed()
 
         # 检查买入条件
         elif current_price <= buy_point:
@@ -303,7 +321,7 @@ class GridStrategy(StrategyBase):
             if tick_data is not None: #针对on_tick模式，进行风险控制
                 # 卖一价格异常监控
                 askPrices = tick_data['askPrice']
-                askVolumes = tick_data['askVol']
+                features = get_tick_features(tick_data, self.required_features)
                 
                 if askPrices[0] <= current_price:
                     self.logger.warning(
@@ -312,22 +330,23 @@ class GridStrategy(StrategyBase):
                     )
                     return
                 # 流动性多维评估
-                depth_liquidity = sum(askVolumes)                        
+                depth_liquidity = features[FEATURE_ASK_DEPTH]
                 if depth_liquidity < buy_volume * 2:
                     self.logger.warning(
                         f"股票代码: {stock_code}, "
                         f"买入委托风险控制: 当前价格={current_price:.2f}, 数量={buy_volume}, 五档卖盘总量={depth_liquidity} < 数量{self.trade_size} * 2, 中止市价买入"
                     )
                     return
-                '''# 波动率自适应检查
-                volatility = calculate_5min_volatility(stock_code)
-                if volatility > self.volatility_threshold:
-                    self.logger.warning(
-                        f"股票代码: {stock_code}, "
-                        f"买入委托风险控制: 当前价格={current_price:.2f}, 数量={buy_volume}, 波动率{volatility}超过阈值, 中止市价买入"
-                    )
-                    return
-                # 涨跌幅动态限制
+                # 波动率自适应检查（未设置阈值时不检查）
+                if self.volatility_threshold is not None:
+                    volatility = self.price_volatility.value
+                    if volatility > self.volatility_threshold:
+                        self.logger.warning(
+                            f"股票代码: {stock_code}, "
+                            f"买入委托风险控制: 当前价格={current_price:.2f}, 数量={buy_volume}, 波动率{volatility:.5f}超过阈值{self.volatility_threshold}, 中止市价买入"
+                        )
+                        return
+                '''# 涨跌幅动态限制
                 # 计算有效涨跌幅限制
                 effective_upper = tick_data['upperLimit'] * 0.99  # 留1%缓冲  
                 if tick_data['askPrice'][0] >= effective_upper:
@@ -344,6 +363,7 @@ class GridStrategy(StrategyBase):
                 )
                 self.base_price = current_price
                 self.buy_point, self.sell_point = self.calculate_trade_points(stock_code, self.base_price, self.threshold)
+                self.state_changed()
             
     def get_account_status(self):
         """
@@ -372,12 +392,13 @@ class GridStrategy(StrategyBase):
             self.logger.error(f"股票代码: {stock_code}, 基准价异常={base_price}！")
             return 10000, 0
         
-        buy_point = round(base_price * (1 - threshold), 2)
-        sell_point = round(base_price * (1 + threshold), 2)
+        instrument = self.engine.get_instrument(stock_code)
+        buy_point = round(base_price * (1 - threshold), instrument.precision)
+        sell_point = round(base_price * (1 + threshold), instrument.precision)
         if buy_point == base_price:
-            buy_point -= 0.01
+            buy_point -= instrument.tick_size
         if sell_point == base_price:
-            sell_point += 0.01
+            sell_point += instrument.tick_size
 
         # 避免重复写logger（如果base_price和threshold都与上一次相同，则不写logger）
         if hasattr(self, 'last_threshold'):
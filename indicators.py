@@ -0,0 +1,458 @@
+from collections import deque
+import math
+import numpy as np
+import pandas as pd
+
+
+class RollingIndicator:
+    """
+    滚动指标基类
+
+    所有指标共用同一套接口：
+        update(...)  逐tick增量更新（O(1)），返回最新指标值
+        value        当前指标值
+        reset()      清空状态
+        batch(...)   对整段数组一次性计算，返回与输入等长的numpy数组，
+                     结果与逐条调用update()的输出一致，用于回测预计算
+
+    Attributes:
+        window (int): 滚动窗口长度（样本数），None表示自开始累计
+    """
+
+    def __init__(self, window=None):
+        """
+        初始化指标
+
+        Args:
+            window (int): 滚动窗口长度，None表示不限窗口（累计计算）
+        """
+        if window is not None and window <= 0:
+            raise ValueError(f"无效的窗口长度: {window}")
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """清空指标状态"""
+        pass
+
+    def update(self, *args):
+        """
+        增量更新指标
+
+        Returns:
+            float: 最新指标值
+        """
+        raise NotImplementedError
+
+    @property
+    def value(self):
+        """当前指标值"""
+        raise NotImplementedError
+
+    def batch(self, *arrays):
+        """
+        批量计算指标（默认实现：逐条调用update）
+
+        Args:
+            arrays: 与update参数一一对应的数组
+        Returns:
+            np.ndarray: 每个位置的指标值
+        """
+        self.reset()
+        columns = [np.asarray(a, dtype=float) for a in arrays]
+        out = np.empty(len(columns[0]), dtype=float)
+        for i, args in enumerate(zip(*columns)):
+            out[i] = self.update(*args)
+        return out
+
+    def _window_counts(self, n):
+        """批量计算时每个位置的有效样本数"""
+        counts = np.arange(1, n + 1, dtype=float)
+        if self.window is not None:
+            np.minimum(counts, self.window, out=counts)
+        return counts
+
+    def _window_sums(self, values):
+        """批量计算时每个位置的窗口内求和（基于累加和，O(n)）"""
+        csum = np.concatenate(([0.0], np.cumsum(values, dtype=float)))
+        end = np.arange(1, len(values) + 1)
+        if self.window is None:
+            return csum[end]
+        start = np.maximum(end - self.window, 0)
+        return csum[end] - csum[start]
+
+
+class RollingSum(RollingIndicator):
+    """滚动求和"""
+
+    def reset(self):
+        self._values = deque(maxlen=self.window)
+        self._sum = 0.0
+
+    def update(self, x):
+        """
+        加入一个新样本
+
+        Args:
+            x (float): 新样本
+        Returns:
+            float: 窗口内求和
+        """
+        if self.window is not None and len(self._values) == self.window:
+            self._sum -= self._values[0]
+        self._values.append(x)
+        self._sum += x
+        return self._sum
+
+    @property
+    def count(self):
+        """窗口内样本数"""
+        return len(self._values)
+
+    @property
+    def value(self):
+        return self._sum
+
+    def batch(self, values):
+        self.reset()
+        values = np.asarray(values, dtype=float)
+        out = self._window_sums(values)
+        for x in values[-self.window:] if self.window else values:
+            self.update(x)
+        return out
+
+
+class RollingMean(RollingSum):
+    """滚动均值（维护窗口和，避免每次对整个窗口求和）"""
+
+    def update(self, x):
+        """
+        加入一个新样本
+
+        Args:
+            x (float): 新样本
+        Returns:
+            float: 窗口内均值
+        """
+        super().update(x)
+        return self.value
+
+    @property
+    def value(self):
+        return self._sum / len(self._values) if self._values else 0
+
+    def batch(self, values):
+        values = np.asarray(values, dtype=float)
+        sums = super().batch(values)
+        return sums / self._window_counts(len(values))
+
+
+class RollingVariance(RollingIndicator):
+    """
+    滚动方差（Welford算法）
+
+    窗口已满时同时移出最旧样本，均值和二阶矩都按增量更新，数值上比
+    直接维护平方和更稳定。
+    """
+
+    def __init__(self, window=None, ddof=1):
+        """
+        初始化滚动方差
+
+        Args:
+            window (int): 滚动窗口长度，None表示累计计算
+            ddof (int): 自由度修正，默认1（样本方差）
+        """
+        self.ddof = ddof
+        super().__init__(window)
+
+    def reset(self):
+        self._values = deque(maxlen=self.window)
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, x):
+        """
+        加入一个新样本
+
+        Args:
+            x (float): 新样本
+        Returns:
+            float: 窗口内方差
+        """
+        n = len(self._values)
+        if self.window is not None and n == self.window:
+            # 窗口已满：用新样本替换最旧样本
+            old = self._values[0]
+            self._values.append(x)
+            old_mean = self._mean
+            self._mean += (x - old) / n
+            self._m2 += (x - old) * (x - self._mean + old - old_mean)
+        else:
+            self._values.append(x)
+            delta = x - self._mean
+            self._mean += delta / (n + 1)
+            self._m2 += delta * (x - self._mean)
+        # 浮点误差可能使二阶矩略小于0
+        if self._m2 < 0:
+            self._m2 = 0.0
+        return self.value
+
+    @property
+    def mean(self):
+        """窗口内均值"""
+        return self._mean
+
+    @property
+    def value(self):
+        n = len(self._values)
+        if n <= self.ddof:
+            return 0.0
+        return self._m2 / (n - self.ddof)
+
+    def batch(self, values):
+        values = np.asarray(values, dtype=float)
+        out = self._variance_batch(values)
+        self.reset()
+        for x in values[-self.window:] if self.window else values:
+            self.update(x)
+        return out
+
+    def _variance_batch(self, values):
+        """批量计算每个位置的窗口方差（不改变指标状态）"""
+        counts = self._window_counts(len(values))
+        # 先减去整体均值再求平方和，降低大数相消带来的误差
+        shift = values.mean() if len(values) else 0.0
+        centered = values - shift
+        sums = self._window_sums(centered)
+        sq_sums = self._window_sums(centered * centered)
+        dof = counts - self.ddof
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = (sq_sums - sums * sums / counts) / dof
+        out[dof <= 0] = 0.0
+        np.maximum(out, 0.0, out=out)
+        return out
+
+
+class RollingVolatility(RollingVariance):
+    """
+    滚动波动率
+
+    输入为价格序列，内部对相邻价格的对数收益率做Welford方差，输出收益率标准差。
+    """
+
+    def reset(self):
+        super().reset()
+        self._last_price = None
+
+    def update(self, price):
+        """
+        加入一个新价格
+
+        Args:
+            price (float): 最新价
+        Returns:
+            float: 窗口内收益率标准差
+        """
+        if price <= 0:
+            return self.value
+        if self._last_price is not None:
+            super().update(math.log(price / self._last_price))
+        self._last_price = price
+        return self.value
+
+    @property
+    def value(self):
+        return math.sqrt(super().value)
+
+    def batch(self, prices):
+        prices = np.asarray(prices, dtype=float)
+        out = pd.Series(np.nan, index=range(len(prices)))
+        valid = np.flatnonzero(prices > 0)
+        if len(valid) > 1:
+            returns = np.diff(np.log(prices[valid]))
+            out.iloc[valid[1:]] = np.sqrt(self._variance_batch(returns))
+        # 无效价格沿用上一个有效值，与逐条update的行为一致
+        out = out.ffill().fillna(0.0).to_numpy()
+        self.reset()
+        for p in prices[valid[-(self.window + 1):]] if self.window else prices:
+            self.update(p)
+        return out
+
+
+class RollingVWAP(RollingIndicator):
+    """滚动成交量加权均价"""
+
+    def reset(self):
+        self._amount = RollingSum(self.window)
+        self._volume = RollingSum(self.window)
+
+    def update(self, price, volume):
+        """
+        加入一笔成交
+
+        Args:
+            price (float): 成交价
+            volume (float): 成交量
+        Returns:
+            float: 窗口内VWAP，窗口内无成交时返回0
+        """
+        self._amount.update(price * volume)
+        self._volume.update(volume)
+        return self.value
+
+    @property
+    def value(self):
+        volume = self._volume.value
+        return self._amount.value / volume if volume > 0 else 0.0
+
+    def batch(self, prices, volumes):
+        prices = np.asarray(prices, dtype=float)
+        volumes = np.asarray(volumes, dtype=float)
+        self.reset()
+        amounts = self._amount.batch(prices * volumes)
+        vols = self._volume.batch(volumes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = np.where(vols > 0, amounts / vols, 0.0)
+        return out
+
+
+class RollingExtreme(RollingIndicator):
+    """
+    滚动最高/最低价（单调队列）
+
+    队列中只保留可能成为极值的样本，每个样本最多入队出队一次，均摊O(1)。
+    """
+
+    def __init__(self, window, mode='max'):
+        """
+        初始化滚动极值
+
+        Args:
+            window (int): 滚动窗口长度
+            mode (str): 'max'为滚动最高，'min'为滚动最低
+        """
+        if window is None:
+            raise ValueError("滚动极值必须指定窗口长度")
+        if mode not in ('max', 'min'):
+            raise ValueError(f"无效的极值类型: {mode}")
+        self.mode = mode
+        super().__init__(window)
+
+    def reset(self):
+        self._queue = deque()  # (序号, 值)
+        self._seq = 0
+
+    def update(self, x):
+        """
+        加入一个新样本
+
+        Args:
+            x (float): 新样本
+        Returns:
+            float: 窗口内极值
+        """
+        queue = self._queue
+        if self.mode == 'max':
+            while queue and queue[-1][1] <= x:
+                queue.pop()
+        else:
+            while queue and queue[-1][1] >= x:
+                queue.pop()
+        queue.append((self._seq, x))
+        if queue[0][0] <= self._seq - self.window:
+            queue.popleft()
+        self._seq += 1
+        return queue[0][1]
+
+    @property
+    def value(self):
+        return self._queue[0][1] if self._queue else 0.0
+
+    def batch(self, values):
+        values = np.asarray(values, dtype=float)
+        rolling = pd.Series(values).rolling(self.window, min_periods=1)
+        out = (rolling.max() if self.mode == 'max' else rolling.min()).to_numpy()
+        self.reset()
+        start = max(len(values) - self.window, 0)
+        self._seq = start
+        for x in values[start:]:
+            self.update(x)
+        return out
+
+
+class RollingHigh(RollingExtreme):
+    """滚动最高价"""
+
+    def __init__(self, window):
+        super().__init__(window, mode='max')
+
+
+class RollingLow(RollingExtreme):
+    """滚动最低价"""
+
+    def __init__(self, window):
+        super().__init__(window, mode='min')
+
+
+class OrderFlowImbalance(RollingIndicator):
+    """
+    盘口订单流不平衡（OFI）
+
+    按Cont等人的定义，根据相邻两个快照的买一/卖一价量变化计算单步订单流：
+        买一价上移或不变时计入当前买一量，下移或不变时扣除上一买一量；
+        卖一价下移或不变时扣除当前卖一量，上移或不变时计入上一卖一量。
+    输出窗口内单步订单流之和，正值表示买方力量占优。
+    """
+
+    def reset(self):
+        self._flows = RollingSum(self.window)
+        self._last = None
+
+    def update(self, bid_price, bid_volume, ask_price, ask_volume):
+        """
+        加入一个新的盘口快照
+
+        Args:
+            bid_price (float): 买一价
+            bid_volume (float): 买一量
+            ask_price (float): 卖一价
+            ask_volume (float): 卖一量
+        Returns:
+            float: 窗口内OFI
+        """
+        if self._last is not None:
+            last_bid, last_bid_vol, last_ask, last_ask_vol = self._last
+            flow = 0.0
+            if bid_price >= last_bid:
+                flow += bid_volume
+            if bid_price <= last_bid:
+                flow -= last_bid_vol
+            if ask_price <= last_ask:
+                flow -= ask_volume
+            if ask_price >= last_ask:
+                flow += last_ask_vol
+            self._flows.update(flow)
+        self._last = (bid_price, bid_volume, ask_price, ask_volume)
+        return self.value
+
+    @property
+    def value(self):
+        return self._flows.value
+
+    def batch(self, bid_prices, bid_volumes, ask_prices, ask_volumes):
+        bp = np.asarray(bid_prices, dtype=float)
+        bv = np.asarray(bid_volumes, dtype=float)
+        ap = np.asarray(ask_prices, dtype=float)
+        av = np.asarray(ask_volumes, dtype=float)
+        out = np.zeros(len(bp), dtype=float)
+        self.reset()
+        if len(bp) > 1:
+            flows = (np.where(bp[1:] >= bp[:-1], bv[1:], 0.0)
+                     - np.where(bp[1:] <= bp[:-1], bv[:-1], 0.0)
+                     - np.where(ap[1:] <= ap[:-1], av[1:], 0.0)
+                     + np.where(ap[1:] >= ap[:-1], av[:-1], 0.0))
+            out[1:] = self._flows.batch(flows)
+        if len(bp):
+            self._last = (bp[-1], bv[-1], ap[-1], av[-1])
+        return out
@@ -0,0 +1,281 @@
+from collections import namedtuple
+import bisect
+import logging
+import os
+import threading
+import pandas as pd
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # 未安装pypinyin时不支持按拼音首字母搜索
+    lazy_pinyin = None
+
+PINYIN_SEARCH = lazy_pinyin is not None  # 是否支持按拼音首字母搜索
+
+DEFAULT_CSV_FILE = os.path.join(os.path.dirname(__file__), 'data', 'all_a_stocks.csv')
+
+# 可以T+0交易的ETF：代码前缀 + 名称关键字
+T0_FUND_PREFIXES = ('159', '511', '518', '513')
+T0_FUND_KEYWORDS = ('港股', '恒生', '债券', '货币', '黄金', '原油', 'QDII', '现金', '短债', '超短债', '国债', '信用债', '可转债')
+
+Instrument = namedtuple('Instrument', [
+    'code',             # 6位证券代码
+    'name',             # 证券简称，未知时为空字符串
+    'is_fund',          # 是否为场内基金（1、5开头）
+    'tick_size',        # 最小报价单位（基金0.001，股票0.01）
+    'precision',        # 价格小数位数
+    'is_t0',            # 是否可以T+0交易
+    'stamp_duty',       # 卖出时是否收取印花税
+    'min_commission',   # 是否适用最低佣金
+    'limit_ratio',      # 涨跌幅限制比例
+])
+
+
+def _limit_ratio(code, name, is_fund):
+    """按板块和名称确定涨跌幅限制比例"""
+    if is_fund:
+        return 0.10
+    if code.startswith(('4', '8', '92')):
+        return 0.30  # 北交所
+    if code.startswith(('300', '301', '688', '689')):
+        return 0.20  # 创业板、科创板（含ST）
+    if 'ST' in name:
+        return 0.05  # 主板ST
+    return 0.10
+
+
+def exchange_suffix(code):
+    """
+    按证券代码确定交易所后缀
+
+    Args:
+        code (str): 6位证券代码
+    Returns:
+        str: 'SH'、'SZ'或'BJ'
+    Raises:
+        ValueError: 无法识别的代码
+    """
+    if code.startswith(('0', '1', '3')):
+        return 'SZ'  # 深交所
+    if code.startswith(('5', '6')):
+        return 'SH'  # 上交所
+    if code.startswith(('4', '8', '92')):
+        return 'BJ'  # 北交所
+    raise ValueError(f"无效的股票代码: {code}")
+
+
+def to_qmt_code(symbol):
+    """
+    将股票代码转换为QMT识别的格式
+
+    Args:
+        symbol (str): 原始股票代码（例如：000001、600001等）
+    Returns:
+        str: QMT格式的股票代码（例如：000001.SZ、600001.SH等）
+    """
+    symbol = symbol.strip()
+    if '.SZ' in symbol or '.SH' in symbol or '.BJ' in symbol:
+        return symbol
+    symbol = symbol.zfill(6)
+    return f"{symbol}.{exchange_suffix(symbol)}"
+
+
+def _initials(name):
+    """证券简称的拼音首字母（大写，非汉字原样保留）"""
+    return ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER)).upper()
+
+
+def make_instrument(code, name=''):
+    """
+    按证券代码和简称生成证券元数据
+
+    Args:
+        code (str): 证券代码（可带市场后缀）
+        name (str): 证券简称
+    Returns:
+        Instrument: 证券元数据
+    """
+    code = str(code)[:6]
+    name = name if isinstance(name, str) else ''
+    is_fund = code.startswith(('1', '5'))
+    is_t0 = (code.startswith(T0_FUND_PREFIXES)
+             and any(keyword in name for keyword in T0_FUND_KEYWORDS))
+    return Instrument(
+        code=code,
+        name=name,
+        is_fund=is_fund,
+        tick_size=0.001 if is_fund else 0.01,
+        precision=3 if is_fund else 2,
+        is_t0=is_t0,
+        stamp_duty=not is_fund,
+        min_commission=not is_fund,
+        limit_ratio=_limit_ratio(code, name, is_fund),
+    )
+
+
+class InstrumentRegistry:
+    """
+    证券元数据注册表
+
+    从股票列表缓存（all_a_stocks.csv）一次性生成每只证券的元数据，
+    之后按代码直接取用，交易路径上不再做字符串前缀判断和DataFrame查询。
+    列表中没有的代码按代码前缀推断，并缓存结果。
+    添加股票时的搜索使用按代码和按拼音首字母排序的数组，按前缀二分查找。
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('LiveTrade')
+        self._instruments = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self._sorted_codes = []     # 已排序的证券代码
+        self._sorted_initials = None  # 已排序的 (拼音首字母, 证券代码)，首次按拼音搜索时生成
+
+    def load_frame(self, df):
+        """
+        从股票列表DataFrame加载元数据
+
+        Args:
+            df (pd.DataFrame): 包含“证券代码”和“证券简称”列的股票列表
+        """
+        instruments = {}
+        for code, name in zip(df['证券代码'].astype(str), df['证券简称']):
+            code = code.zfill(6)
+            instruments[code] = make_instrument(code, name)
+        with self._lock:
+            self._instruments = instruments
+            self._sorted_codes = sorted(instruments)
+            self._sorted_initials = None
+            self.loaded = True
+
+    def load_csv(self, csv_file=DEFAULT_CSV_FILE):
+        """
+        从股票列表缓存文件加载元数据
+
+        Args:
+            csv_file (str): 股票列表文件路径
+        Returns:
+            bool: 是否加载成功
+        """
+        if not os.path.exists(csv_file):
+            return False
+        try:
+            self.load_frame(pd.read_csv(csv_file, dtype={'证券代码': str}))
+            return True
+        except Exception as e:
+            self.logger.error(f"读取{csv_file}文件时出错: {e}")
+            return False
+
+    def get(self, stock_code):
+        """
+        获取证券元数据
+
+        Args:
+            stock_code (str): 证券代码（可带市场后缀）
+        Returns:
+            Instrument: 证券元数据
+        """
+        code = stock_code[:6]
+        instrument = self._instruments.get(code)
+        if instrument is None:
+            instrument = make_instrument(code)
+            self._instruments[code] = instrument
+        return instrument
+
+    def get_name(self, stock_code, default="未知名称"):
+        """
+        获取证券简称
+
+        Args:
+            stock_code (str): 证券代码（可带市场后缀）
+            default: 未找到时的返回值
+        Returns:
+            str: 证券简称
+        """
+        return self.get(stock_code).name or default
+
+    def qmt_code(self, stock_code):
+        """
+        获取带交易所后缀的代码
+
+        Args:
+            stock_code (str): 证券代码（可带市场后缀）
+        Returns:
+            str: QMT格式的代码，如'600000.SH'
+        """
+        return to_qmt_code(stock_code)
+
+    @staticmethod
+    def _prefix_range(keys, prefix):
+        """已排序数组中以prefix开头的元素的下标范围"""
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + '\uffff')
+        return start, end
+
+    def _initials_index(self):
+        """按拼音首字母排序的数组（生成一次后缓存）"""
+        if self._sorted_initials is None:
+            with self._lock:
+                if self._sorted_initials is None:
+                    self._sorted_initials = sorted(
+                        (_initials(instrument.name), code)
+                        for code, instrument in self._instruments.items() if instrument.name
+                    )
+        return self._sorted_initials
+
+    def search(self, text, limit=20):
+        """
+        按代码前缀、拼音首字母前缀或简称搜索证券
+
+        Args:
+            text (str): 输入的代码、拼音首字母或简称片段
+            limit (int): 最多返回的数量
+        Returns:
+            list: Instrument列表
+        """
+        text = text.strip()
+        if not text:
+            return []
+        if text.isdigit():
+            start, end = self._prefix_range(self._sorted_codes, text)
+            return [self._instruments[code] for code in self._sorted_codes[start:min(end, start + limit)]]
+
+        results = []
+        seen = set()
+        if lazy_pinyin is not None and text.isascii():
+            index = self._initials_index()
+            prefix = text.upper()
+            start = bisect.bisect_left(index, (prefix,))
+            end = bisect.bisect_left(index, (prefix + '\uffff',))
+            for _, code in index[start:min(end, start + limit)]:
+                results.append(self._instruments[code])
+                seen.add(code)
+        if len(results) < limit:
+            for code in self._sorted_codes:
+                instrument = self._instruments[code]
+                if code not in seen and text in instrument.name:
+                    results.append(instrument)
+                    if len(results) >= limit:
+                        break
+        return results
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    获取全局证券元数据注册表，首次调用时从股票列表缓存文件加载
+
+    Returns:
+        InstrumentRegistry: 注册表实例
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = InstrumentRegistry()
+                registry.load_csv()
+                _registry = registry
+    return _registry
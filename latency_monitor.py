@@ -0,0 +1,171 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+# 延迟指标（均为两个阶段时间戳之差）
+METRIC_DECISION = 'decision'            # 收到行情 -> 策略发出交易指令
+METRIC_PRICING = 'pricing'              # 智能定价耗时
+METRIC_SUBMIT = 'submit'                # 下单接口调用耗时
+METRIC_TICK_TO_ORDER = 'tick_to_order'  # 收到行情 -> 下单接口返回
+METRIC_ACK = 'ack'                      # 下单接口返回 -> 柜台确认（异步下单回报或首个委托回报）
+METRIC_FILL = 'fill'                    # 下单接口返回 -> 首笔成交回报
+
+ALL_METRICS = (METRIC_DECISION, METRIC_PRICING, METRIC_SUBMIT, METRIC_TICK_TO_ORDER, METRIC_ACK, METRIC_FILL)
+
+# 直方图桶上界（微秒），每10倍分10个桶（相邻约差26%），覆盖1微秒到100秒
+BUCKET_EDGES_US = tuple(10 ** (i / 10) for i in range(0, 81))
+
+
+def format_us(value_us):
+    """把微秒数格式化为便于阅读的字符串"""
+    if value_us < 1000:
+        return f"{value_us:.0f}us"
+    if value_us < 1000000:
+        return f"{value_us / 1000:.1f}ms"
+    return f"{value_us / 1000000:.2f}s"
+
+
+class LatencyHistogram:
+    """
+    对数分桶的延迟直方图
+
+    只记录每个桶的计数和最大值，记录一次是一次二分查找加计数，
+    分位数按桶上界估算（不超过最大值）。
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_EDGES_US) + 1)
+        self.count = 0
+        self.max_us = 0.0
+
+    def record(self, seconds):
+        """
+        记录一次延迟
+
+        Args:
+            seconds (float): 延迟（秒）
+        """
+        value_us = seconds * 1000000
+        self.counts[bisect.bisect_left(BUCKET_EDGES_US, value_us)] += 1
+        self.count += 1
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def percentile(self, q):
+        """
+        估算分位数
+
+        Args:
+            q (float): 分位（0~1）
+        Returns:
+            float: 分位数（微秒），没有数据时返回0
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                upper = BUCKET_EDGES_US[index] if index < len(BUCKET_EDGES_US) else self.max_us
+                return min(upper, self.max_us)
+        return self.max_us
+
+
+class LatencyMonitor:
+    """
+    实盘链路延迟统计
+
+    按 (股票代码, 指标) 维护延迟直方图，定期把p50/p99/max写入精简的延迟日志文件，
+    界面可以通过rows()读取当前统计。
+
+    Attributes:
+        report_interval (float): 写日志的间隔（秒）
+        log_file (str): 延迟日志文件路径
+    """
+
+    def __init__(self, report_interval=60, log_file=None, logger=None):
+        """
+        初始化延迟统计
+
+        Args:
+            report_interval (float): 写日志的间隔（秒），0表示不写
+            log_file (str): 延迟日志文件路径，None表示logs目录下按日期命名
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.report_interval = report_interval
+        self.log_file = log_file
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.last_report = time.monotonic()
+
+    def record(self, stock_code, metric, seconds):
+        """
+        记录一次延迟
+
+        Args:
+            stock_code (str): 股票代码
+            metric (str): 指标名称
+            seconds (float): 延迟（秒）
+        """
+        key = (stock_code, metric)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def rows(self):
+        """
+        获取当前统计
+
+        Returns:
+            list: [(股票代码, 指标, 次数, p50, p99, max), ...]，延迟单位为微秒
+        """
+        order = {metric: i for i, metric in enumerate(ALL_METRICS)}
+        with self.lock:
+            items = sorted(self.histograms.items(), key=lambda item: (item[0][0], order.get(item[0][1], len(order))))
+            return [
+                (stock_code, metric, h.count, h.percentile(0.5), h.percentile(0.99), h.max_us)
+                for (stock_code, metric), h in items
+            ]
+
+    def reset(self):
+        """清空统计"""
+        with self.lock:
+            self.histograms = {}
+
+    def maybe_report(self):
+        """距上次写日志超过report_interval秒时写一次"""
+        if not self.report_interval:
+            return
+        now = time.monotonic()
+        if now - self.last_report < self.report_interval:
+            return
+        self.last_report = now
+        self.write_report()
+
+    def write_report(self):
+        """把当前统计追加写入延迟日志文件，每个 (股票代码, 指标) 一行"""
+        rows = self.rows()
+        if not rows:
+            return
+        now = datetime.now()
+        log_file = self.log_file or os.path.join('logs', f"latency_{now.strftime('%Y%m%d')}.log")
+        stamp = now.strftime('%H:%M:%S')
+        lines = [
+            f"{stamp} {stock_code} {metric} n={count} p50={format_us(p50)} p99={format_us(p99)} max={format_us(max_us)}\n"
+            for stock_code, metric, count, p50, p99, max_us in rows
+        ]
+        try:
+            directory = os.path.dirname(log_file)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(log_file, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+        except Exception as e:
+            self.logger.error(f"写入延迟日志失败: {str(e)}")
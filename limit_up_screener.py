@@ -0,0 +1,325 @@
+import argparse
+import logging
+import os
+import time
+import warnings
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from instrument_registry import get_registry, to_qmt_code
+from selected_journal import SelectedStocksJournal, DEFAULT_DATA_DIR, CODE_COLUMN
+from stock_universe import get_universe
+
+DEFAULT_BAR_DIR = os.path.join(os.path.dirname(__file__), 'data', 'daily_bars')
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+MARKET_CLOSE = '150000'     # 收盘后写入的缓存才包含当日完整的日线
+
+# 判断涨停时允许的涨幅误差（百分点），前复权价格的涨幅与实际涨停幅度略有出入
+LIMIT_TOLERANCE = 0.3
+
+# 配置项 -> 默认值，与MarketData.load_config一致
+DEFAULT_SETTINGS = {
+    'NDAYS_BEFORE_1': 10,
+    'NDAYS_BEFORE_2': 30,
+    'NDAYS_BEFORE_3': 40,
+    'NDAYS_BEFORE_4': 60,
+    'NDAYS_BEFORE_5': 65,
+    'BOLL_DAYS': 20,
+    'BOLL_MULTIPLES': 2,
+    'MA_5': 5,
+    'THRESHOLD_CUR_UPDOWNRATE_10PCT': 8.5,
+    'THRESHOLD_HIST_UPDOWNRATE_10PCT': 4.5,
+    'THRESHOLD_CUR_UPDOWNRATE_20PCT': 17,
+    'THRESHOLD_HIST_UPDOWNRATE_20PCT': 9,
+    'THRESHOLD_CUR_UPDOWNRATE_30PCT': 24,
+    'THRESHOLD_HIST_UPDOWNRATE_30PCT': 19,
+}
+
+
+class DailyBarCache:
+    """
+    全市场日线缓存
+
+    把全部股票的日线按字段存成 股票数×交易日数 的二维数组，按截止日期保存为一个npz文件
+    （data/daily_bars/daily_bars_YYYYMMDD.npz）。同一天再次选股直接读文件，不再逐只股票查询；
+    缓存不包含所需的股票或天数、最后一根日线不是截止日期，或者是在截止日期收盘前写入的
+    （当日日线还不完整）时，一次性从miniQMT本地行情中批量读取并覆盖缓存。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_BAR_DIR, logger=None):
+        """
+        初始化日线缓存
+
+        Args:
+            cache_dir (str): 缓存目录
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.cache_dir = cache_dir
+        self.logger = logger or logging.getLogger('mytrade')
+
+    def _path(self, end_date):
+        return os.path.join(self.cache_dir, f"daily_bars_{end_date}.npz")
+
+    def _read(self, path, codes, count, end_date):
+        """从缓存文件中取出所需的股票和天数，缓存不够或不是截止日期收盘后的数据时返回None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if 'fetched_at' not in data.files:
+                    return None
+                closed_at = datetime.strptime(end_date + MARKET_CLOSE, '%Y%m%d%H%M%S').timestamp()
+                if float(data['fetched_at']) < closed_at:
+                    return None
+                cached_codes = data['codes']
+                dates = data['dates']
+                if len(dates) < count or str(dates[-1]) != end_date:
+                    return None
+                position = {code: i for i, code in enumerate(cached_codes)}
+                if any(code not in position for code in codes):
+                    return None
+                rows = np.fromiter((position[code] for code in codes), dtype=np.int64, count=len(codes))
+                bars = {field: data[field][rows, -count:] for field in BAR_FIELDS}
+                return dates[-count:], bars
+        except Exception as e:
+            self.logger.error(f"读取{path}文件时出错: {e}")
+            return None
+
+    def _fetch(self, codes, count, end_date, download):
+        """从miniQMT本地行情批量读取日线"""
+        from xtquant import xtdata
+        qmt_codes = [to_qmt_code(code) for code in codes]
+        if download:
+            xtdata.download_history_data2(qmt_codes, period='1d', start_time='', end_time=end_date)
+        raw = xtdata.get_market_data(
+            field_list=list(BAR_FIELDS), stock_list=qmt_codes, period='1d',
+            end_time=end_date, count=count, dividend_type='front', fill_data=True
+        )
+        dates = sorted(set().union(*(raw[field].columns for field in BAR_FIELDS)))[-count:]
+        bars = {
+            field: raw[field].reindex(index=qmt_codes, columns=dates).to_numpy(dtype=np.float64)
+            for field in BAR_FIELDS
+        }
+        return np.asarray(dates, dtype=str), bars
+
+    def load(self, codes, count, end_date, download=False):
+        """
+        加载日线
+
+        Args:
+            codes (list): 6位股票代码，结果按此顺序排列
+            count (int): 交易日数
+            end_date (str): 截止日期（YYYYMMDD）
+            download (bool): 读取前是否先让miniQMT补充下载历史数据
+        Returns:
+            tuple: (交易日数组, {字段: 股票数×交易日数的float数组})，缺失的数据为nan
+        """
+        path = self._path(end_date)
+        cached = None if download else self._read(path, codes, count, end_date)
+        if cached is not None:
+            return cached
+        fetched_at = time.time()
+        dates, bars = self._fetch(codes, count, end_date, download)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp = path + '.tmp.npz'
+            np.savez(temp, codes=np.asarray(codes, dtype=str), dates=dates, fetched_at=fetched_at, **bars)
+            os.replace(temp, path)
+        except Exception as e:
+            self.logger.error(f"写入{path}文件时出错: {e}")
+        return dates, bars
+
+
+class LimitUpScreener:
+    """
+    全市场涨停选股
+
+    日线按 股票数×交易日数 的二维数组一次性加载，各项条件对全部股票同时做向量化计算，不逐只循环：
+    - 当日涨幅达标：当日涨幅不低于该股涨跌幅限制对应的THRESHOLD_CUR_UPDOWNRATE
+    - 前期涨幅温和：之前NDAYS_BEFORE_1天的最大单日涨幅不超过THRESHOLD_HIST_UPDOWNRATE
+    - 趋势向上：收盘价高于NDAYS_BEFORE_2日均线
+    - 突破前高：收盘价不低于之前NDAYS_BEFORE_3天的最高价
+    - 近期首板：之前NDAYS_BEFORE_4天没有涨停
+    - 非次新股：最近NDAYS_BEFORE_5天都有行情
+    - 站上均线：收盘价高于MA_5日均线和BOLL_DAYS日布林中轨
+    涨跌幅限制取自证券元数据（10%、20%、30%三档，主板ST按10%档阈值的一半），不选基金。
+    入选股票通过SelectedStocksJournal记录，与实盘中新增的已选股票写入同一份当日记录。
+
+    Attributes:
+        settings (dict): 选股参数（配置项 -> 值）
+        journal (SelectedStocksJournal): 已选股票记录
+    """
+
+    def __init__(self, settings=None, bar_cache=None, journal=None, logger=None):
+        """
+        初始化选股
+
+        Args:
+            settings: 带配置属性的对象（如MarketData实例）或字典，None表示全局MarketData实例，缺少的项使用默认值
+            bar_cache (DailyBarCache): 日线缓存，None表示默认目录
+            journal (SelectedStocksJournal): 已选股票记录，None时使用settings的selected_journal，没有则使用默认目录
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        if settings is None:
+            from market_data import get_market_data
+            settings = get_market_data()
+        self.logger = logger or logging.getLogger('mytrade')
+        self.journal = journal or getattr(settings, 'selected_journal', None) or SelectedStocksJournal(logger=self.logger)
+        if not isinstance(settings, dict):
+            settings = {key: getattr(settings, key, value) for key, value in DEFAULT_SETTINGS.items()}
+        self.settings = {**DEFAULT_SETTINGS, **settings}
+        self.bar_cache = bar_cache or DailyBarCache(logger=self.logger)
+
+    def lookback(self):
+        """计算各项条件所需的交易日数（含当日）"""
+        s = self.settings
+        return max(s['NDAYS_BEFORE_1'] + 2, s['NDAYS_BEFORE_2'], s['NDAYS_BEFORE_3'] + 1,
+                   s['NDAYS_BEFORE_4'] + 2, s['NDAYS_BEFORE_5'], s['BOLL_DAYS'], s['MA_5'])
+
+    def _thresholds(self, limit_ratios):
+        """按涨跌幅限制取每只股票的当日和前期涨幅阈值（百分比）"""
+        s = self.settings
+        cur = np.full(len(limit_ratios), float(s['THRESHOLD_CUR_UPDOWNRATE_10PCT']))
+        hist = np.full(len(limit_ratios), float(s['THRESHOLD_HIST_UPDOWNRATE_10PCT']))
+        for ratio, suffix in ((0.20, '20PCT'), (0.30, '30PCT')):
+            mask = np.isclose(limit_ratios, ratio)
+            cur[mask] = s[f'THRESHOLD_CUR_UPDOWNRATE_{suffix}']
+            hist[mask] = s[f'THRESHOLD_HIST_UPDOWNRATE_{suffix}']
+        st = np.isclose(limit_ratios, 0.05)
+        cur[st] *= 0.5
+        hist[st] *= 0.5
+        return cur, hist
+
+    def evaluate(self, codes, bars):
+        """
+        对全部股票计算各项条件
+
+        Args:
+            codes (list): 6位股票代码
+            bars (dict): {字段: 股票数×交易日数的float数组}，最后一列为选股当日
+        Returns:
+            pd.DataFrame: 每只股票一行，含各项指标和条件是否满足
+        """
+        s = self.settings
+        close = bars['close']
+        high = bars['high']
+        registry = get_registry()
+        limit_ratios = np.fromiter((registry.get(code).limit_ratio for code in codes), dtype=np.float64, count=len(codes))
+        cur_threshold, hist_threshold = self._thresholds(limit_ratios)
+
+        with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)   # 全为nan的窗口
+            pct = np.full_like(close, np.nan)
+            pct[:, 1:] = (close[:, 1:] / close[:, :-1] - 1) * 100
+            last = close[:, -1]
+            change = pct[:, -1]
+            hist_max = np.nanmax(pct[:, -s['NDAYS_BEFORE_1'] - 1:-1], axis=1)
+            trend_ma = np.nanmean(close[:, -s['NDAYS_BEFORE_2']:], axis=1)
+            prior_high = np.nanmax(high[:, -s['NDAYS_BEFORE_3'] - 1:-1], axis=1)
+            limit_pct = limit_ratios[:, None] * 100 - LIMIT_TOLERANCE
+            limit_days = np.count_nonzero(pct[:, -s['NDAYS_BEFORE_4'] - 1:-1] >= limit_pct, axis=1)
+            listed = np.count_nonzero(~np.isnan(close[:, -s['NDAYS_BEFORE_5']:]), axis=1) >= s['NDAYS_BEFORE_5']
+            ma5 = np.nanmean(close[:, -s['MA_5']:], axis=1)
+            boll_window = close[:, -s['BOLL_DAYS']:]
+            boll_mid = np.nanmean(boll_window, axis=1)
+            boll_upper = boll_mid + s['BOLL_MULTIPLES'] * np.nanstd(boll_window, axis=1)
+
+            conditions = {
+                '当日涨幅达标': change >= cur_threshold,
+                '前期涨幅温和': hist_max <= hist_threshold,
+                '趋势向上': last > trend_ma,
+                '突破前高': last >= prior_high,
+                '近期首板': limit_days == 0,
+                '非次新股': listed,
+                '站上均线': (last > ma5) & (last > boll_mid),
+            }
+
+        result = pd.DataFrame({
+            '代码': codes,
+            '最新价': np.round(last, 2),
+            '涨跌幅': np.round(change, 2),
+            '涨跌幅限制': np.round(limit_ratios * 100).astype(int),
+            '前期最大涨幅': np.round(hist_max, 2),
+            '前高': np.round(prior_high, 2),
+            '趋势均线': np.round(trend_ma, 2),
+            '布林上轨': np.round(boll_upper, 2),
+        })
+        for name, passed in conditions.items():
+            result[name] = passed
+        return result
+
+    def screen(self, trade_date=None, download=False, save=True):
+        """
+        全市场选股
+
+        Args:
+            trade_date (str): 选股日期（YYYYMMDD），None表示今天
+            download (bool): 是否先让miniQMT补充下载历史数据
+            save (bool): 是否记录到当日已选股票（selected_stocks_YYYYMMDD）
+        Returns:
+            pd.DataFrame: 入选股票（代码、名称、指标、分析结果、下单状态），按涨跌幅从高到低排列
+        """
+        trade_date = trade_date or datetime.now().strftime('%Y%m%d')
+        registry = get_registry()
+        universe = get_universe().frame
+        codes = [code for code in universe['证券代码'].astype(str).str.zfill(6).unique()
+                 if not registry.get(code).is_fund]
+
+        started = time.perf_counter()
+        dates, bars = self.bar_cache.load(codes, self.lookback(), trade_date, download=download)
+        loaded = time.perf_counter()
+        evaluated = self.evaluate(codes, bars)
+        condition_names = [column for column in evaluated.columns if evaluated[column].dtype == bool]
+        selected = evaluated[evaluated[condition_names].all(axis=1)].copy()
+        selected.insert(1, '名称', [registry.get_name(code, '') for code in selected['代码']])
+        selected['分析结果'] = '、'.join(condition_names)
+        selected['下单状态'] = ''
+        selected = selected.drop(columns=condition_names).sort_values('涨跌幅', ascending=False)
+        computed = time.perf_counter()
+
+        last_date = dates[-1] if len(dates) else ''
+        self.logger.info(
+            f"全市场选股（截止{last_date}）：{len(codes)}只股票，入选{len(selected)}只，"
+            f"加载日线{loaded - started:.2f}秒，计算{computed - loaded:.2f}秒"
+        )
+        if save:
+            self.record(selected, trade_date)
+        return selected
+
+    def record(self, selected, trade_date):
+        """
+        把入选股票记录到已选股票日志
+
+        已在记录中的股票只更新指标，保留原来的下单状态。记录的日期与journal当前的日期不同时
+        （如补选历史日期或journal尚未加载），用同目录的单独实例记录并立即整理写入CSV。
+
+        Args:
+            selected (pd.DataFrame): 入选股票
+            trade_date (str): 选股日期（YYYYMMDD）
+        """
+        journal = self.journal
+        if journal.trade_date != trade_date:
+            journal = SelectedStocksJournal(self.journal.data_dir, self.logger)
+            journal.load(trade_date)
+        records = selected.where(selected.notna(), None).to_dict('records')
+        for record in records:
+            code = record.pop(CODE_COLUMN)
+            if code in journal:
+                record.pop('下单状态', None)
+            journal.record(code, **record)
+        if journal is not self.journal:
+            journal.compact()
+        self.logger.info(f"已记录{len(records)}只入选股票到{journal.csv_path()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='全市场涨停选股')
+    parser.add_argument('--date', '-d', type=str, help='选股日期（YYYYMMDD），默认今天')
+    parser.add_argument('--download', action='store_true', help='先让miniQMT补充下载日线数据')
+    parser.add_argument('--output', '-o', type=str, default=DEFAULT_DATA_DIR, help='选股结果目录')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    screener = LimitUpScreener(journal=SelectedStocksJournal(args.output))
+    result = screener.screen(trade_date=args.date, download=args.download)
+    print(result.to_string(index=False))
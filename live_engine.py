@@ -4,12 +4,22 @@ from xtquant import xtconstant
 from datetime import datetime
 import logging
 from xtquant.xttrader import XtQuantTraderCallback
-from threading import Thread
 import sys
 from PyQt5.QtCore import QObject, pyqtSignal, QMetaObject, Q_ARG, Qt
 from logging.handlers import RotatingFileHandler
 import os
+import threading
 import time
+from order_book_features import compute_tick_features
+from session_schedule import day_index
+from event_dispatcher import EventDispatcher
+from position_book import PositionBook, FINAL_ORDER_STATUS
+from order_manager import OrderManager, pending_key
+from symbol_context import SymbolContext
+from state_snapshot import StateSnapshot
+from latency_monitor import (
+    LatencyMonitor, METRIC_DECISION, METRIC_PRICING, METRIC_SUBMIT, METRIC_TICK_TO_ORDER, METRIC_ACK, METRIC_FILL
+)
 
 class MyXtQuantTraderCallback(XtQuantTraderCallback):
     # 实测只有on_stock_order, on_stock_trade有回调，持仓和资金定期通过update_asset_positions()更新
@@ -20,13 +30,13 @@ class MyXtQuantTraderCallback(XtQuantTraderCallback):
         
     def on_stock_order(self, order):
         """委托回报推送"""
-        # 创建线程处理订单状态
+        # 交给分发线程按到达顺序处理订单状态
         #self.engine.logger.info(f"XT-委托回报推送: {order.order_id}, 股票代码={order.stock_code}, 方向={order.order_type}, 价格={order.price}, 数量={order.order_volume}")
-        Thread(target=self.engine.on_order_callback, args=(order,), daemon=True).start()
+        self.engine.dispatcher.submit(self.engine.on_order_callback, order)
         
     def on_stock_trade(self, trade):
         """成交回报推送"""
-        Thread(target=self.engine.on_trade_callback, args=(trade,), daemon=True).start()
+        self.engine.dispatcher.submit(self.engine.on_trade_callback, trade)
         
     def on_stock_position(self, position):
         """持仓变动推送"""
@@ -42,7 +52,7 @@ class MyXtQuantTraderCallback(XtQuantTraderCallback):
         :param response: XtOrderResponse 对象
         :return:
         """
-        self.engine.logger.info(f"XT-异步下单回报推送: {response.account_id}, 订单号={response.order_id}, 序号={response.seq}, 策略名称={response.strategy_name}")
+        self.engine.dispatcher.submit(self.engine.on_order_async_response, response)
 
     def on_order_status(self, order):
         """委托回报推送"""
@@ -89,14 +99,18 @@ class MyXtQuantTraderCallback(XtQuantTraderCallback):
     def on_order_error(self, order_error):
         """委托失败推送"""
         self.engine.logger.info(f"XT-委托报错回调 {order_error.order_remark} {order_error.error_msg}")
+        self.engine.dispatcher.submit(self.engine.on_order_error_callback, order_error)
         
     def on_cancel_error(self, cancel_error):
         """撤单失败推送"""
         self.engine.logger.info(f"XT-撤单失败推送{datetime.now()} {sys._getframe().f_code.co_name}，{cancel_error.order_id}，{cancel_error.error_msg}")
+        self.engine.dispatcher.submit(self.engine.on_cancel_failed, cancel_error.order_id, cancel_error.error_msg)
 
     def on_cancel_order_stock_async_response(self, response):
         """异步撤单回报推送"""
         self.engine.logger.info(f"XT-异步撤单回报{datetime.now()} {sys._getframe().f_code.co_name}")
+        if getattr(response, 'cancel_result', 0) != 0:
+            self.engine.dispatcher.submit(self.engine.on_cancel_failed, response.order_id, f"撤单结果: {response.cancel_result}")
 
     def on_account_status(self, status):
         """账户状态推送"""
@@ -126,9 +140,28 @@ class MyXtQuantTraderCallback(XtQuantTraderCallback):
 class StatusSignals(QObject):
     """单独的信号类"""
     status = pyqtSignal(str)
+    positions = pyqtSignal()  # 本地账本的持仓发生变化
+
+
+def _book_field(name, doc):
+    """生成读写本地账本字段的属性，资金和持仓以PositionBook为准"""
+    def getter(self):
+        return getattr(self.position_book, name)
+
+    def setter(self, value):
+        setattr(self.position_book, name, value)
+    return property(getter, setter, doc=doc)
+
 
 class LiveEngine(TradeEngine):
     """实盘交易引擎类"""
+
+    cash = _book_field('cash', "可用资金")
+    frozen_cash = _book_field('frozen_cash', "冻结资金")
+    market_value = _book_field('market_value', "持仓市值")
+    total_asset = _book_field('total_asset', "总资产")
+    positions = _book_field('positions', "持仓信息")
+
     def __init__(self, xt_trader, account_id):
         """
         初始化实盘引擎
@@ -136,6 +169,10 @@ class LiveEngine(TradeEngine):
             xt_trader: XtQuantTrader实例
             account_id: 资金账号
         """
+        # 本地资金持仓账本，由委托和成交回报增量更新，需在基类初始化资金字段前创建
+        self.position_book = PositionBook(logger=logging.getLogger('LiveTrade'))
+        self.reconcile_interval = 60  # 与柜台对账的间隔（秒）
+        self.last_reconcile = 0.0
         super().__init__()
         self.is_live = True  # 标记为实盘模式
         
@@ -165,7 +202,29 @@ class LiveEngine(TradeEngine):
         self.total_asset = 0
         
         self.order_retry_limit = 3  # 订单重试次数
-        self.active_orders = {}  # 跟踪活跃订单
+        # 异步下单：发送后立即返回tick处理，委托号由异步下单回报补齐
+        self.async_order = True
+        # 委托超过30秒未完成则撤单，撤单完成后按最新盘口重下剩余数量；
+        # 异步委托10秒内没有收到下单回报则按失败处理
+        self.order_manager = OrderManager(timeout=30, pending_timeout=10, logger=self.logger)
+        # 发送异步委托和登记请求序号在同一把锁内完成，异步下单回报处理时一定能找到对应的请求
+        self.submit_lock = threading.Lock()
+        self.active_orders = self.order_manager.orders  # 跟踪待确认和活跃订单
+        self.book_features = {}  # 最新tick的盘口特征
+        self.contexts = {}  # 多股票交易：股票代码 -> SymbolContext
+        
+        # 行情到下单、下单到回报的延迟统计
+        self.latency = LatencyMonitor(logger=self.logger)
+        self.tick_received = 0.0  # 最近一次收到行情的时间（perf_counter）
+        self.tick_thread = None   # 处理行情的线程，只有在该线程中由行情触发的下单才计入行情到下单的延迟
+        
+        # 委托、成交回报由单个分发线程按到达顺序处理
+        self.dispatcher = EventDispatcher('BrokerEvents', maxsize=1000, logger=self.logger)
+        # 先于异步下单回报到达的委托、成交回报：委托号 -> [(处理函数, 回报), ...]，只在分发线程中访问
+        self.early_events = {}
+        
+        # 策略状态快照，重启交易线程或程序后同一交易日内从快照恢复
+        self.snapshot = StateSnapshot(logger=self.logger)
         
     def connect(self):
         """
@@ -186,7 +245,9 @@ class LiveEngine(TradeEngine):
                 self.logger.error(f"订阅交易回调失败，错误码: {subscribe_result}")
                 return subscribe_result
                 
-            # 创建并注册回调对象
+            # 启动回报分发线程，创建并注册回调对象
+            self.dispatcher.start()
+            self.order_manager.start(self.on_order_expired)
             callback = MyXtQuantTraderCallback(self)
             self.xt_trader.register_callback(callback)
             
@@ -199,37 +260,40 @@ class LiveEngine(TradeEngine):
 
     def update_asset_positions(self):
         """
-        更新账户资金和持仓信息
+        从柜台查询资金和持仓，与本地账本对账并以柜台数据为准
         Returns:
             bool: 更新是否成功
         """
         try:
-            # 更新资金信息
             asset = self.xt_trader.query_stock_asset(self.account)
-            if asset:
-                self.cash = asset.cash
-                self.frozen_cash = asset.frozen_cash
-                self.market_value = asset.market_value
-                self.total_asset = asset.total_asset
-                
-            # 更新持仓信息
             positions = self.xt_trader.query_stock_positions(self.account)
-            if positions:
-                self.positions.clear()
-                for pos in positions:
-                    self.positions[pos.stock_code] = {
-                        'volume': pos.volume,
-                        'can_use_volume': pos.can_use_volume,
-                        'open_price': round(pos.open_price, 3),
-                        'market_value': pos.market_value
-                    }
-
+            self.position_book.reconcile(asset, positions)
+            self.last_reconcile = time.monotonic()
+            self.signals.positions.emit()
             return True
             
         except Exception as e:
             self.logger.error(f"更新账户信息失败: {str(e)}")
             return False
 
+    def reconcile_if_due(self):
+        """
+        距上次对账超过reconcile_interval秒时请求与柜台对账，否则直接使用本地账本
+        
+        柜台查询在回报分发线程中执行，不阻塞调用方（界面线程），对账完成后发出positions信号。
+        """
+        if time.monotonic() - self.last_reconcile < self.reconcile_interval:
+            return
+        self.request_position_refresh()
+
+    def request_position_refresh(self):
+        """
+        请求从柜台刷新资金和持仓
+        
+        刷新排在已到达的回报之后执行，队列中已有未执行的刷新时不再重复查询。
+        """
+        self.dispatcher.submit_coalesced('asset_positions', self.update_asset_positions)
+
     def set_strategy(self, strategy):
         """
         设置交易策略
@@ -239,6 +303,154 @@ class LiveEngine(TradeEngine):
         self.strategy = strategy
         #self.logger.info(f"设置策略: {strategy.__class__.__name__}")
 
+    def add_symbol(self, stock_code, target_position=0, context=None):
+        """
+        增加一只交易股票，与其他股票共用交易连接、行情订阅和资金持仓账本
+        
+        用法：context = engine.add_symbol(code, target)，
+        再用context作为engine创建策略，最后context.set_strategy(strategy)。
+        也可以先创建SymbolContext(engine, code, target)并设置好策略，确认无误后再传入context加入引擎。
+        Args:
+            stock_code (str): 股票代码
+            target_position (int): 目标持仓量
+            context (SymbolContext): 事先创建的上下文，None表示新建或沿用已有的上下文
+        Returns:
+            SymbolContext: 该股票的交易上下文
+        """
+        if context is not None:
+            context.set_target_position(target_position)
+            self.contexts[stock_code] = context
+            return context
+        context = self.contexts.get(stock_code)
+        if context is None:
+            context = SymbolContext(self, stock_code, target_position)
+            self.contexts[stock_code] = context
+        else:
+            context.set_target_position(target_position)
+        return context
+
+    def remove_symbol(self, stock_code):
+        """
+        停止交易一只股票
+        Args:
+            stock_code (str): 股票代码
+        Returns:
+            SymbolContext: 被移除的上下文，不存在时返回None
+        """
+        return self.contexts.pop(stock_code, None)
+
+    def get_context(self, stock_code):
+        """
+        获取股票的交易上下文：多股票模式下为SymbolContext，单股票模式下为引擎本身
+        Args:
+            stock_code (str): 股票代码
+        Returns:
+            交易上下文，不在交易中时返回None
+        """
+        context = self.contexts.get(stock_code)
+        if context is None and stock_code == self.stock_code:
+            context = self
+        return context
+
+    def subscribed_codes(self):
+        """需要订阅行情的全部股票代码"""
+        codes = list(self.contexts)
+        if self.stock_code and self.stock_code not in self.contexts:
+            codes.append(self.stock_code)
+        return codes
+
+    def iter_strategies(self):
+        """遍历所有股票的策略"""
+        if self.strategy is not None:
+            yield self.strategy
+        for context in list(self.contexts.values()):
+            if context.strategy is not None:
+                yield context.strategy
+
+    def best_quotes(self, stock_code):
+        """
+        获取股票最新的买一价和卖一价（由该股票的策略在每个tick写入）
+        Args:
+            stock_code (str): 股票代码
+        Returns:
+            tuple: (买一价, 卖一价)
+        """
+        context = self.get_context(stock_code) or self
+        return context.bidPrices[0], context.askPrices[0]
+
+    def set_target_position(self, target_position):
+        """
+        设置目标持仓量
+        Args:
+            target_position (int): 目标持仓量
+        """
+        self.target_position = target_position
+
+    def iter_contexts(self):
+        """遍历所有设置了策略的 (股票代码, 交易上下文)"""
+        if self.strategy is not None and self.stock_code:
+            yield self.stock_code, self
+        for stock_code, context in list(self.contexts.items()):
+            if context.strategy is not None:
+                yield stock_code, context
+
+    def get_state(self):
+        """
+        获取需要保存到快照的引擎和策略状态
+        Returns:
+            dict: 交易日和每只股票的策略名称、目标仓位、策略状态
+        """
+        symbols = {}
+        for stock_code, context in self.iter_contexts():
+            symbols[stock_code] = {
+                'strategy': context.strategy.__class__.__name__,
+                'target_position': context.target_position,
+                'state': context.strategy.get_state(),
+            }
+        return {'trading_date': self.trading_date, 'day_index': self.day_index, 'symbols': symbols}
+
+    def save_state(self):
+        """把当前状态写入快照（交易日尚未开始时不写，避免覆盖当日的有效快照）"""
+        if self.trading_date is None:
+            return False
+        return self.snapshot.save(self.get_state())
+
+    def on_strategy_state_changed(self, strategy):
+        """
+        策略状态变化时更新快照
+        
+        写文件交给回报分发线程执行，不占用行情处理时间；队列中已有未执行的写入时不再重复排队。
+        Args:
+            strategy: 状态变化的策略实例
+        """
+        self.dispatcher.submit_coalesced('state_snapshot', self.save_state)
+
+    def restore_state(self):
+        """
+        从快照恢复当日的策略状态（在设置策略之后、启动交易线程之前调用）
+        
+        只恢复今天的快照中策略类型相同的股票；恢复后引擎直接进入快照的交易日，
+        首条行情不再触发换日，策略沿用快照中的买卖点继续交易。
+        Returns:
+            list: 恢复了状态的股票代码
+        """
+        data = self.snapshot.load()
+        if not data or data.get('trading_date') != datetime.now().strftime('%Y%m%d'):
+            return []
+        restored = []
+        saved_symbols = data.get('symbols', {})
+        for stock_code, context in self.iter_contexts():
+            saved = saved_symbols.get(stock_code)
+            if not saved or saved.get('strategy') != context.strategy.__class__.__name__:
+                continue
+            context.strategy.set_state(saved.get('state', {}))
+            restored.append(stock_code)
+        if restored and self.day_index is None:
+            self.begin_trading_day(data['day_index'])
+        if restored:
+            self.logger.info(f"已从状态快照恢复{len(restored)}只股票的策略状态: {', '.join(restored)}（快照时间 {data.get('saved_at')}）")
+        return restored
+
     '''def smart_order_price(self, direction, best_bid, best_ask, tick_size):
         """改进后的智能定价策略（固定1分钱+动态调整）"""        
         # 基础滑点设置
@@ -299,40 +511,25 @@ class LiveEngine(TradeEngine):
             tuple: (bool, str) 交易是否成功及消息
         """
         try:
-            # 根据股票代码设置滑点
-            if stock_code.startswith('1') or stock_code.startswith('5'):
-                self.slippage = 0.001
-            else:
-                self.slippage = 0.01
+            decided = time.perf_counter()
+            if self.tick_driven():
+                self.latency.record(stock_code, METRIC_DECISION, decided - self.tick_received)
+
+            # 根据股票代码设置滑点（一个最小报价单位）
+            self.slippage = self.get_instrument(stock_code).tick_size
 
             # 获取智能定价
-            dynamic_price = self.calculate_order_price('live', 'buy', stock_code, self.bidPrices[0], self.askPrices[0], self.slippage)
+            best_bid, best_ask = self.best_quotes(stock_code)
+            dynamic_price = self.calculate_order_price('live', 'buy', stock_code, best_bid, best_ask, self.slippage)
+            self.latency.record(stock_code, METRIC_PRICING, time.perf_counter() - decided)
             if not dynamic_price:
                 self.logger.warning(f"股票代码：{stock_code}，无法获取实时价格，未能买入")
                 return False, f"股票代码：{stock_code}，无法获取实时价格，未能买入"#super().buy(stock_code, price, volume, datetime)
                 
             self.logger.info(f"股票代码：{stock_code}，智能买入定价: {dynamic_price} (基准价: {price})，买入数量: {volume}")
             
-            # 发送限价单
-            order_id = self.xt_trader.order_stock(
-                account=self.account,
-                stock_code=stock_code,
-                order_type=xtconstant.STOCK_BUY,
-                order_volume=int(volume),
-                price_type=xtconstant.FIX_PRICE,  # 改为限价单
-                price=dynamic_price,
-                strategy_name="岳教授日内交易",
-                order_remark=stock_code
-            )
-            
-            # 记录活跃订单
-            self.active_orders[order_id] = {
-                'retry_count': 0,
-                'direction': 'buy',
-                'stock_code': stock_code,
-                'volume': volume,
-                'base_price': price
-            }
+            # 发送限价单（异步模式下order_id为请求序号）
+            order_id = self.submit_order('buy', stock_code, price, volume, dynamic_price)
             
             # 记录交易
             trade = {
@@ -345,12 +542,15 @@ class LiveEngine(TradeEngine):
                 'order_id': order_id
             }
             
-            if order_id > 0:
+            if order_id > 0 and self.async_order:
+                self.logger.info(f"股票代码: {stock_code}, 买入委托已发送，请求序号: {order_id}，智能定价: {dynamic_price}")
+                return True, "买入成功"
+            elif order_id > 0:
                 self.logger.info(f"股票代码: {stock_code}, 买入委托成功，委托号: {order_id}")
                 return True, "买入成功"
             else:
                 self.logger.error(f"股票代码: {stock_code}, 买入委托失败，错误码: {order_id}")
-                return False, "买入失败"    
+                return False, "买入失败"
                 
         except Exception as e:
             self.logger.error(f"股票代码：{stock_code}，买入委托异常: {str(e)}")
@@ -368,40 +568,25 @@ class LiveEngine(TradeEngine):
             tuple: (bool, str) 交易是否成功及消息
         """
         try:
-            # 根据股票代码设置滑点
-            if stock_code.startswith('1') or stock_code.startswith('5'):
-                self.slippage = 0.001
-            else:
-                self.slippage = 0.01
+            decided = time.perf_counter()
+            if self.tick_driven():
+                self.latency.record(stock_code, METRIC_DECISION, decided - self.tick_received)
+
+            # 根据股票代码设置滑点（一个最小报价单位）
+            self.slippage = self.get_instrument(stock_code).tick_size
 
             # 获取智能定价
-            dynamic_price = self.calculate_order_price('live', 'sell', stock_code, self.bidPrices[0], self.askPrices[0], self.slippage)
+            best_bid, best_ask = self.best_quotes(stock_code)
+            dynamic_price = self.calculate_order_price('live', 'sell', stock_code, best_bid, best_ask, self.slippage)
+            self.latency.record(stock_code, METRIC_PRICING, time.perf_counter() - decided)
             if not dynamic_price:
                 self.logger.warning(f"股票代码：{stock_code}，无法获取实时价格，未能卖出")
                 return False, f"股票代码：{stock_code}，无法获取实时价格，未能卖出"#super().sell(stock_code, price, volume, datetime)
             
             self.logger.info(f"股票代码：{stock_code}，智能卖出定价: {dynamic_price} (基准价: {price})，卖出数量: {volume}")
                 
-            # 发送限价单
-            order_id = self.xt_trader.order_stock(
-                account=self.account,
-                stock_code=stock_code,
-                order_type=xtconstant.STOCK_SELL,
-                order_volume=int(volume),
-                price_type=xtconstant.FIX_PRICE,  # 改为限价单
-                price=dynamic_price,
-                strategy_name="岳教授日内交易",
-                order_remark=stock_code
-            )
-            
-            # 记录活跃订单
-            self.active_orders[order_id] = {
-                'retry_count': 0,
-                'direction': 'sell',
-                'stock_code': stock_code,
-                'volume': volume,
-                'base_price': price
-            }
+            # 发送限价单（异步模式下order_id为请求序号）
+            order_id = self.submit_order('sell', stock_code, price, volume, dynamic_price)
             
             # 记录交易
             trade = {
@@ -413,8 +598,11 @@ class LiveEngine(TradeEngine):
                 'status': '已提交',
                 'order_id': order_id
             }
-                
-            if order_id > 0:
+            
+            if order_id > 0 and self.async_order:
+                self.logger.info(f"股票代码: {stock_code}, 卖出委托已发送，请求序号: {order_id}，智能定价: {dynamic_price}")
+                return True, "卖出成功"
+            elif order_id > 0:
                 self.logger.info(f"股票代码: {stock_code}, 卖出委托成功，委托号: {order_id}，智能定价: {dynamic_price}（当前价: {price}）")
                 return True, "卖出成功"
             else:
@@ -425,6 +613,134 @@ class LiveEngine(TradeEngine):
             self.logger.error(f"股票代码：{stock_code}，卖出委托异常: {str(e)}")
             return False, f"股票代码：{stock_code}，卖出异常: {str(e)}"
 
+    def submit_order(self, direction, stock_code, price, volume, dynamic_price, retry_count=0):
+        """
+        发送限价委托并登记跟踪
+        
+        异步模式下调用order_stock_async后立即返回请求序号，不等待柜台往返；
+        同步模式下调用order_stock，返回委托号。
+        Args:
+            direction (str): 'buy'或'sell'
+            stock_code (str): 股票代码
+            price (float): 策略给出的基准价
+            volume (int): 委托数量
+            dynamic_price (float): 实际委托价
+            retry_count (int): 已重试次数
+        Returns:
+            int: 请求序号或委托号，小于等于0表示发送失败
+        """
+        order_type = xtconstant.STOCK_BUY if direction == 'buy' else xtconstant.STOCK_SELL
+        send = self.xt_trader.order_stock_async if self.async_order else self.xt_trader.order_stock
+        with self.submit_lock:
+            started = time.perf_counter()
+            result = send(
+                account=self.account,
+                stock_code=stock_code,
+                order_type=order_type,
+                order_volume=int(volume),
+                price_type=xtconstant.FIX_PRICE,  # 限价单
+                price=dynamic_price,
+                strategy_name="岳教授日内交易",
+                order_remark=stock_code
+            )
+            finished = time.perf_counter()
+            if result > 0:
+                if self.async_order:
+                    key = self.order_manager.add_pending(result, direction, stock_code, volume, price, dynamic_price, retry_count)
+                else:
+                    key = self.order_manager.add_active(result, direction, stock_code, volume, price, dynamic_price, retry_count)
+        self.latency.record(stock_code, METRIC_SUBMIT, finished - started)
+        if retry_count == 0 and self.tick_driven():
+            # 撤单重下的委托在回报分发线程中发出，与最近一次行情无关，不计入
+            self.latency.record(stock_code, METRIC_TICK_TO_ORDER, finished - self.tick_received)
+        if result <= 0:
+            return result
+        
+        self.position_book.on_order_submitted(key, stock_code, direction, dynamic_price, int(volume))
+        self.signals.positions.emit()
+        return result
+
+    def on_order_async_response(self, response):
+        """
+        处理异步下单回报：把请求序号对应的委托改用委托号跟踪
+        Args:
+            response: XtOrderResponse对象
+        """
+        if response.order_id > 0:
+            with self.submit_lock:  # 等待正在发送的委托登记完请求序号
+                record = self.order_manager.confirm(response.seq, response.order_id)
+            if record is None:
+                return
+            self.position_book.rename_order(pending_key(response.seq), response.order_id)
+            elapsed = self.order_manager.stamp(response.order_id, METRIC_ACK)
+            if elapsed is not None:
+                self.latency.record(record['stock_code'], METRIC_ACK, elapsed)
+            self.logger.info(f"股票代码: {record['stock_code']}, 委托已确认，请求序号: {response.seq}，委托号: {response.order_id}")
+            self.replay_early_events(response.order_id)
+        else:
+            self.reject_pending_order(response.seq, getattr(response, 'error_msg', ''))
+
+    def defer_if_unconfirmed(self, handler, event):
+        """
+        委托、成交回报可能先于异步下单回报到达，此时委托号还没有对应到请求序号，
+        按未知委托处理会把卖出成交当作手工委托重复扣减可用持仓。
+        同一股票有等待委托号的委托时先暂存这类回报，取得委托号后按到达顺序重放。
+        Args:
+            handler: 回报处理函数
+            event: 委托或成交回报（有order_id和stock_code属性）
+        Returns:
+            bool: 是否已暂存
+        """
+        order_id = event.order_id
+        if order_id in self.early_events:
+            self.early_events[order_id].append((handler, event))
+            return True
+        if self.order_manager.get(order_id) is not None or not self.order_manager.has_pending(event.stock_code):
+            return False
+        self.early_events[order_id] = [(handler, event)]
+        return True
+
+    def replay_early_events(self, order_id=None):
+        """
+        重放暂存的回报：先重放刚取得委托号的委托，没有等待委托号的委托后，
+        剩下的回报不属于本程序的异步委托（如手工下单），按到达顺序正常处理
+        Args:
+            order_id (int): 刚取得委托号的委托号，None表示只检查剩余回报
+        """
+        for handler, event in self.early_events.pop(order_id, ()):
+            handler(event, replay=True)
+        if self.early_events and self.order_manager.pending_count() == 0:
+            early_events, self.early_events = self.early_events, {}
+            for events in early_events.values():
+                for handler, event in events:
+                    handler(event, replay=True)
+
+    def on_order_error_callback(self, order_error):
+        """
+        处理委托失败推送：异步委托被拒绝时释放冻结
+        Args:
+            order_error: XtOrderError对象
+        """
+        seq = getattr(order_error, 'seq', 0)
+        if seq:
+            self.reject_pending_order(seq, order_error.error_msg)
+
+    def reject_pending_order(self, seq, error_msg=''):
+        """
+        异步委托未能取得委托号：移除跟踪并释放冻结
+        Args:
+            seq (int): 请求序号
+            error_msg (str): 错误信息
+        """
+        with self.submit_lock:
+            record = self.order_manager.reject(seq)
+        if record is None:
+            return
+        self.position_book.on_order_status(pending_key(seq), 57, 0)  # 按废单释放
+        self.signals.positions.emit()
+        self.logger.error(f"股票代码: {record['stock_code']}, 委托失败，请求序号: {seq}，{error_msg}")
+        self.replay_early_events()
+
     def get_open_price(self, symbol):
         """
         获取指定股票的持仓成本价
@@ -449,23 +765,62 @@ class LiveEngine(TradeEngine):
             return self.positions[symbol]['can_use_volume']
         return 0
 
-    def on_tick(self, tick_data):
+    def on_tick(self, tick_data, received=None):
         """
         处理实时行情数据
+        
+        行情按股票代码组织（单股订阅和批量订阅都是这种格式），按代码直接查找交易上下文分发给对应策略。
         Args:
-            tick_data (dict): 行情数据字典
+            tick_data (dict): 股票代码 -> tick列表（subscribe_quote）或tick（subscribe_whole_quote）
+            received (float): 收到行情的perf_counter时间，None表示当前时间
         """
-        if self.strategy is None:
-            return
-            
-        for stock_code in tick_data:
-            if stock_code == self.stock_code:
-                tick_data = tick_data[stock_code][0]
-                current_price = float(tick_data['lastPrice'])
-                self.strategy.on_tick(tick_data)
-                break
-        message = f"最新价：{current_price:.3f}" if self.stock_code.startswith(('1', '5')) else f"最新价：{current_price:.2f}"
-        self.signals.status.emit(message)
+        self.tick_received = received or time.perf_counter()
+        self.tick_thread = threading.get_ident()
+        for stock_code, ticks in tick_data.items():
+            context = self.get_context(stock_code)
+            if context is None or context.strategy is None:
+                continue
+            tick = ticks[0] if isinstance(ticks, list) else ticks
+            # 只有交易日才会推送行情，收到新一天的第一条行情即切换交易日
+            tick_day = day_index(tick['time'])
+            if tick_day != self.day_index:
+                self.switch_trading_day(tick_day)
+            # 每个tick只计算一次盘口特征，策略信号和风控检查共用
+            context.book_features = compute_tick_features(tick)
+            tick.update(context.book_features)
+            context.strategy.on_tick(tick)
+            if context is self:
+                message = f"最新价：{float(tick['lastPrice']):.{self.get_instrument(stock_code).precision}f}"
+                self.signals.status.emit(message)
+        self.latency.maybe_report()
+
+    def tick_driven(self):
+        """当前调用是否由行情触发（在处理行情的线程中），只有这时才统计从收到行情开始的延迟"""
+        return bool(self.tick_received) and threading.get_ident() == self.tick_thread
+
+    def switch_trading_day(self, new_day_index):
+        """
+        切换交易日：通知策略前一交易日结束，本地按T+1结算持仓，再通知策略新交易日开始
+        
+        在处理行情的线程中调用，柜台查询交给回报分发线程执行，不阻塞行情处理。
+        只有真正跨日（之前已有交易日）才在本地结算持仓；进程启动后的首条行情沿用启动时
+        从柜台加载的持仓，其中当日买入的部分仍不可卖。
+        
+        Args:
+            new_day_index (int): 新交易日的日序号
+        """
+        strategies = list(self.iter_strategies())
+        rollover = self.trading_date is not None
+        if rollover:
+            for strategy in strategies:
+                strategy.on_day_close(self.trading_date)
+        self.begin_trading_day(new_day_index)
+        if rollover:
+            self.position_book.settle_day()
+        self.request_position_refresh()
+        self.logger.info(f"新交易日: {self.trading_date}")
+        for strategy in strategies:
+            strategy.on_day_open(self.trading_date)
 
     def on_order(self, order_data):
         """
@@ -497,11 +852,29 @@ class LiveEngine(TradeEngine):
         """
         self.main_window = main_window
 
-    def on_order_callback(self, order):
+    def on_order_callback(self, order, replay=False):
         """
         处理订单状态变化回调
+        Args:
+            order: XtOrder对象
+            replay (bool): 是否为暂存后重放的回报
         """
-        if self.stock_code is None or order.stock_code != self.stock_code:
+        if not replay and self.defer_if_unconfirmed(self.on_order_callback, order):
+            return
+        # 本程序的委托进入终态时释放冻结（账本只处理自己提交的委托）
+        self.position_book.on_order_status(order.order_id, order.order_status, order.traded_volume)
+        if order.order_status in FINAL_ORDER_STATUS:
+            self.signals.positions.emit()
+        # 同步下单时以首个委托回报作为柜台确认
+        elapsed = self.order_manager.stamp(order.order_id, METRIC_ACK)
+        if elapsed is not None:
+            self.latency.record(order.stock_code, METRIC_ACK, elapsed)
+        # 委托进入终态后结束跟踪；因超时撤单的委托撤单完成后重下剩余数量
+        if order.order_status in FINAL_ORDER_STATUS:
+            record = self.order_manager.finish(order.order_id)
+            if record is not None and record['cancelling'] and order.order_status in (53, 54):
+                self.retry_order(record, order.order_volume - order.traded_volume)
+        if self.get_context(order.stock_code) is None:
             return
         try:
             # 状态
@@ -533,40 +906,22 @@ class LiveEngine(TradeEngine):
                                        Qt.QueuedConnection,
                                        Q_ARG(type(order), order))
             else:
-                self.logger.error(f"委托回报推送没有更新交易记录: {order.order_id}, 股票代码={order.stock_code}, 方向={order.order_type}, 价格={order.price}, 数量={order.order_volume}")
-            
-            # 修改时间差计算部分
-            if order.order_time:
-                # 将时间戳转换为datetime对象（假设order_time是秒级时间戳）
-                try:
-                    order_time = datetime.fromtimestamp(order.order_time)
-                    time_diff = (datetime.now() - order_time).seconds
-                except TypeError:
-                    # 处理可能的毫秒级时间戳
-                    order_time = datetime.fromtimestamp(order.order_time / 1000)
-                    time_diff = (datetime.now() - order_time).seconds
-                
-                self.logger.debug(f"订单时间: {order_time}，当前时间: {datetime.now()}，时间差: {time_diff}秒")
-                
-                # 处理未成交订单
-                if order.order_status in [50, 51, 52] and time_diff > 30:
-                    self.logger.info(f"股票代码：{order.stock_code}，订单{order.order_id}超时未完全成交，尝试撤单重下")
-                    self.retry_order(order.stock_code, order.order_id)
+                # 没有界面（如sim_trader压测）时不需要更新交易记录，只在调试时输出
+                self.logger.debug(f"委托回报推送没有更新交易记录: {order.order_id}, 股票代码={order.stock_code}, 方向={order.order_type}, 价格={order.price}, 数量={order.order_volume}")
             
-            elif order.order_status == 54:  # 已撤单
-                if order.order_id in self.active_orders:
-                    self.logger.info(f"股票代码：{order.stock_code}，订单{order.order_id}已撤单，尝试重下")
-                    self.retry_order(order.stock_code, order.order_id)
         except Exception as e:
             self.logger.error(f"股票代码: {order.stock_code}, 处理订单状态变化出错: {str(e)}")
 
             
-    def on_trade_callback(self, trade_info):
+    def on_trade_callback(self, trade_info, replay=False):
         """
         处理成交回报回调
         Args:
             trade_info: 成交信息对象
+            replay (bool): 是否为暂存后重放的回报
         """
+        if not replay and self.defer_if_unconfirmed(self.on_trade_callback, trade_info):
+            return
         try:
             # 构造成交信息
             trade_data = {
@@ -578,16 +933,24 @@ class LiveEngine(TradeEngine):
                 'order_id': trade_info.order_id
             }
 
-            if trade_data['stock_code'] != self.stock_code:
+            # 所有成交都计入本地账本（包括手工下单），不再逐笔查询柜台
+            self.position_book.on_trade(
+                trade_data['order_id'], trade_data['stock_code'], trade_data['direction'],
+                trade_data['price'], trade_data['volume'],
+                self.get_instrument(trade_data['stock_code']).is_t0
+            )
+            self.signals.positions.emit()
+            elapsed = self.order_manager.stamp(trade_data['order_id'], METRIC_FILL)
+            if elapsed is not None:
+                self.latency.record(trade_data['stock_code'], METRIC_FILL, elapsed)
+
+            if self.get_context(trade_data['stock_code']) is None:
                 #self.logger.info(f"收到{order.stock_code}的委托回报，但当前程序交易的是{self.stock_code}，跳过处理")
                 return
 
             # 记录成交
             self.trades.append(trade_data)
             
-            # 更新账户信息
-            self.update_asset_positions()
-            
             trade_time = datetime.fromtimestamp(trade_data['trade_time']).strftime('%H:%M:%S')
 
             # 记录详细日志
@@ -599,23 +962,75 @@ class LiveEngine(TradeEngine):
         except Exception as e:
             self.logger.error(f"处理成交回报出错: {str(e)}")
 
-    def retry_order(self, order_id):
-        """修改后的重试逻辑（每次增加1分钱）"""
-        if order_id not in self.active_orders:
+    def on_order_expired(self, key):
+        """
+        委托超时（在超时线程中调用），交给回报分发线程撤单，与委托、成交回报保持顺序；
+        一直没有收到异步下单回报的委托按失败处理，释放冻结
+        Args:
+            key: 跟踪键（委托号或pending_key(seq)）
+        """
+        if isinstance(key, tuple):
+            seq = key[1]
+            self.dispatcher.submit(
+                self.reject_pending_order, seq,
+                f"{self.order_manager.pending_timeout}秒内未收到异步下单回报，按失败处理"
+            )
+            return
+        self.dispatcher.submit(self.cancel_stale_order, key)
+
+    def cancel_stale_order(self, order_id):
+        """
+        撤销超时未完成的委托，撤单完成的委托回报到达后再重下
+        Args:
+            order_id (int): 委托号
+        """
+        order_info = self.order_manager.get(order_id)
+        if order_info is None:
+            return
+        order_info['cancelling'] = True
+        self.logger.info(f"股票代码：{order_info['stock_code']}，订单{order_id}超时未完全成交，撤单后重下")
+        result = self.xt_trader.cancel_order_stock_async(self.account, order_id)
+        if result < 0:
+            self.logger.error(f"股票代码：{order_info['stock_code']}，订单{order_id}撤单请求发送失败，错误码: {result}")
+            self.order_manager.reschedule(order_id)
+
+    def on_cancel_failed(self, order_id, error_msg=''):
+        """
+        超时撤单被柜台拒绝：清除撤单标记并重新登记超时，到期后再次撤单重下
+        Args:
+            order_id (int): 委托号
+            error_msg (str): 错误信息
+        """
+        order_info = self.order_manager.get(order_id)
+        if order_info is None or not order_info['cancelling']:
+            return
+        self.logger.error(f"股票代码：{order_info['stock_code']}，订单{order_id}撤单失败，{error_msg}，稍后重新撤单")
+        self.order_manager.reschedule(order_id)
+
+    def retry_order(self, order_info, volume):
+        """
+        按最新盘口重新委托被撤委托的剩余数量（每次重试多加一个最小报价单位）
+        Args:
+            order_info (dict): 被撤委托的跟踪信息
+            volume (int): 剩余未成交数量
+        """
+        stock_code = order_info['stock_code']
+        if volume <= 0:
+            return
+        if order_info['retry_count'] >= self.order_retry_limit:
+            self.logger.warning(f"股票代码：{stock_code}，订单{order_info['order_id']}已重试{order_info['retry_count']}次，不再重下")
             return
-            
-        order_info = self.active_orders[order_id]
         
-        # 每次重试增加1分钱滑点
-        order_info['retry_count'] += 1
-        if order_info['stock_code'].startswith('1') or order_info['stock_code'].startswith('5'):
-            additional_slippage = (order_info['retry_count']+1) * 0.001
-        else:
-            additional_slippage = (order_info['retry_count']+1) * 0.01
+        # 每次重试增加一个最小报价单位的滑点
+        retry_count = order_info['retry_count'] + 1
+        instrument = self.get_instrument(stock_code)
+        additional_slippage = (retry_count + 1) * instrument.tick_size
         
         # 获取最新行情
-        current_bid = self.bidPrices[0]
-        current_ask = self.askPrices[0]
+        current_bid, current_ask = self.best_quotes(stock_code)
+        if not current_bid or not current_ask:
+            self.logger.warning(f"股票代码：{stock_code}，无法获取实时价格，订单{order_info['order_id']}未能重下")
+            return
         
         # 计算新价格
         if order_info['direction'] == 'buy':
@@ -623,14 +1038,12 @@ class LiveEngine(TradeEngine):
         else:
             new_price = current_bid - additional_slippage
         
-        # 价格四舍五入到分
-        if order_info['stock_code'].startswith('1') or order_info['stock_code'].startswith('5'):
-            new_price = round(new_price, 3)
-        else:
-            new_price = round(new_price, 2)
+        # 价格四舍五入到最小报价单位
+        new_price = round(new_price, instrument.precision)
         
         # 重新下单
-        if order_info['direction'] == 'buy':
-            self.buy(order_info['stock_code'], new_price, order_info['volume'], datetime.now())
+        result = self.submit_order(order_info['direction'], stock_code, order_info['base_price'], volume, new_price, retry_count)
+        if result > 0:
+            self.logger.info(f"股票代码：{stock_code}，订单{order_info['order_id']}第{retry_count}次重下，价格: {new_price}，数量: {volume}")
         else:
-            self.sell(order_info['stock_code'], new_price, order_info['volume'], datetime.now())
+            self.logger.error(f"股票代码：{stock_code}，订单{order_info['order_id']}重下失败，错误码: {result}")
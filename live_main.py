@@ -1,6 +1,8 @@
 import sys
 import time
 import logging
+from startup_profile import get_profiler
+get_profiler().install_import_hook()  # 带--profile-startup启动时统计各模块的导入耗时
 from datetime import datetime, timedelta
 import time
 from PyQt5.QtWidgets import (
@@ -19,32 +21,37 @@ from PyQt5.QtWidgets import (
     QPushButton,
     QHBoxLayout,
     QProgressBar,
-    QDateEdit
+    QDateEdit,
+    QCompleter
 )
-from PyQt5.QtGui import QIntValidator, QRegExpValidator, QDoubleValidator
+from PyQt5.QtGui import QIntValidator, QDoubleValidator
 from PyQt5.QtCore import (
     QTimer, QThread, QMetaObject, Q_ARG, pyqtSlot, pyqtSignal,
-    Qt, QRegExp, QPoint
+    Qt, QPoint, QStringListModel
 )
 import xtquant.xttrader as xttrader
 from live_ui import Ui_MainWindow
 from adaptive_limit_strategy import AdaptiveLimitStrategy
 from order_book_strategy import OrderBookStrategy
 from live_engine import LiveEngine
-import math
+from symbol_context import SymbolContext
+from instrument_registry import get_registry, to_qmt_code, PINYIN_SEARCH
+from stock_universe import get_universe
+from latency_monitor import format_us
+from tick_mailbox import TickMailbox
+from tick_archive import TickRecorder
+from tick_watchdog import TickWatchdog, ACTION_RESUBSCRIBE, ACTION_RESTART
+from positions_model import PositionsTableView
+from orders_model import OrdersTableModel, OrdersTableView
+from log_sink import QTextEditHandler
 import xtquant.xtdata as xtdata
 import warnings
 import os
 import pandas as pd
-import akshare as ak
 import io
 import configparser
 import chardet
 from logging.handlers import TimedRotatingFileHandler
-from chncal import *
-import psutil
-import batch_optimizer
-import requests
 import zipfile
 import shutil
 import subprocess
@@ -63,21 +70,7 @@ def symbol2stock(symbol):
     Returns:
         str: QMT格式的股票代码（例如：000001.SZ、600001.SH等）
     """
-    symbol = symbol.strip()
-    
-    if '.SZ' in symbol or '.SH' in symbol or '.BJ' in symbol:
-        return symbol
-        
-    symbol = symbol.zfill(6)
-    
-    if symbol.startswith(('0', '1', '3')):
-        return f"{symbol}.SZ"  # 深交所
-    elif symbol.startswith(('5', '6')):
-        return f"{symbol}.SH"  # 上交所
-    elif symbol.startswith(('4', '8')):
-        return f"{symbol}.BJ"  # 北交所
-    else:
-        raise ValueError(f"无效的股票代码: {symbol}")
+    return to_qmt_code(symbol)
     
 def list_top_level(dir_path):
     """
@@ -127,16 +120,24 @@ def copy_files(source_dir, target_dir):
 
 class TradingThread(QThread):
     """交易线程"""
-    def __init__(self, engine):
+    def __init__(self, engine, recorder=None, watchdog=None, max_tick_age=3.0):
         super().__init__()
         self.engine = engine
+        self.recorder = recorder  # tick记录器，None表示不记录
+        self.watchdog = watchdog  # 行情断流检测，None表示不检测
         self.logger = logging.getLogger('LiveTrade')
         self.is_running = False
+        # 行情回调只把最新行情放进信箱，由策略线程处理，行情等待超过max_tick_age秒则跳过
+        self.mailbox = TickMailbox(self.engine.on_tick, name='TickWorker', max_age=max_tick_age, logger=self.logger)
         
     def on_data(self, data):
-        """处理数据"""        
+        """处理数据（在行情回调线程中调用，不等待策略处理）"""        
         try:
-            self.engine.on_tick(data)
+            if self.watchdog is not None:
+                self.watchdog.feed_all(data)
+            if self.recorder is not None:
+                self.recorder.record_all(data)
+            self.mailbox.put_all(data)
         except Exception as e:
             self.logger.error(f"处理数据出错: {str(e)}")
             
@@ -161,16 +162,10 @@ class TradingThread(QThread):
             # 如果已有seq属性，先取消订阅
             if hasattr(self, 'seq'):
                 xtdata.unsubscribe_quote(self.seq)
+            self.mailbox.start()
 
             # 初始化seq属性
-            self.seq = xtdata.subscribe_quote(
-                self.engine.stock_code, 
-                period=period, 
-                start_time='', 
-                end_time='', 
-                count=0,
-                callback=self.on_data
-            )
+            self.seq = self.subscribe(period)
             
             if self.seq <= 0:
                 self.logger.error(f"股票代码：{self.engine.stock_code}订阅行情失败")
@@ -183,20 +178,36 @@ class TradingThread(QThread):
             self.is_running = False
             
             
+    def subscribe(self, period):
+        """
+        订阅引擎交易的全部股票的行情
+        
+        引擎同时交易多只股票时用一次subscribe_whole_quote批量订阅，
+        行情按股票代码推送，由引擎按代码分发给各自的策略。
+        Args:
+            period (str): 行情周期
+        Returns:
+            int: 订阅号，小于等于0表示失败
+        """
+        codes = self.engine.subscribed_codes()
+        if len(codes) > 1:
+            return xtdata.subscribe_whole_quote(codes, callback=self.on_data)
+        return xtdata.subscribe_quote(
+            codes[0] if codes else self.engine.stock_code, 
+            period=period, 
+            start_time='', 
+            end_time='', 
+            count=0,
+            callback=self.on_data
+        )
+
     def resubscribe(self):
         """重新订阅行情"""
         try:
             if hasattr(self, 'seq'):
                 xtdata.unsubscribe_quote(self.seq)
             
-            self.seq = xtdata.subscribe_quote(
-                self.engine.stock_code, 
-                period='tick',
-                start_time='', 
-                end_time='', 
-                count=0,
-                callback=self.on_data
-            )
+            self.seq = self.subscribe('tick')
             
             if self.seq <= 0:
                 self.logger.error("重新订阅行情失败")
@@ -211,6 +222,8 @@ class TradingThread(QThread):
         self.is_running = False
         if hasattr(self, 'seq'):
             xtdata.unsubscribe_quote(self.seq)
+        self.mailbox.stop()
+        self.mailbox.log_stats()
 
         if self.engine.stock_code in self.engine.positions:
             pos = self.engine.positions[self.engine.stock_code]
@@ -256,6 +269,7 @@ class OptimizationThread(QThread):
     
     def run(self):
         """线程运行函数"""
+        import batch_optimizer  # 依赖回测和openpyxl，用到时再导入
         # 使用新的单进程优化方法
         batch_optimizer.batch_optimize_single_process(
             input_file=self.file_path, 
@@ -302,6 +316,7 @@ class UpgradeThread(QThread):
             # 下载
             self.logger.info("开始下载")
             url = f"https://github.com/mayicome/yuejiaoshourinei/archive/refs/tags/{self.latest_version}.zip"
+            import requests
             response = requests.get(url)
             with open(f"{self.latest_version}.zip", "wb") as f:
                 f.write(response.content)
@@ -377,55 +392,21 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         
         # 初始化变量
         self.trading_thread = None
-        self.last_trading_heartbeat = time.time()  # 初始化心跳时间
+        # 交易接口和交易引擎在窗口显示后由finish_startup()创建
+        self.xt_trader = None
+        self.engine = None
+        self.init_thread = None
+        self.tick_recorder = None
+        # 按股票检测行情断流，由行情回调直接记录到达时间
+        self.tick_watchdog = TickWatchdog(logger=logging.getLogger('LiveTrade'))
         
-        # 初始化持仓更新定时器
+        # 初始化对账定时器（持仓表格由持仓变化信号更新）
         self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_positions_table)
+        self.update_timer.timeout.connect(self.refresh_positions)
         
         # 添加独立的心跳检测定时器，不受交易异常影响
         self.heartbeat_timer = QTimer()
         self.heartbeat_timer.timeout.connect(self.check_trading_status)
-        self.heartbeat_timer.start(5000)  # 每5秒检查一次交易状态
-        
-        # 先初始化交易接口
-        self.init_trading_interface()  # 新增初始化方法
-        
-        # 再创建engine
-        self.engine = LiveEngine(
-            xt_trader=self.xt_trader, 
-            account_id=self.account  # 使用从config读取的account
-        )
-        
-        # 设置主窗口引用到engine
-        self.engine.set_main_window(self)  
-
-        # 创建交易初始化线程
-        self.init_thread = InitTradingThread(self.engine)
-
-        
-        # 创建自定义日志处理器类
-        class QTextEditHandler(logging.Handler):
-            """自定义日志处理器，将日志输出到QTextEdit"""
-            def __init__(self, text_edit, max_lines=1000):
-                super().__init__()
-                self.text_edit = text_edit
-                self.max_lines = max_lines
-
-            def emit(self, record):
-                msg = self.format(record)
-                # 使用信号在主线程中更新UI
-                QMetaObject.invokeMethod(self.text_edit, 
-                                       "append",
-                                       Qt.QueuedConnection,
-                                       Q_ARG(str, msg))
-                # 检查行数并删除旧的行
-                if self.text_edit.document().lineCount() > self.max_lines:
-                    cursor = self.text_edit.textCursor()
-                    cursor.movePosition(cursor.Start)
-                    cursor.movePosition(cursor.Down, cursor.KeepAnchor, 
-                                      self.text_edit.document().lineCount() - self.max_lines)
-                    cursor.removeSelectedText()
         
         # 设置日志
         logger = logging.getLogger('LiveTrade')
@@ -459,8 +440,8 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
             file_handler.setFormatter(file_formatter)
             logger.addHandler(file_handler)
             
-            # 添加QTextEdit处理器，设置最大显示1000行
-            text_handler = QTextEditHandler(self.textEdit, max_lines=1000)
+            # 添加QTextEdit处理器，设置最大显示1000行，每100毫秒批量刷新一次
+            text_handler = QTextEditHandler(self.textEdit, max_lines=1000, flush_interval=100)
             text_handler.setLevel(logging.INFO)
             text_formatter = logging.Formatter('%(asctime)s - %(message)s')  # 简化的格式
             text_handler.setFormatter(text_formatter)
@@ -485,21 +466,9 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         self.statusbar.setStyleSheet("QStatusBar { color: black; }")
         self.statusbar.setSizeGripEnabled(False)
 
-        self.all_a_stocks = None
-        self.load_all_stocks_info()
-        
         # 初始化UI
-        self.init_ui()
-        
-        # 连接信号
-        self.init_thread.status_signal.connect(self.statusbar.showMessage)
-        self.engine.signals.status.connect(self.receive_message)
-        
-        # 启动线程
-        self.init_thread.start()
-        
-        # 启动定时更新
-        self.update_timer.start(1000)  # 每秒更新一次
+        with get_profiler().phase('初始化界面'):
+            self.init_ui()
         
         # 创建一个透明的遮罩层
         self.mask_widget = QWidget(self)
@@ -516,6 +485,65 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         self.upgrade_thread = None
         self.progress_label = None
 
+        # 先显示窗口，连接交易接口、加载股票列表等耗时的初始化在首次绘制之后进行，完成前界面不可操作
+        self.centralwidget.setEnabled(False)
+        self.menuBar().setEnabled(False)
+        self.statusbar.showMessage("正在连接交易接口……")
+        QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """窗口显示后完成启动：连接交易接口、创建交易引擎、加载股票列表、更新账户信息"""
+        profiler = get_profiler()
+        QApplication.processEvents()  # 确保窗口已经绘制
+        profiler.mark('首次绘制')
+        if getattr(self, '_closing', False):
+            return
+
+        # 先初始化交易接口
+        with profiler.phase('初始化交易接口'):
+            self.init_trading_interface()
+        
+        # 再创建engine
+        with profiler.phase('创建交易引擎'):
+            self.engine = LiveEngine(
+                xt_trader=self.xt_trader, 
+                account_id=self.account  # 使用从config读取的account
+            )
+            # 设置主窗口引用到engine
+            self.engine.set_main_window(self)
+            # 创建交易初始化线程
+            self.init_thread = InitTradingThread(self.engine)
+
+        with profiler.phase('加载股票列表'):
+            self.load_all_stocks_info()
+        
+        # 连接信号
+        self.init_thread.status_signal.connect(self.statusbar.showMessage)
+        self.engine.signals.status.connect(self.receive_message)
+        self.engine.signals.positions.connect(self.update_positions_table)
+
+        with profiler.phase('更新账户信息'):
+            try:
+                # 更新账户信息
+                if not self.engine.update_asset_positions():
+                    self.logger.error("更新账户信息失败")
+            except Exception as e:
+                self.logger.error(f"初始化交易失败: {str(e)}")
+                import traceback
+                self.logger.error(f"错误详情: {traceback.format_exc()}")
+        
+        # 启动线程
+        self.init_thread.start()
+        
+        # 启动定时更新
+        self.update_timer.start(1000)  # 每秒更新一次
+        self.heartbeat_timer.start(1000)  # 每秒检查一次行情断流
+
+        self.centralwidget.setEnabled(True)
+        self.menuBar().setEnabled(True)
+        profiler.mark('启动完成')
+        profiler.report(self.logger)
+
     def optimization_progress_callback(self, current, total):
         """优化回调函数"""
         self.progress_count = int((current / total) * 100)
@@ -551,16 +579,62 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         if 'setting' not in config:
             self.min_trade_amount = 10000
             self.param_grid = None
+            record_ticks = True
+            self.max_tick_age = 3.0
         else:
             self.min_trade_amount = int(config.get('setting', 'min_trade_amount'))
             param_grid = config.get('setting', 'param_grid')
             self.param_grid = eval(param_grid)
+            record_ticks = config.getboolean('setting', 'record_ticks', fallback=True)
+            # 行情在信箱中等待超过该秒数未处理则跳过
+            self.max_tick_age = config.getfloat('setting', 'max_tick_age', fallback=3.0)
+
+        # 读取symbols部分：与界面所选股票同时交易的其他股票
+        self.extra_symbols = self.read_extra_symbols(config)
+        
+        # 记录实盘收到的tick，供之后的回测直接使用
+        self.tick_recorder = None
+        if record_ticks:
+            self.tick_recorder = TickRecorder(logger=logging.getLogger('LiveTrade'))
+            self.tick_recorder.start()
+
+    def read_extra_symbols(self, config):
+        """
+        读取config.ini中[symbols]部分配置的其他交易股票
+
+        每行一只股票，格式为 股票代码 = 策略, 目标仓位[, 波动阈值]，
+        策略为adaptive_limit（需要波动阈值）或order_book，例如 600000.SH = adaptive_limit, 10000, 0.02
+        Args:
+            config (ConfigParser): 已读取的配置
+        Returns:
+            list: [(股票代码, 策略类型, 目标仓位, 波动阈值), ...]
+        """
+        symbols = []
+        if 'symbols' not in config:
+            return symbols
+        for code, value in config.items('symbols'):
+            parts = [part.strip() for part in value.replace('，', ',').split(',')]
+            try:
+                stock_code = to_qmt_code(code.strip().upper())
+                strategy_type = parts[0]
+                target_position = int(parts[1])
+                threshold = float(parts[2]) if len(parts) > 2 and parts[2] else None
+            except (IndexError, ValueError) as e:
+                self.logger.warning(f"config.ini中[symbols]的 {code} = {value} 格式错误，已忽略: {str(e)}")
+                continue
+            if strategy_type not in ('adaptive_limit', 'order_book'):
+                self.logger.warning(f"config.ini中[symbols]的 {code} 策略 {strategy_type} 不支持，已忽略")
+                continue
+            if strategy_type == 'adaptive_limit' and threshold is None:
+                self.logger.warning(f"config.ini中[symbols]的 {code} 采用浮动限价策略但没有设置波动阈值，已忽略")
+                continue
+            symbols.append((stock_code, strategy_type, target_position, threshold))
+        return symbols
 
     def receive_message(self, message):
         """接收消息"""
         # 更新最后心跳时间
         if "最新价" in message:
-            self.last_trading_heartbeat = time.time()
             self.statusbar.showMessage(message, 2500)
         elif message == "账户连接状态：正常":
             self.statusbar.showMessage(message)
@@ -580,50 +654,16 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         """初始化UI"""
         #self.logger.info("开始初始化UI")
         
-        # 设置交易记录表格
-        self.tableWidget.setColumnCount(8)
-        self.tableWidget.setHorizontalHeaderLabels([
-            '订单编号','报单时间', '股票代码', '交易类型', '委托价格', '数量', '委托状态', '策略名称'
-        ])
-
-        # 设置表格列宽自动调整
-        self.tableWidget.horizontalHeader().setStretchLastSection(True)  # 最后一列自动填充
-        self.tableWidget.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # 所有列自动调整
+        # 设置交易记录表格（按委托号索引行，回报合并刷新，超出上限的旧委托转存到文件）
+        self.orders_model = OrdersTableModel(logger=self.logger, parent=self)
+        self.tableWidget = self.replace_table(self.tableWidget, OrdersTableView(self.orders_model))
         
-        # 设置持仓表格
-        self.tableWidget_2.setColumnCount(6)
-        self.tableWidget_2.setHorizontalHeaderLabels([
-            '股票代码', '股票名称','持仓数量', '可用数量', '成本价', '市值'
-        ])
-        
-        # 设置表格为不可编辑
-        self.tableWidget_2.setEditTriggers(QTableWidget.NoEditTriggers)
-        # 设置整行选择
-        self.tableWidget_2.setSelectionBehavior(QTableWidget.SelectRows)
-        # 设置单行选择
-        self.tableWidget_2.setSelectionMode(QTableWidget.SingleSelection)
-
-        self.tableWidget_2.horizontalHeader().setStretchLastSection(True)  # 最后一列自动填充
-        self.tableWidget_2.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # 所有列自动调整
+        # 设置持仓表格（模型/视图，持仓变化时只重绘变化的单元格）
+        self.tableWidget_2 = self.replace_table(self.tableWidget_2, PositionsTableView(self.get_stock_name))
+        self.tableWidget_3 = self.replace_table(self.tableWidget_3, PositionsTableView(self.get_stock_name))
 
         # 连接选择变化信号
-        self.tableWidget_2.itemSelectionChanged.connect(self.on_position_selected)
-
-        # 设置持仓表格
-        self.tableWidget_3.setColumnCount(6)
-        self.tableWidget_3.setHorizontalHeaderLabels([
-            '股票代码', '股票名称','持仓数量', '可用数量', '成本价', '市值'
-        ])
-        
-        # 设置表格为不可编辑
-        self.tableWidget_3.setEditTriggers(QTableWidget.NoEditTriggers)
-        # 设置整行选择
-        self.tableWidget_3.setSelectionBehavior(QTableWidget.SelectRows)
-        # 设置单行选择
-        self.tableWidget_3.setSelectionMode(QTableWidget.SingleSelection)
-
-        self.tableWidget_3.horizontalHeader().setStretchLastSection(True)  # 最后一列自动填充
-        self.tableWidget_3.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # 所有列自动调整
+        self.tableWidget_2.selectionModel().selectionChanged.connect(self.on_position_selected)
 
         self.current_table = self.tableWidget_2
 
@@ -676,6 +716,11 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         setting_action.triggered.connect(self.show_setting)
         setting_menu.addAction(setting_action)
         
+        # 添加延迟统计动作
+        latency_action = QAction('延迟统计', self)
+        latency_action.triggered.connect(self.show_latency)
+        setting_menu.addAction(latency_action)
+        
         # 添加帮助菜单
         help_menu = menubar.addMenu('帮助')
         
@@ -684,17 +729,6 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         version_action.triggered.connect(self.show_version)
         help_menu.addAction(version_action)
 
-        try:
-            # 更新账户信息
-            if not self.engine.update_asset_positions():
-                self.logger.error("更新账户信息失败")
-                return
-            
-        except Exception as e:
-            self.logger.error(f"初始化交易失败: {str(e)}")
-            import traceback
-            self.logger.error(f"错误详情: {traceback.format_exc()}")
-
     def init_trading(self):
         """初始化交易连接"""
         # 建立交易连接
@@ -765,10 +799,10 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
                 self.get_stock_name(self.engine.stock_code), 
                 start_date, 
                 end_date, 
-                self.current_table.item(self.current_table.currentRow(), 2).text(), 
-                self.current_table.item(self.current_table.currentRow(), 3).text(), 
+                self.current_table.text(self.current_table.currentRow(), 2), 
+                self.current_table.text(self.current_table.currentRow(), 3), 
                 self.lineEdit_2.text(), 
-                self.current_table.item(self.current_table.currentRow(), 4).text(), 
+                self.current_table.text(self.current_table.currentRow(), 4), 
                 self.engine.cash
             ]
         else:
@@ -955,17 +989,37 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         
         layout = QVBoxLayout()
         
-        # 添加标签
-        label = QLabel("请输入6位股票代码：")
+        # 添加标签（未安装pypinyin时不提示按拼音首字母输入）
+        hint = "代码、简称或拼音首字母" if PINYIN_SEARCH else "代码或简称"
+        label = QLabel(f"请输入股票{hint}：")
         layout.addWidget(label)
         
         # 添加单行输入框
         stock_input = QLineEdit()
-        stock_input.setPlaceholderText("例如：600000")
-        stock_input.setMaxLength(6)  # 限制最大输入长度
-        stock_input.setValidator(QRegExpValidator(QRegExp(r'^\d{6}$')))  # 添加起止符更严格
+        stock_input.setPlaceholderText("例如：600000、浦发银行或PFYH" if PINYIN_SEARCH else "例如：600000或浦发银行")
         layout.addWidget(stock_input)
         
+        # 输入时按代码前缀、拼音首字母或简称搜索，下拉列表显示“代码 简称”
+        registry = get_registry()
+        completer_model = QStringListModel(dialog)
+        completer = QCompleter(completer_model, dialog)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        stock_input.setCompleter(completer)
+        
+        def on_text_edited(text):
+            completer_model.setStringList([f"{item.code} {item.name}" for item in registry.search(text)])
+        
+        stock_input.textEdited.connect(on_text_edited)
+        
+        def input_symbol():
+            """取输入内容中的6位代码，输入为简称或拼音时取第一个搜索结果"""
+            text = stock_input.text().strip()
+            code = text.split(' ')[0]
+            if len(code) == 6 and code.isdigit():
+                return code
+            results = registry.search(text, limit=1)
+            return results[0].code if results else ''
+        
         # 添加按钮
         button_box = QHBoxLayout()
         ok_button = QPushButton("确定")
@@ -978,9 +1032,13 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         
         # 连接按钮信号
         def on_ok_clicked():
-            symbol = stock_input.text().strip()
-            if len(symbol) != 6 or not symbol.isdigit():
-                QMessageBox.warning(dialog, "输入错误", "请输入有效的6位数字股票代码")
+            symbol = input_symbol()
+            try:
+                to_qmt_code(symbol)
+            except ValueError:
+                symbol = ''
+            if not symbol:
+                QMessageBox.warning(dialog, "输入错误", f"请输入有效的股票{hint}")
                 return
             
             dialog.accept()
@@ -994,7 +1052,7 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         
         # 显示对话框并获取结果
         if dialog.exec_() == QDialog.Accepted:
-            symbol = stock_input.text().strip()
+            symbol = input_symbol()
             self.logger.info(f"添加股票: {symbol}")
             
             # 更新交易引擎
@@ -1024,7 +1082,7 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
             if self.tableWidget_2.rowCount() == 0:                
                 self.engine.stock_code = None
             else:
-                self.engine.stock_code = self.tableWidget_2.item(0, 0).text()
+                self.engine.stock_code = self.tableWidget_2.text(0, 0)
         elif index == 1:  
             self.current_table = self.tableWidget_3
             self.engine.stock_code = None
@@ -1062,14 +1120,14 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
                 return
 
             # 获取股票代码
-            stock_code = self.current_table.item(current_row, 0).text()
+            stock_code = self.current_table.text(current_row, 0)
             print(f"start stock_code: {stock_code}")
             if not stock_code:
                 QMessageBox.warning(self, "警告", "请先选择要交易的股票！")
                 return
             
             # 检查可用数量
-            can_use_volume = self.current_table.item(current_row, 3).text()
+            can_use_volume = self.current_table.text(current_row, 3)
             if not can_use_volume:
                 QMessageBox.warning(self, "警告", "无法获取可用数量！")
                 return
@@ -1109,29 +1167,14 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
                 QMessageBox.warning(self, "警告", "请先选择策略！")
                 return
             
-            # 创建并设置策略（传入engine参数）
-            if strategy_type == "adaptive_limit":
-                strategy = AdaptiveLimitStrategy(
-                    self.engine, 
-                    threshold=self.threshold, 
-                    trade_size=self.trade_size, 
-                    min_trade_amount=self.min_trade_amount, 
-                    logger=logging.getLogger('LiveTrade')  # 使用主程序的logger
-                )
-            elif strategy_type == "order_book":
-                strategy = OrderBookStrategy(
-                    self.engine, 
-                    bid_vol_threshold=500, 
-                    ask_vol_threshold=300, 
-                    min_trade_amount=self.min_trade_amount, 
-                    logger=logging.getLogger('LiveTrade')  # 使用主程序的logger
-                )
-                self.logger.info(f"使用盘口动量增强策略，买一档成交量阈值为{500},卖一档成交量阈值为{300},最小交易金额为{self.min_trade_amount},最小交易数量为{self.trade_size}")
-            '''elif strategy_type == "event_driven":
-                strategy = EventDrivenStrategy(
-                    self.engine, 
-                    logger=logging.getLogger('LiveTrade')  # 使用主程序的logger
-                )  # 传入engine'''
+            # 先创建全部策略（所选股票和config.ini中配置的其他股票），任何一个出错都不改变界面和引擎状态
+            try:
+                strategy = self.create_strategy(self.engine, strategy_type, self.threshold)
+                extra_contexts = self.build_extra_contexts(stock_code)
+            except Exception as e:
+                self.logger.error(f"创建策略时出错: {str(e)}")
+                QMessageBox.warning(self, "警告", f"创建策略时出错，未开始交易：{str(e)}")
+                return
             self.engine.set_strategy(strategy)
 
             # 禁用表格选择但保持可见
@@ -1150,13 +1193,77 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
             # 设置股票代码
             self.engine.set_stock_code(stock_code)
             self.engine.target_position = target_position
+            
+            # config.ini中配置的其他股票与所选股票在同一个引擎中同时交易
+            for context in extra_contexts:
+                self.engine.add_symbol(context.stock_code, context.target_position, context=context)
+            
+            # 同一交易日内重新开始交易时沿用快照中的买卖点和当日统计
+            self.engine.restore_state()
                         
             # 创建并启动交易线程
-            self.trading_thread = TradingThread(self.engine)
+            self.trading_thread = TradingThread(self.engine, recorder=self.tick_recorder, watchdog=self.tick_watchdog, max_tick_age=self.max_tick_age)
             self.trading_thread.start()
+            self.update_positions_table()
 
         except Exception as e:
             self.logger.error(f"开始交易时出错: {str(e)}")
+            # 交易线程没有启动时恢复界面并移除已加入的其他股票
+            if self.trading_thread is None:
+                self.stop_trading()
+
+    def create_strategy(self, engine, strategy_type, threshold=None):
+        """
+        创建策略实例
+        Args:
+            engine: 交易引擎或某只股票的交易上下文
+            strategy_type (str): 策略类型（adaptive_limit或order_book）
+            threshold (float): 浮动限价策略的波动阈值
+        Returns:
+            策略实例
+        """
+        if strategy_type == "adaptive_limit":
+            return AdaptiveLimitStrategy(
+                engine, 
+                threshold=threshold, 
+                trade_size=self.trade_size, 
+                min_trade_amount=self.min_trade_amount, 
+                logger=logging.getLogger('LiveTrade')  # 使用主程序的logger
+            )
+        if strategy_type == "order_book":
+            strategy = OrderBookStrategy(
+                engine, 
+                bid_vol_threshold=500, 
+                ask_vol_threshold=300, 
+                logger=logging.getLogger('LiveTrade')  # 使用主程序的logger
+            )
+            self.logger.info(f"使用盘口动量增强策略，买一档成交量阈值为{500},卖一档成交量阈值为{300}")
+            return strategy
+        raise ValueError(f"不支持的策略: {strategy_type}")
+
+    def build_extra_contexts(self, stock_code):
+        """
+        为config.ini中[symbols]配置的股票创建交易上下文和策略（尚未加入引擎）
+        
+        加入引擎后与界面所选股票共用交易连接、行情订阅和资金持仓；任何一只的策略创建失败时抛出异常，
+        调用方不改变任何状态。
+        Args:
+            stock_code (str): 界面所选的股票代码（配置中的同一只股票不再重复加入）
+        Returns:
+            list: SymbolContext列表
+        """
+        contexts = []
+        for code, strategy_type, target_position, threshold in self.extra_symbols:
+            if code == stock_code:
+                continue
+            context = SymbolContext(self.engine, code, target_position)
+            try:
+                context.set_strategy(self.create_strategy(context, strategy_type, threshold))
+            except Exception as e:
+                raise ValueError(f"{code}的{strategy_type}策略: {str(e)}") from e
+            self.logger.info(f"同时交易{code}（{self.get_stock_name(code)}），策略: {strategy_type}，目标仓位: {target_position}")
+            contexts.append(context)
+        return contexts
 
     def stop_trading(self):
         """中止交易"""
@@ -1175,6 +1282,12 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
             if hasattr(self, 'trading_thread') and self.trading_thread is not None:
                 self.trading_thread.stop()
                 self.trading_thread = None
+                self.engine.save_state()
+                self.tick_watchdog.log_stats()
+            # 移除config.ini中配置的其他股票，下次开始交易时按最新配置重新加入
+            for code in list(self.engine.contexts):
+                self.engine.remove_symbol(code)
+            self.update_positions_table()
             
         #except Exception as e:
         #    self.logger.error(f"中止交易时出错: {str(e)}")
@@ -1210,6 +1323,18 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
                 self.trading_thread.stop()
                 self.trading_thread.wait(1000)
             
+            # 保存策略状态快照
+            if self.trading_thread:
+                self.engine.save_state()
+            
+            # 委托记录转存到文件
+            if hasattr(self, 'orders_model'):
+                self.orders_model.save_all()
+            
+            # 写完并合并tick存档
+            if getattr(self, 'tick_recorder', None):
+                self.tick_recorder.stop()
+            
             # 停止初始化线程
             if self.init_thread and self.init_thread.isRunning():
                 self.init_thread.terminate()
@@ -1230,7 +1355,7 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
                 widget.reject()
             
             # 强制终止QMT连接
-            if hasattr(self, 'xt_trader'):
+            if self.xt_trader:
                 self.xt_trader.stop()
             
             # 接受关闭事件
@@ -1248,103 +1373,62 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         """处理持仓表格的选择变化"""
         try:
             # 获取当前选中的行
-            selected_rows = self.tableWidget_2.selectedItems()
+            selected_rows = self.tableWidget_2.selectionModel().selectedRows()
             if not selected_rows:
                 return
             
             # 获取选中行的行号
             current_row = selected_rows[0].row()
-            can_use_volume = self.tableWidget_2.item(current_row, 3).text()
+            can_use_volume = self.tableWidget_2.text(current_row, 3)
             
             # 设置收盘目标仓位为可用数量            
             self.lineEdit_2.setText(can_use_volume)
 
-            self.engine.stock_code = self.tableWidget_2.item(current_row, 0).text()
+            self.engine.stock_code = self.tableWidget_2.text(current_row, 0)
             
         except Exception as e:
             self.logger.error(f"处理选择变化时出错: {str(e)}")
 
-    def update_positions_table(self):
-        #try:
-        if True:
-            # 更新账户信息
-            if not self.engine.update_asset_positions():
-                return
-            
-            # 更新持仓表格
-            positions = self.engine.positions
-            current_row = self.current_table.currentRow()  # 保存当前选中的行
-            if current_row < 0 and self.current_table.rowCount() >= 1:
-                current_row = 0
-            
-            pos = None
-            # 如果启动了交易线程
-            if self.trading_thread:
-                # 只显示当前交易股票或占位记录
-                self.current_table.setRowCount(1)
-                # 如果当前交易股票在positions中，则显示，否则显示占位记录
-                if self.engine.stock_code in positions:
-                    pos = positions[self.engine.stock_code]
-                else:
-                    pos = {
-                        'volume': 0,
-                        'can_use_volume': 0,
-                        'open_price': 0.0,
-                        'market_value': 0.0
-                    }
-                stock_code = self.engine.stock_code
-                row = 0
-            else:
-                if self.current_table == self.tableWidget_2:
-                    # 显示全部持仓
-                    self.current_table.setRowCount(len(positions))
-                    stock_items = positions.items()
-                    row = 0  # 初始化row变量
-                elif self.current_table == self.tableWidget_3:
-                    if self.engine.stock_code:
-                        pos = {
-                        'volume': 0,
-                        'can_use_volume': 0,
-                        'open_price': 0.0,
-                        'market_value': 0.0
-                        }
-                        #把这条记录添加到positions中
-                        positions[self.engine.stock_code] = pos
-                        self.current_table.setRowCount(1)
-                    else:# 不显示持仓
-                        self.current_table.setRowCount(0)
-                        stock_items = []
-                        row = 0  # 初始化row变量
-
-            # 统一处理数据显示
-            for row, (stock_code, pos) in enumerate(stock_items if pos is None else [(self.engine.stock_code, pos)]):
-                # 处理各字段的默认值
-                volume = pos.get('volume', 0)
-                can_use_volume = pos.get('can_use_volume', volume)
-                open_price = pos.get('open_price', 0.0)
-                market_value = pos.get('market_value', 0.0)
-
-                # 处理nan值
-                if isinstance(open_price, float) and math.isnan(open_price):
-                    open_price = 0.0
-                if isinstance(market_value, float) and math.isnan(market_value):
-                    market_value = 0.0
-                
-                # 获取股票名称
-                stock_name = self.get_stock_name(stock_code)
-
-                # 设置表格内容
-                self.current_table.setItem(row, 0, QTableWidgetItem(stock_code))
-                self.current_table.setItem(row, 1, QTableWidgetItem(stock_name))
-                self.current_table.setItem(row, 2, QTableWidgetItem(str(volume)))
-                self.current_table.setItem(row, 3, QTableWidgetItem(str(can_use_volume)))
-                self.current_table.setItem(row, 4, QTableWidgetItem(f"{open_price:.3f}"))
-                self.current_table.setItem(row, 5, QTableWidgetItem(f"{market_value:.2f}"))
+    def replace_table(self, table, view):
+        """
+        用表格视图替换界面文件中的QTableWidget
+        Args:
+            table: 界面文件中的表格
+            view: 放在原位置的表格视图
+        Returns:
+            传入的表格视图
+        """
+        view.setParent(table.parentWidget())
+        view.setObjectName(table.objectName())
+        table.parentWidget().layout().replaceWidget(table, view)
+        table.deleteLater()
+        return view
 
-            self.current_table.selectRow(current_row)
+    def refresh_positions(self):
+        """定时检查是否需要与柜台对账（柜台查询在回报分发线程中执行，完成后发出持仓变化信号）"""
+        self.engine.reconcile_if_due()
 
-        #except Exception as e:
-        #    self.logger.error(f"更新显示失败: {str(e)}")
+    def update_positions_table(self):
+        """按本地账本更新当前持仓表格（持仓变化时触发，只更新变化的单元格）"""
+        positions = self.engine.position_book.snapshot()
+        empty = {
+            'volume': 0,
+            'can_use_volume': 0,
+            'open_price': 0.0,
+            'market_value': 0.0
+        }
+        if self.trading_thread:
+            # 交易中只显示当前交易股票，没有持仓时显示占位记录
+            items = [(self.engine.stock_code, positions.get(self.engine.stock_code, empty))]
+        elif self.current_table == self.tableWidget_2:
+            # 显示全部持仓
+            items = list(positions.items())
+        elif self.engine.stock_code:
+            # 自定义股票
+            items = [(self.engine.stock_code, positions.get(self.engine.stock_code, empty))]
+        else:
+            items = []
+        self.current_table.set_positions(items)
 
     @pyqtSlot(object)  # 使用装饰器标记为槽
     def update_order_table(self, order):
@@ -1354,17 +1438,6 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
             order: 订单信息
         """
         try:
-            # 订单编号
-            order_id = str(order.order_id)
-            # 如果在tablewidget中第一列找到order_id，则更新，否则插入新行
-            for row in range(self.tableWidget.rowCount()):
-                if self.tableWidget.item(row, 0).text() == order_id:
-                    current_row = row
-                    break
-            else:
-                current_row = self.tableWidget.rowCount()
-                self.tableWidget.insertRow(current_row)
-            
             # 状态映射
             status_map = {
                 48: "未报",
@@ -1379,98 +1452,30 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
                 57: "废单",
             }
             
-            # 设置各列的值
-            self.tableWidget.setItem(current_row, 0, QTableWidgetItem(str(order.order_id)))
-            self.tableWidget.setItem(current_row, 1, QTableWidgetItem(datetime.now().strftime('%H:%M:%S')))
-            self.tableWidget.setItem(current_row, 2, QTableWidgetItem(order.stock_code))
-            self.tableWidget.setItem(current_row, 3, QTableWidgetItem("买入" if order.order_type == 23 else "卖出"))
-            if order.stock_code.startswith(('1', '5')):
-                self.tableWidget.setItem(current_row, 4, QTableWidgetItem(f"{order.price:.3f}"))
-            else:
-                self.tableWidget.setItem(current_row, 4, QTableWidgetItem(f"{order.price:.2f}"))
-            self.tableWidget.setItem(current_row, 5, QTableWidgetItem(str(order.order_volume)))
-            self.tableWidget.setItem(current_row, 6, QTableWidgetItem(status_map.get(order.order_status, "未知")))
-            self.tableWidget.setItem(current_row, 7, QTableWidgetItem("岳教授日内交易"))
-            
-            # 滚动到最新行
-            self.tableWidget.scrollToBottom()
+            # 按委托号新增或原地更新一行（报单时间留空：新委托取当前时间，已有委托保持不变）
+            precision = get_registry().get(order.stock_code).precision
+            self.orders_model.upsert(order.order_id, [
+                str(order.order_id),
+                '',
+                order.stock_code,
+                "买入" if order.order_type == 23 else "卖出",
+                f"{order.price:.{precision}f}",
+                str(order.order_volume),
+                status_map.get(order.order_status, "未知"),
+                "岳教授日内交易",
+            ])
             
         except Exception as e:
             self.logger.error(f"更新订单表格出错: {str(e)}")
 
     def get_stock_name(self, stock_code):
-        # 查找匹配的股票代码
-        result = self.all_a_stocks[self.all_a_stocks['证券代码'] == stock_code[:6]]
-        if not result.empty:
-            return result['证券简称'].values[0]
-        return "未知名称"
+        return get_registry().get_name(stock_code)
 
     def load_all_stocks_info(self):
-        """加载股票基本信息"""
-        # 确保data目录存在
-        data_dir = os.path.join(os.path.dirname(__file__), 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        
-        # 检查是否存在all_a_stocks.csv文件且是今天创建的
-        csv_file = os.path.join(data_dir, 'all_a_stocks.csv')
-        if os.path.exists(csv_file):
-            # 获取文件的最后修改时间
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(csv_file))
-            today = datetime.now().date()
-            
-            # 如果文件是今天修改的,则直接读取CSV文件
-            if file_mtime.date() == today:
-                try:
-                    self.all_a_stocks = pd.read_csv(csv_file, dtype={'证券代码': str})
-                    self.logger.info(f"已从{csv_file}文件读取全A股股票和基金名称信息")
-                    return
-                except Exception as e:
-                    self.logger.error(f"读取{csv_file}文件时出错: {e}")
-
-        if self.all_a_stocks is None:
-            # 获取沪深京 A 股的基本信息
-            stock_info_sh_name_code_df = ak.stock_info_sh_name_code()
-            # 先创建副本，然后选择需要的列
-            stock_info_sh = stock_info_sh_name_code_df[['证券代码', '证券简称', '上市日期']].copy()
-            # 使用 loc 设置数据类型
-            stock_info_sh.loc[:, '证券代码'] = stock_info_sh['证券代码'].astype(str)
-            
-            stock_info_sz_name_code_df = ak.stock_info_sz_name_code()
-            # 先创建副本，然后选择需要的列
-            stock_info_sz = stock_info_sz_name_code_df[['A股代码', 'A股简称', 'A股上市日期']].copy()
-            # 使用 loc 设置数据类型
-            stock_info_sz.loc[:, 'A股代码'] = stock_info_sz['A股代码'].astype(str)
-            # 重命名列
-            stock_info_sz = stock_info_sz.rename(columns={
-                'A股代码': '证券代码',
-                'A股简称': '证券简称', 
-                'A股上市日期': '上市日期'
-            })
-            
-            stock_info_bj_name_code_df = ak.stock_info_bj_name_code()
-            # 先创建副本，然后选择需要的列
-            stock_info_bj = stock_info_bj_name_code_df[['证券代码', '证券简称', '上市日期']].copy()
-            # 使用 loc 设置数据类型
-            stock_info_bj.loc[:, '证券代码'] = stock_info_bj['证券代码'].astype(str)
-
-            stock_info_jj_name_code_df = ak.fund_etf_spot_em()
-            stock_info_jj = stock_info_jj_name_code_df[['代码', '名称']].copy()
-            # 使用 loc 设置数据类型
-            stock_info_jj.loc[:, '代码'] = stock_info_jj['代码'].astype(str)
-            # 把代码列改为证券代码，把名称改为证券简称
-            stock_info_jj.rename(columns={'代码': '证券代码', '名称': '证券简称'}, inplace=True)
-            # 增加上市日期列，内容为空
-            stock_info_jj['上市日期'] = ''
-            
-            # 合并所有数据
-            self.all_a_stocks = pd.concat([stock_info_sh, stock_info_sz, stock_info_bj, stock_info_jj])
-            
-            # 将所有股票信息写入CSV文件
-            try:
-                self.all_a_stocks.to_csv(csv_file, index=False, encoding='utf-8')
-                self.logger.info(f"已将股票信息写入文件: {csv_file}")
-            except Exception as e:
-                self.logger.error(f"写入{csv_file}文件时出错: {e}")
+        """加载股票基本信息：先用本地缓存（过期也先用），后台并发更新过期的数据源"""
+        universe = get_universe()
+        universe.load()
+        universe.refresh_async()
 
     def get_latest_version(self):
         """通过GitHub API获取最新版本号"""
@@ -1482,6 +1487,7 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
             }
             
+            import requests
             response = requests.get(api_url, headers=headers)
             if response.status_code == 200:
                 # 解析JSON数据获取tag_name
@@ -1574,6 +1580,46 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
             self.check_timer.stop()
             QMessageBox.warning(self, "取消", "升级操作已中止")
 
+    def show_latency(self):
+        """显示行情到下单、下单到回报的延迟统计"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("延迟统计")
+        dialog.setWindowFlags(dialog.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        dialog.resize(700, 400)
+        layout = QVBoxLayout()
+        
+        table = QTableWidget()
+        table.setColumnCount(6)
+        table.setHorizontalHeaderLabels(['股票代码', '指标', '次数', 'p50', 'p99', '最大'])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(table)
+        
+        def refresh():
+            rows = self.engine.latency.rows()
+            table.setRowCount(len(rows))
+            for row, (stock_code, metric, count, p50, p99, max_us) in enumerate(rows):
+                values = [stock_code, metric, str(count), format_us(p50), format_us(p99), format_us(max_us)]
+                for col, value in enumerate(values):
+                    table.setItem(row, col, QTableWidgetItem(value))
+        
+        def reset():
+            self.engine.latency.reset()
+            refresh()
+        
+        button_layout = QHBoxLayout()
+        refresh_button = QPushButton("刷新")
+        refresh_button.clicked.connect(refresh)
+        button_layout.addWidget(refresh_button)
+        reset_button = QPushButton("清空")
+        reset_button.clicked.connect(reset)
+        button_layout.addWidget(reset_button)
+        layout.addLayout(button_layout)
+        
+        dialog.setLayout(layout)
+        refresh()
+        dialog.exec_()
+
     def show_setting(self):
         """显示设置参数"""
         # 打开一个窗口，显示两行内容，一行是：每笔交易最少金额，一行是：每天最多交易次数，分别可以输入正整数
@@ -1743,39 +1789,17 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
         os._exit(1)  # 立即退出
 
     def check_trading_status(self):
-        """检查交易状态"""
-        if self.trading_thread:  # 只在交易启动时检查
-            # 获取当前时间
-            now = datetime.now()
-            current_time = now.time()
-            
-            # 检查是否为交易日（周一到周五）
-            is_trading_day = is_tradeday()
-            
-            # 检查是否在交易时段
-            morning_start = datetime.strptime('09:30:00', '%H:%M:%S').time()
-            morning_end = datetime.strptime('11:30:00', '%H:%M:%S').time()
-            afternoon_start = datetime.strptime('13:00:00', '%H:%M:%S').time()
-            afternoon_end = datetime.strptime('15:00:00', '%H:%M:%S').time()
-            
-            is_trading_hour = (
-                (current_time >= morning_start and current_time <= morning_end) or  # 上午交易时段
-                (current_time >= afternoon_start and current_time <= afternoon_end)  # 下午交易时段
-            )
-            
-            # 只在交易日的交易时段内检查心跳
-            if is_trading_day and is_trading_hour:
-                # 检查是否收到心跳
-                time_since_last_heartbeat = time.time() - self.last_trading_heartbeat
-                
-                # 如果超过60秒没有收到"交易中。。。"的心跳消息
-                if time_since_last_heartbeat > 30:
-                    self.logger.warning(f"检测到交易线程可能已停止 ({time_since_last_heartbeat:.1f}秒无心跳)，尝试重启...")
-                    self.restart_trading()
-                    self.last_trading_heartbeat = time.time()  # 更新心跳时间，否则可能一直重启
-            else:
-                self.last_trading_heartbeat = time.time() #否则交易时段一开始的时候就会重启
-
+        """检查行情断流：先重新订阅行情，仍无行情再重启交易线程"""
+        if not self.trading_thread:  # 只在交易启动时检查
+            return
+        actions = self.tick_watchdog.check(self.engine.subscribed_codes())
+        if not actions:
+            return
+        if any(action == ACTION_RESTART for _, action in actions):
+            self.restart_trading()
+        elif any(action == ACTION_RESUBSCRIBE for _, action in actions):
+            # 所有股票共用一次行情订阅，重新订阅一次即可
+            self.trading_thread.resubscribe()
 
     def restart_trading(self):
         """重启交易"""
@@ -1786,7 +1810,7 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
                 self.trading_thread.wait()  # 等待线程结束
             
             # 重新创建并启动交易线程
-            self.trading_thread = TradingThread(self.engine)
+            self.trading_thread = TradingThread(self.engine, recorder=self.tick_recorder, watchdog=self.tick_watchdog, max_tick_age=self.max_tick_age)
             self.trading_thread.start()
             
             self.logger.info("交易线程已重启")
@@ -1796,6 +1820,9 @@ class LiveTradeWindow(QMainWindow, Ui_MainWindow):
 
     def restart_application(self):
         """安全重启应用（处理特殊路径）"""
+        # 保存策略状态，重启后开始交易时从快照恢复
+        if self.trading_thread:
+            self.engine.save_state()
         QApplication.quit()
         
         # 获取当前执行文件的绝对路径（带双引号）
@@ -1815,27 +1842,31 @@ if __name__ == "__main__":
     if sys.platform.startswith('win'):
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
         sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
-    app = QApplication([])
-    window = LiveTradeWindow()
+    profiler = get_profiler()
+    profiler.mark('导入模块完成')
+    with profiler.phase('创建QApplication'):
+        app = QApplication([])
+    with profiler.phase('创建主窗口'):
+        window = LiveTradeWindow()
     # 查看有多少个同名程序已经开启
-    current_pid = os.getpid()
-    count = 0
-    # 遍历所有进程
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-        try:
-            # 
-            
-            proc_info = proc.info
-            
-            # 如果是Python进程且运行的是当前脚本
-            if (proc_info['pid'] != current_pid and  # 不是当前进程
-                proc_info['name'] == 'python.exe' and # 是Python进程
-                proc_info['cmdline'] and # 命令行参数存在
-                'live_main.py' in proc_info['cmdline'][-1]): # 运行的是当前脚本
+    with profiler.phase('检查同名程序'):
+        import psutil
+        current_pid = os.getpid()
+        count = 0
+        # 遍历所有进程
+        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+            try:
+                proc_info = proc.info
                 
-                count += 1
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
+                # 如果是Python进程且运行的是当前脚本
+                if (proc_info['pid'] != current_pid and  # 不是当前进程
+                    proc_info['name'] == 'python.exe' and # 是Python进程
+                    proc_info['cmdline'] and # 命令行参数存在
+                    'live_main.py' in proc_info['cmdline'][-1]): # 运行的是当前脚本
+                    
+                    count += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                pass
     print(f"当前有{count}个同名程序已经开启")
     # 窗口居中
     screen_center = QApplication.primaryScreen().availableGeometry().center()
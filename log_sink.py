@@ -0,0 +1,76 @@
+import collections
+import logging
+from PyQt5.QtCore import QTimer
+
+
+class QTextEditHandler(logging.Handler):
+    """
+    把日志批量输出到QTextEdit的日志处理器
+
+    任何线程记录日志时只把格式化后的文本追加到定长环形缓冲区（deque追加是原子操作，不加锁、不等待界面），
+    界面线程的定时器每flush_interval毫秒把缓冲区中的日志一次性追加到控件；
+    缓冲区满时丢弃最早的日志并计数，下次刷新时在控件中提示省略的条数。
+    控件的最大行数由文档的maximumBlockCount限制，超出时Qt自动删除最早的行。
+
+    Attributes:
+        capacity (int): 缓冲区最多保存的日志条数
+        dropped (int): 因缓冲区满被丢弃的日志总数
+        flushes (int): 刷新次数
+    """
+
+    def __init__(self, text_edit, max_lines=1000, capacity=5000, flush_interval=100):
+        """
+        初始化处理器（需在界面线程中创建）
+
+        Args:
+            text_edit: 日志显示控件（QTextEdit）
+            max_lines (int): 控件最多显示的行数
+            capacity (int): 缓冲区最多保存的日志条数
+            flush_interval (int): 刷新间隔（毫秒）
+        """
+        super().__init__()
+        self.text_edit = text_edit
+        self.capacity = capacity
+        self.max_lines = max_lines
+        self.text_edit.document().setMaximumBlockCount(max_lines)
+        self._buffer = collections.deque(maxlen=capacity)
+        self.dropped = 0
+        self._reported_dropped = 0
+        self.flushes = 0
+        self._timer = QTimer(text_edit)
+        self._timer.timeout.connect(self.flush_to_widget)
+        self._timer.start(flush_interval)
+
+    def emit(self, record):
+        try:
+            msg = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._buffer) >= self.capacity:
+            self.dropped += 1
+        self._buffer.append(msg)
+
+    def flush_to_widget(self):
+        """把缓冲区中的日志一次性追加到控件（在界面线程中由定时器调用）"""
+        # 只取开始时已有的条数，其他线程同时追加的日志留到下次刷新
+        lines = [self._buffer.popleft() for _ in range(len(self._buffer))]
+        if len(lines) > self.max_lines:
+            # 超出控件行数上限的部分追加后也会被立即删除，直接跳过
+            lines = lines[-self.max_lines:]
+        dropped = self.dropped - self._reported_dropped
+        if dropped:
+            self._reported_dropped += dropped
+            lines.insert(0, f"……日志过多，已省略{dropped}条（完整内容见日志文件）")
+        if lines:
+            self.text_edit.append('\n'.join(lines))
+            self.flushes += 1
+
+    def stats(self):
+        """
+        获取统计信息
+
+        Returns:
+            dict: 缓冲区中待显示的条数、丢弃总数和刷新次数
+        """
+        return {'pending': len(self._buffer), 'dropped': self.dropped, 'flushes': self.flushes}
@@ -1,12 +1,16 @@
 import pandas as pd
+import atexit
 import logging
 import configparser
 import os
 import threading
 import time
-import akshare as ak
 from xtquant import xtconstant
 from datetime import datetime
+from instrument_registry import get_registry
+from stock_universe import get_universe
+from board_cache import BoardConstituentCache, BOARD_INDUSTRY, BOARD_CONCEPT
+from selected_journal import SelectedStocksJournal
 import logging
 from logging.handlers import TimedRotatingFileHandler
 
@@ -17,11 +21,10 @@ class MarketData:
         
         """初始化市场数据类"""
         self.load_config()
-        self.all_a_stocks = None
         # 初始化数据属性
         self.industry_df = None
         self.concept_df = None
-        self.selected_stocks_df = None
+        self.selected_journal = SelectedStocksJournal(logger=self.logger)  # 当日已选股票（追加日志）
         self.asset = None
         self.positions = None
         self.orders = None
@@ -42,6 +45,12 @@ class MarketData:
         self.selected_data = pd.DataFrame()
         self.watch_list = []
         self.order_error = None  # 添加委托错误信息存储
+        
+        # 板块成分股缓存，有效期与热门板块的刷新间隔一致
+        self.board_cache = BoardConstituentCache(
+            ttl=getattr(self, 'INTERVAL_GET_HOT_BOARDS', 60),
+            logger=self.logger
+        )
 
     def setup_logger(self):
         """设置日志"""
@@ -126,87 +135,32 @@ class MarketData:
             self.logger.error(f"加载配置时出错: {e}")
 
     def load_stocks_info(self):
-        """加载股票基本信息"""
-        # 确保data目录存在
-        data_dir = os.path.join(os.path.dirname(__file__), 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        
-        # 检查是否存在all_a_stocks.csv文件且是今天创建的
-        csv_file = os.path.join(data_dir, 'all_a_stocks.csv')
-        if os.path.exists(csv_file):
-            # 获取文件的最后修改时间
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(csv_file))
-            today = datetime.now().date()
-            
-            # 如果文件是今天修改的,则直接读取CSV文件
-            if file_mtime.date() == today:
-                try:
-                    self.all_a_stocks = pd.read_csv(csv_file, dtype={'证券代码': str})
-                    self.logger.info(f"已从{csv_file}文件读取全A股股票名称信息")
-                    return
-                except Exception as e:
-                    self.logger.error(f"读取{csv_file}文件时出错: {e}")
+        """加载股票基本信息：先用本地缓存（过期也先用），后台并发更新过期的数据源"""
+        universe = get_universe()
+        universe.load()
+        universe.refresh_async()
 
-        if self.all_a_stocks is None:
-            # 获取沪深京 A 股的基本信息
-            stock_info_sh_name_code_df = ak.stock_info_sh_name_code()
-            # 先创建副本，然后选择需要的列
-            stock_info_sh = stock_info_sh_name_code_df[['证券代码', '证券简称', '上市日期']].copy()
-            # 使用 loc 设置数据类型
-            stock_info_sh.loc[:, '证券代码'] = stock_info_sh['证券代码'].astype(str)
-            
-            stock_info_sz_name_code_df = ak.stock_info_sz_name_code()
-            # 先创建副本，然后选择需要的列
-            stock_info_sz = stock_info_sz_name_code_df[['A股代码', 'A股简称', 'A股上市日期']].copy()
-            # 使用 loc 设置数据类型
-            stock_info_sz.loc[:, 'A股代码'] = stock_info_sz['A股代码'].astype(str)
-            # 重命名列
-            stock_info_sz = stock_info_sz.rename(columns={
-                'A股代码': '证券代码',
-                'A股简称': '证券简称', 
-                'A股上市日期': '上市日期'
-            })
-            
-            stock_info_bj_name_code_df = ak.stock_info_bj_name_code()
-            # 先创建副本，然后选择需要的列
-            stock_info_bj = stock_info_bj_name_code_df[['证券代码', '证券简称', '上市日期']].copy()
-            # 使用 loc 设置数据类型
-            stock_info_bj.loc[:, '证券代码'] = stock_info_bj['证券代码'].astype(str)
-            
-            # 合并所有数据
-            self.all_a_stocks = pd.concat([stock_info_sh, stock_info_sz, stock_info_bj])
-            
-            # 将所有股票信息写入CSV文件
-            try:
-                self.all_a_stocks.to_csv(csv_file, index=False, encoding='utf-8')
-                self.logger.info(f"已将股票信息写入文件: {csv_file}")
-            except Exception as e:
-                self.logger.error(f"写入{csv_file}文件时出错: {e}")
+    @property
+    def selected_stocks_df(self):
+        """当日已选股票（只读，变化通过update_market_data记录）"""
+        return self.selected_journal.frame()
 
     def load_selected_stocks(self):
-        """加载已选股票数据"""
-        # 获取当前日期
-        today = datetime.now().date()
-        # 构建文件名,格式为 selected_stocks_YYYYMMDD.csv
-        csv_file = os.path.join(os.path.dirname(__file__), 'data', f'selected_stocks_{today.strftime("%Y%m%d")}.csv')
-        
-        if os.path.exists(csv_file):
-            try:
-                self.selected_stocks_df = pd.read_csv(csv_file, dtype={'代码': str})
-                self.logger.info(f"已从{csv_file}文件读取今日已选股票数据")
-            except Exception as e:
-                self.logger.error(f"读取{csv_file}文件时出错: {e}")
-                self.selected_stocks_df = pd.DataFrame()
-        else:
-            self.selected_stocks_df = pd.DataFrame()
-            self.logger.error(f"没有{csv_file}文件")
+        """加载已选股票数据：读取selected_stocks_YYYYMMDD.csv并重放之后的变化日志"""
+        if self.selected_journal.load() == 0:
+            self.logger.error(f"没有今日已选股票数据（{self.selected_journal.csv_path()}）")
+
+    def compact_selected_stocks(self):
+        """把当日已选股票整理写回CSV（收盘后或程序退出时调用）"""
+        self.selected_journal.compact()
+
+    def close(self):
+        """程序退出时调用：整理已选股票记录，停止板块成分股刷新"""
+        self.compact_selected_stocks()
+        self.board_cache.shutdown()
 
     def get_stock_name(self, stock_code):
-        # 查找匹配的股票代码
-        result = self.all_a_stocks[self.all_a_stocks['证券代码'] == stock_code[:6]]
-        if not result.empty:
-            return result['证券简称'].values[0]
-        return None
+        return get_registry().get_name(stock_code, None)
     
     def get_order_status(self, status):
         if status == xtconstant.ORDER_UNREPORTED:
@@ -243,30 +197,13 @@ class MarketData:
                 self.concept_df = concept_df.copy()
                 
             if selected_data is not None:
-                if self.selected_stocks_df is None or self.selected_stocks_df.empty:
-                    self.selected_stocks_df = selected_data.copy()
-                else:
-                    # 检查第一个股票代码是否已存在
-                    if not selected_data.empty and selected_data.iloc[0]['代码'] in self.selected_stocks_df['代码'].values:
-                        # 更新已存在股票的下单状态
-                        mask = self.selected_stocks_df['代码'] == selected_data.iloc[0]['代码']
-                        self.selected_stocks_df.loc[mask, '下单状态'] = selected_data.iloc[0]['下单状态']
+                # 每只股票追加一条记录：已存在的股票只更新下单状态，新股票记录全部字段
+                for record in selected_data.to_dict('records'):
+                    code = str(record.pop('代码'))
+                    if code in self.selected_journal:
+                        self.selected_journal.record(code, 下单状态=record.get('下单状态'))
                     else:
-                        self.selected_stocks_df = pd.concat([self.selected_stocks_df, selected_data], ignore_index=True)
-                    # 保存已选股票数据到CSV文件
-                    try:
-                        if self.selected_stocks_df is not None and not self.selected_stocks_df.empty:
-                            # 获取今天的日期作为文件名
-                            today = datetime.now().strftime('%Y%m%d')
-                            # 构建文件路径
-                            data_dir = os.path.join(os.path.dirname(__file__), 'data')
-                            os.makedirs(data_dir, exist_ok=True)
-                            filename = os.path.join(data_dir, f'selected_stocks_{today}.csv')
-                            # 保存到CSV,如果已存在则覆盖
-                            self.selected_stocks_df.to_csv(filename, index=False, encoding='utf-8-sig')
-                            self.logger.info(f"已选股票数据已保存到文件: {filename}")
-                    except Exception as e:
-                        self.logger.error(f"保存已选股票数据到CSV时出错: {e}")
+                        self.selected_journal.record(code, **record)
                     
         except Exception as e:
             self.logger.error(f"更新市场数据时出错: {e}")
@@ -310,9 +247,7 @@ class MarketData:
 
     def get_selected_stocks_info(self):
         """获取已选股票信息"""
-        if self.selected_stocks_df is not None and not self.selected_stocks_df.empty:
-            return self.selected_stocks_df.to_dict('records')
-        return []
+        return self.selected_journal.records()
 
     def get_asset_info(self):
         """获取资产信息"""
@@ -410,32 +345,30 @@ class MarketData:
         return error
 
     def get_board_industry_cons(self, sector):
-        df = pd.DataFrame()        
-        try:
-            #self.logger.info(f"开始获取行业板块 {sector} 的股票列表")
-            df = ak.stock_board_industry_cons_em(symbol=sector)
-            if df.empty:
-                self.logger.warning(f"获取到的行业板块 {sector} 股票列表为空")
-            #else:
-            #    self.logger.info(f"成功获取行业板块 {sector} 的股票列表，包含 {len(df)} 条记录")
-        except Exception as e:
-            self.logger.error(f"获取行业板块 {sector} 的股票列表时出错，错误信息：{str(e)}")
-            #self.logger.error(f"错误类型：{type(e)}")
-        return df
+        """获取行业板块成分股（返回最近一次成功获取的结果，过期时后台刷新）"""
+        return self.board_cache.get(BOARD_INDUSTRY, sector)
 
     def get_board_concept_cons(self, sector):
-        df = pd.DataFrame()        
-        try:
-            #self.logger.info(f"开始获取概念板块 {sector} 的股票列表")
-            df = ak.stock_board_concept_cons_em(symbol=sector)
-            if df.empty:
-                self.logger.warning(f"获取到的概念板块 {sector} 股票列表为空")
-            #else:
-            #    self.logger.info(f"成功获取概念板块 {sector} 的股票列表，包含 {len(df)} 条记录")
-        except Exception as e:
-            self.logger.error(f"获取概念板块 {sector} 的股票列表时出错，错误信息：{str(e)}")
-            #self.logger.error(f"错误类型：{type(e)}")
-        return df
+        """获取概念板块成分股（返回最近一次成功获取的结果，过期时后台刷新）"""
+        return self.board_cache.get(BOARD_CONCEPT, sector)
+
+    def refresh_board_cons(self, industry_sectors=(), concept_sectors=(), wait=True):
+        """
+        并发刷新热门板块的成分股
+        
+        Args:
+            industry_sectors (list): 行业板块名称
+            concept_sectors (list): 概念板块名称
+            wait (bool): 是否等待刷新完成
+        Returns:
+            dict: 本轮刷新统计，不等待时为None
+        """
+        boards = [(BOARD_INDUSTRY, sector) for sector in industry_sectors]
+        boards += [(BOARD_CONCEPT, sector) for sector in concept_sectors]
+        if not wait:
+            self.board_cache.refresh_async(boards)
+            return None
+        return self.board_cache.refresh(boards)
 
     def load_server_chan_keys(self):
         """加载Server酱密钥"""
@@ -489,10 +422,28 @@ class MarketData:
         else:
             self.logger.info("要删除的Server酱密钥不存在")
 
-# 创建全局实例
-my_market = MarketData()
+_market_data = None
+_market_data_lock = threading.Lock()
+
+
+def get_market_data():
+    """
+    获取全局市场数据实例（第一次调用时创建，导入本模块时不再读取配置；程序退出时自动调用close()）
+
+    Returns:
+        MarketData: 市场数据实例
+    """
+    global _market_data
+    if _market_data is None:
+        with _market_data_lock:
+            if _market_data is None:
+                _market_data = MarketData()
+                atexit.register(_market_data.close)
+    return _market_data
+
 
 if __name__ == "__main__":
+    my_market = get_market_data()
     logger = my_market.setup_logger()
     logger.info("程序启动")
     
\ No newline at end of file
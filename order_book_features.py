@@ -0,0 +1,114 @@
+import numpy as np
+
+# 盘口特征列名
+FEATURE_BID_STRENGTH = 'bid_strength'   # 前3档买量之和（手）
+FEATURE_ASK_WEAKNESS = 'ask_weakness'   # 前3档卖量之和（手）
+FEATURE_BID_DEPTH = 'bid_depth'         # 五档买盘总量（手）
+FEATURE_ASK_DEPTH = 'ask_depth'         # 五档卖盘总量（手）
+FEATURE_SPREAD = 'spread'               # 买卖价差（卖一价-买一价）
+FEATURE_IMBALANCE = 'imbalance'         # 五档买卖量不平衡度，(买量-卖量)/(买量+卖量)，取值[-1, 1]
+
+ALL_FEATURES = (
+    FEATURE_BID_STRENGTH,
+    FEATURE_ASK_WEAKNESS,
+    FEATURE_BID_DEPTH,
+    FEATURE_ASK_DEPTH,
+    FEATURE_SPREAD,
+    FEATURE_IMBALANCE,
+)
+
+TOP_LEVELS = 3  # 盘口强度统计的档数
+
+
+def compute_tick_features(tick_data):
+    """
+    计算单个tick的盘口特征（实盘每个tick计算一次）
+
+    Args:
+        tick_data: tick数据，需包含bidPrice、askPrice、bidVol、askVol五档列表
+    Returns:
+        dict: 特征名到特征值的映射
+    """
+    bid_vols = tick_data['bidVol']
+    ask_vols = tick_data['askVol']
+    bid_depth = sum(bid_vols)
+    ask_depth = sum(ask_vols)
+    total_depth = bid_depth + ask_depth
+    return {
+        FEATURE_BID_STRENGTH: sum(bid_vols[:TOP_LEVELS]),
+        FEATURE_ASK_WEAKNESS: sum(ask_vols[:TOP_LEVELS]),
+        FEATURE_BID_DEPTH: bid_depth,
+        FEATURE_ASK_DEPTH: ask_depth,
+        FEATURE_SPREAD: tick_data['askPrice'][0] - tick_data['bidPrice'][0],
+        FEATURE_IMBALANCE: (bid_depth - ask_depth) / total_depth if total_depth > 0 else 0.0,
+    }
+
+
+def get_tick_features(tick_data, features=ALL_FEATURES):
+    """
+    获取tick的盘口特征
+
+    引擎已经预先计算过所需特征时直接返回tick本身，否则现场计算，
+    保证策略在任何引擎下都能用同一种方式读取特征。
+
+    Args:
+        tick_data: tick数据（dict或pd.Series）
+        features: 需要用到的特征名
+    Returns:
+        可按特征名取值的映射
+    """
+    for name in features:
+        if name not in tick_data:
+            return compute_tick_features(tick_data)
+    return tick_data
+
+
+def _levels_matrix(column, depth=5):
+    """把每行一个五档列表的列转换为 (N, depth) 的二维数组"""
+    values = column.tolist()
+    try:
+        matrix = np.asarray(values, dtype=float)
+        if matrix.ndim == 2 and matrix.shape[1] >= depth:
+            return matrix[:, :depth]
+    except (ValueError, TypeError):
+        pass
+    # 档位数不齐时逐行补零
+    matrix = np.zeros((len(values), depth), dtype=float)
+    for i, levels in enumerate(values):
+        levels = list(levels)[:depth]
+        matrix[i, :len(levels)] = levels
+    return matrix
+
+
+def compute_feature_columns(data, features=ALL_FEATURES):
+    """
+    对整段行情一次性计算盘口特征列（回测加载数据时使用）
+
+    Args:
+        data (pd.DataFrame): 逐笔行情，包含bidPrice、askPrice、bidVol、askVol列
+        features: 需要计算的特征名
+    Returns:
+        dict: 特征名到numpy数组的映射，长度与data一致
+    """
+    features = set(features)
+    bid_vols = _levels_matrix(data['bidVol'])
+    ask_vols = _levels_matrix(data['askVol'])
+    bid_depth = bid_vols.sum(axis=1)
+    ask_depth = ask_vols.sum(axis=1)
+
+    columns = {}
+    if FEATURE_BID_STRENGTH in features:
+        columns[FEATURE_BID_STRENGTH] = bid_vols[:, :TOP_LEVELS].sum(axis=1)
+    if FEATURE_ASK_WEAKNESS in features:
+        columns[FEATURE_ASK_WEAKNESS] = ask_vols[:, :TOP_LEVELS].sum(axis=1)
+    if FEATURE_BID_DEPTH in features:
+        columns[FEATURE_BID_DEPTH] = bid_depth
+    if FEATURE_ASK_DEPTH in features:
+        columns[FEATURE_ASK_DEPTH] = ask_depth
+    if FEATURE_SPREAD in features:
+        columns[FEATURE_SPREAD] = _levels_matrix(data['askPrice'], 1)[:, 0] - _levels_matrix(data['bidPrice'], 1)[:, 0]
+    if FEATURE_IMBALANCE in features:
+        total_depth = bid_depth + ask_depth
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns[FEATURE_IMBALANCE] = np.where(total_depth > 0, (bid_depth - ask_depth) / total_depth, 0.0)
+    return columns
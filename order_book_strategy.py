@@ -5,7 +5,9 @@ from datetime import datetime
 import os
 import math
 import pandas as pd
-from collections import deque
+from indicators import RollingMean, RollingVolatility
+from session_schedule import SessionSchedule, EARLY_LIMIT_RULES, TAIL_SESSION_RULES
+from order_book_features import FEATURE_BID_STRENGTH, FEATURE_ASK_WEAKNESS, FEATURE_ASK_DEPTH, get_tick_features
 
 class OrderBookStrategy(StrategyBase):
     """
@@ -14,7 +16,10 @@ class OrderBookStrategy(StrategyBase):
     基于盘口动量进行自动交易。
     """
     
-    def __init__(self, engine, bid_vol_threshold=500, ask_vol_threshold=200, logger=None):
+    required_features = (FEATURE_BID_STRENGTH, FEATURE_ASK_WEAKNESS, FEATURE_ASK_DEPTH)
+    state_fields = ('trade_size', 'daily_stats', 'day_initialized')
+    
+    def __init__(self, engine, bid_vol_threshold=500, ask_vol_threshold=200, volatility_threshold=None, logger=None):
         """
         初始化浮动限价策略
         
@@ -23,6 +28,7 @@ class OrderBookStrategy(StrategyBase):
             bid_vol_threshold (int): 买一档成交量阈值，默认500
             ask_vol_threshold (int): 卖一档成交量阈值，默认200
             trend_confirmation (int): 趋势确认阈值，默认3
+            volatility_threshold (float): 5分钟收益率波动率上限，超过则中止买入，默认None不检查
             logger: 日志记录器，如果为None则使用默认logger
         """
         super().__init__(engine)
@@ -34,6 +40,9 @@ class OrderBookStrategy(StrategyBase):
         self.logger = logger or logging.getLogger('LiveTrade')
 
         self.volume_processor = VolumeProcessor(window=100)  
+        self.volatility_threshold = volatility_threshold
+        self.price_volatility = RollingVolatility(window=100)  # 5分钟窗口（每3秒1个tick）
+        self.session_schedule = SessionSchedule(rules=EARLY_LIMIT_RULES + TAIL_SESSION_RULES)
         
         self.daily_stats = {
             'date': None,
@@ -42,7 +51,17 @@ class OrderBookStrategy(StrategyBase):
         }
         self.buy_point = None
         self.sell_point = None
+        self.day_initialized = False  # 当日是否已按首个可交易tick的价格完成初始化
                 
+    def on_day_open(self, trading_date):
+        """
+        新交易日开始，等待当日首个可交易tick按最新价初始化
+        
+        Args:
+            trading_date (str): 交易日，格式YYYYMMDD
+        """
+        self.day_initialized = False
+
     def on_bar(self, bar_data):
         """
         处理K线数据，执行交易逻辑
@@ -64,12 +83,9 @@ class OrderBookStrategy(StrategyBase):
             
             self.logger.info(f"处理 Bar 数据: {current_time}")
 
-            # 计算时间限制
-            hour = dt.hour
-            minute = dt.minute
-
-            # 避开开盘和收盘前的波动时间
-            if hour < 9 or (hour == 9 and minute < 31) or (hour == 14 and minute > 55) or hour > 14: # 14:55后禁止交易，如果交易则禁用市价单【DeepSeek：70%的算法交易在收盘前30分钟停止新开市价单】
+            # 查询当前所处交易时段，避开开盘和收盘前的波动时间
+            slot = self.session_schedule.at(dt.hour, dt.minute)
+            if not slot.tradable:
                 return
             
             #获取仓位信息
@@ -82,30 +98,9 @@ class OrderBookStrategy(StrategyBase):
                 current_can_use_volume = self.engine.get_can_use_volume(stock_code)
             target_position = self.engine.target_position
             
-            #早盘超买限制
-            if hour == 9 and minute <= 60:
-                position_limit = target_position  + current_can_use_volume
-                position_keep = 0
-            elif hour == 10 and minute < 60:
-                position_limit = target_position  + math.ceil(current_can_use_volume / 2 / 100) * 100
-                position_keep = 0
-            else:
-                position_limit = target_position
-                position_keep = 0
-
-            #尾盘平仓策略（缩小阈值加快交易频率）和控制卖出（即使有可卖数量，也不执行卖出）
-            if hour == 13 and minute >= 31:
-                self.threshold = 0.003
-                position_keep = math.ceil(target_position*0.8 / 100) * 100
-            if hour == 14 and minute >= 1:
-                self.threshold = 0.002  
-                position_keep = target_position
-            if hour == 14 and minute >= 31:
-                self.threshold = 0.001
-                position_keep = target_position
-            if hour == 14 and minute >= 46:
-                self.threshold = 0.0005
-                position_keep = target_position
+            #早盘超买限制和尾盘控制卖出（即使有可卖数量，也不执行卖出）由时段表决定
+            position_limit = self.session_schedule.position_limit(slot, target_position, current_can_use_volume)
+            position_keep = self.session_schedule.position_keep(slot, target_position)
             
             # 新交易日处理
             if current_date != self.daily_stats['date']:
@@ -154,36 +149,27 @@ class OrderBookStrategy(StrategyBase):
             if current_price <= 0:
                 return
                         
-            # 当前时间处理
-            dt = datetime.fromtimestamp(tick_data['time'] / 1000)  # 除以1000转换为秒
-            current_time = dt.strftime('%Y-%m-%d %H:%M:%S')
-            current_date = dt.strftime('%Y%m%d')
-            
-            # 计算时间限制
-            hour = dt.hour
-            minute = dt.minute
             volume = tick_data['volume']
             ma5min_volume = self.volume_processor.update(volume) # 计算当前5分钟动态平均成交量（手），9：35之前是不到5分钟的数据
+            self.price_volatility.update(current_price)
 
-            # 避开开盘和收盘前的波动时间
-            if hour < 9 or (hour == 9 and minute < 31) or (hour == 14 and minute > 55) or hour > 14: # 14:55后禁止交易，如果交易则禁用市价单【DeepSeek：70%的算法交易在收盘前30分钟停止新开市价单】
+            # 查询当前所处交易时段，避开开盘和收盘前的波动时间
+            slot = self.session_schedule.lookup(tick_data['time'])
+            if not slot.tradable:
                 return
             
+            # 当前时间处理（交易日由引擎切换，这里只格式化当日时间）
+            current_time = self.engine.format_tick_time(tick_data['time'])
+            current_date = self.engine.trading_date
+            
             #获取仓位信息
             current_volume = self.engine.get_volume(stock_code)
             current_can_use_volume = self.engine.get_can_use_volume(stock_code)
             target_position = self.engine.target_position
 
-            # 新交易日处理
-            if current_date != self.daily_stats['date']:
-                #回测模式，手动更新可用持仓量
-                if hasattr(self.engine, 'is_backtest') and self.engine.is_backtest:
-                    #新的一天，更新可用持仓量为当前持仓量
-                    self.engine.update_account_info(stock_code=stock_code, volume=0, can_use_volume=current_volume - current_can_use_volume, open_price=current_price)
-                
-                current_can_use_volume = self.engine.get_can_use_volume(stock_code)
-                print("get_current_can_use_volume", current_can_use_volume)
-
+            # 新交易日首个可交易tick，按当日价格初始化
+            if not self.day_initialized:
+                self.day_initialized = True
 
                 #每笔交易不少于5000元（基于当前价格初略计算）
                 min_trade_size1 = math.ceil(5000 / current_price / 100) * 100
@@ -214,31 +200,11 @@ class OrderBookStrategy(StrategyBase):
                     f"目标仓位: {target_position}, "
                     f"当前价格: {current_price}"
                 )
+                self.state_changed()
 
-            #早盘超买限制
-            if hour == 9 and minute <= 60:
-                position_limit = target_position  + current_can_use_volume
-                position_keep = 0
-            elif hour == 10 and minute < 60:
-                position_limit = target_position  + math.ceil(current_can_use_volume / 2 / 100) * 100
-                position_keep = 0
-            else:
-                position_limit = target_position
-                position_keep = 0
-
-            #尾盘平仓策略（缩小阈值加快交易频率）和控制卖出（即使有可卖数量，也不执行卖出）
-            if hour == 13 and minute >= 31:
-                self.threshold = 0.003
-                position_keep = math.ceil(target_position*0.8 / 100) * 100
-            if hour == 14 and minute >= 1:
-                self.threshold = 0.002  
-                position_keep = target_position
-            if hour == 14 and minute >= 31:
-                self.threshold = 0.001
-                position_keep = target_position
-            if hour == 14 and minute >= 46:
-                self.threshold = 0.0005
-                position_keep = target_position
+            #早盘超买限制和尾盘控制卖出（即使有可卖数量，也不执行卖出）由时段表决定
+            position_limit = self.session_schedule.position_limit(slot, target_position, current_can_use_volume)
+            position_keep = self.session_schedule.position_keep(slot, target_position)
 
             # 执行交易逻辑
             self.execute_trades(stock_code, current_price, 
@@ -271,9 +237,10 @@ class OrderBookStrategy(StrategyBase):
         bidVolumes = tick_data['bidVol']
         askVolumes = tick_data['askVol']
 
-        # 计算买卖盘口强度
-        bid_strength = sum(bidVolumes[:3])  # 前3档买量
-        ask_weakness = sum(askVolumes[:3])
+        # 买卖盘口强度（回测引擎预先计算为特征列，实盘引擎每个tick计算一次）
+        features = get_tick_features(tick_data, self.required_features)
+        bid_strength = features[FEATURE_BID_STRENGTH]  # 前3档买量
+        ask_weakness = features[FEATURE_ASK_WEAKNESS]
         
         # 动态阈值调整（示例）
         self.bid_vol_threshold = max(500, int(0.2 * ma5min_volume))
@@ -382,8 +349,6 @@ class OrderBookStrategy(StrategyBase):
             # 策略风险控制
             if tick_data is not None: #针对on_tick模式，进行风险控制
                 # 卖一价格异常监控
-                askVolumes = tick_data['askVol']
-                
                 if askPrices[0] < current_price:
                     self.logger.warning(
                         f"股票代码: {stock_code}, "
@@ -391,22 +356,23 @@ class OrderBookStrategy(StrategyBase):
                     )
                     return
                 # 流动性多维评估
-                depth_liquidity = sum(askVolumes)*100
+                depth_liquidity = features[FEATURE_ASK_DEPTH]*100
                 if depth_liquidity < buy_volume * 2:
                     self.logger.warning(
                         f"股票代码: {stock_code}, "
                         f"买入委托风险控制: 当前价格={current_price:.2f}, 五档卖盘总量={depth_liquidity} < 买入数量={buy_volume} * 2, 中止市价买入"
                     )
                     return
-                '''# 波动率自适应检查
-                volatility = calculate_5min_volatility(stock_code)
-                if volatility > self.volatility_threshold:
-                    self.logger.warning(
-                        f"股票代码: {stock_code}, "
-                        f"买入委托风险控制: 当前价格={current_price:.2f}, 数量={buy_volume}, 波动率{volatility}超过阈值, 中止市价买入"
-                    )
-                    return
-                # 涨跌幅动态限制
+                # 波动率自适应检查（未设置阈值时不检查）
+                if self.volatility_threshold is not None:
+                    volatility = self.price_volatility.value
+                    if volatility > self.volatility_threshold:
+                        self.logger.warning(
+                            f"股票代码: {stock_code}, "
+                            f"买入委托风险控制: 当前价格={current_price:.2f}, 数量={buy_volume}, 波动率{volatility:.5f}超过阈值{self.volatility_threshold}, 中止市价买入"
+                        )
+                        return
+                '''# 涨跌幅动态限制
                 # 计算有效涨跌幅限制
                 effective_upper = tick_data['upperLimit'] * 0.99  # 留1%缓冲  
                 if tick_data['askPrice'][0] >= effective_upper:
@@ -439,7 +405,7 @@ class OrderBookStrategy(StrategyBase):
 class VolumeProcessor:
     def __init__(self, window=100):  # 5分钟窗口（每3秒1个tick）
         self.window = window
-        self.volume_cache = deque(maxlen=window)
+        self.volume_mean = RollingMean(window)
         self.last_volume = 0  # 用于计算增量
 
     def update(self, volume):
@@ -448,11 +414,26 @@ class VolumeProcessor:
         
         # 计算单tick增量（防止数据回滚）
         delta = max(0, current_total - self.last_volume)
-        self.volume_cache.append(delta * 100)  # 转换为股数（1手=100股）
         self.last_volume = current_total
         
-        return self.current_average()
+        return self.volume_mean.update(delta * 100)  # 转换为股数（1手=100股）
 
     def current_average(self):
         """计算当前平均成交量（股）"""
-        return sum(self.volume_cache) / len(self.volume_cache) if self.volume_cache else 0
\ No newline at end of file
+        return self.volume_mean.value
+
+    def batch(self, volumes):
+        """
+        批量计算每个tick的5分钟动态平均成交量（用于回测预计算）
+        
+        Args:
+            volumes: 当日累计成交量序列（手）
+        Returns:
+            np.ndarray: 与逐tick调用update()一致的平均成交量（股）
+        """
+        volumes = np.asarray(volumes, dtype=float)
+        previous = np.concatenate(([self.last_volume], volumes[:-1]))
+        deltas = np.maximum(volumes - previous, 0) * 100
+        if len(volumes):
+            self.last_volume = volumes[-1]
+        return self.volume_mean.batch(deltas)
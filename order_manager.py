@@ -0,0 +1,311 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+# 委托跟踪状态
+ORDER_PENDING = 'pending'   # 已异步发送，等待柜台返回委托号
+ORDER_ACTIVE = 'active'     # 已取得委托号
+
+
+def pending_key(seq):
+    """
+    异步委托在取得委托号之前使用的跟踪键
+
+    Args:
+        seq (int): order_stock_async返回的请求序号
+    Returns:
+        tuple: 跟踪键，不会与委托号冲突
+    """
+    return ('seq', seq)
+
+
+class OrderManager:
+    """
+    委托跟踪表
+
+    待确认和已确认的委托放在同一个dict里：异步委托先以pending_key(seq)登记，
+    收到异步下单回报后改用委托号作为键，委托信息对象本身不变。
+    同步下单取得委托号后直接以委托号登记。委托进入终态后移除。
+
+    委托按超时时间放入最小堆，超时线程只等待堆顶的截止时间，
+    到期后以跟踪键回调on_expired，不需要定期扫描全部委托。委托提前结束时不从堆中删除，
+    到期时发现委托已不在跟踪表中（或截止时间已改变）直接丢弃。等待委托号的委托使用较短的
+    pending_timeout，异步下单回报丢失时到期按失败处理，不会一直处于待确认状态。
+    等待委托号的委托另按股票计数，判断某只股票是否有待确认委托时不扫描跟踪表。
+
+    Attributes:
+        orders (dict): 跟踪键 -> 委托信息
+        timeout (float): 委托未完成的超时时间（秒）
+        pending_timeout (float): 等待异步下单回报的超时时间（秒）
+    """
+
+    def __init__(self, timeout=30, pending_timeout=10, logger=None):
+        """
+        初始化委托跟踪表
+
+        Args:
+            timeout (float): 委托未完成的超时时间（秒）
+            pending_timeout (float): 等待异步下单回报的超时时间（秒）
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self.timeout = timeout
+        self.pending_timeout = pending_timeout
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.orders = {}
+        self._pending = {}              # 股票代码 -> 等待委托号的委托数
+        self._pending_total = 0
+        self._deadlines = []            # (截止时间, 序号, 跟踪键) 最小堆
+        self._counter = itertools.count()
+        self._on_expired = None
+        self._thread = None
+        self._stopped = False
+
+    @staticmethod
+    def _record(direction, stock_code, volume, base_price, price, retry_count=0):
+        """生成委托信息"""
+        return {
+            'state': ORDER_PENDING,
+            'seq': None,
+            'order_id': None,
+            'retry_count': retry_count,
+            'direction': direction,
+            'stock_code': stock_code,
+            'volume': volume,
+            'base_price': base_price,
+            'price': price,
+            'submit_time': time.perf_counter(),   # 下单接口返回的时间
+            'stamps': {},                         # 阶段 -> 首次到达的时间
+            'deadline': None,                     # 超时截止时间
+            'cancelling': False,                  # 是否已因超时发出撤单
+        }
+
+    def add_pending(self, seq, direction, stock_code, volume, base_price, price, retry_count=0):
+        """
+        登记已异步发送、尚未取得委托号的委托
+
+        Args:
+            seq (int): 请求序号
+            direction (str): 'buy'或'sell'
+            stock_code (str): 股票代码
+            volume (int): 委托数量
+            base_price (float): 策略给出的基准价
+            price (float): 实际委托价
+            retry_count (int): 已重试次数（撤单重下的委托沿用原委托的次数）
+        Returns:
+            tuple: 跟踪键
+        """
+        record = self._record(direction, stock_code, volume, base_price, price, retry_count)
+        record['seq'] = seq
+        key = pending_key(seq)
+        with self.lock:
+            self.orders[key] = record
+            self._count_pending(stock_code, 1)
+            self._schedule(key, record, self.pending_timeout)
+        return key
+
+    def add_active(self, order_id, direction, stock_code, volume, base_price, price, retry_count=0):
+        """
+        登记已取得委托号的委托（同步下单）
+
+        Args:
+            order_id (int): 委托号
+            其余参数同add_pending
+        Returns:
+            int: 跟踪键（即委托号）
+        """
+        record = self._record(direction, stock_code, volume, base_price, price, retry_count)
+        record['state'] = ORDER_ACTIVE
+        record['order_id'] = order_id
+        with self.lock:
+            self.orders[order_id] = record
+            self._schedule(order_id, record)
+        return order_id
+
+    def confirm(self, seq, order_id):
+        """
+        异步委托取得委托号，改用委托号跟踪
+
+        Args:
+            seq (int): 请求序号
+            order_id (int): 柜台返回的委托号
+        Returns:
+            dict: 委托信息，不是本程序发送的请求时返回None
+        """
+        with self.lock:
+            record = self.orders.pop(pending_key(seq), None)
+            if record is None:
+                return None
+            self._count_pending(record['stock_code'], -1)
+            record['state'] = ORDER_ACTIVE
+            record['order_id'] = order_id
+            self.orders[order_id] = record
+            self._schedule(order_id, record)
+        return record
+
+    def reject(self, seq):
+        """
+        异步委托被拒绝，移除跟踪
+
+        Args:
+            seq (int): 请求序号
+        Returns:
+            dict: 委托信息，不是本程序发送的请求时返回None
+        """
+        with self.lock:
+            record = self.orders.pop(pending_key(seq), None)
+            if record is not None:
+                self._count_pending(record['stock_code'], -1)
+            return record
+
+    def get(self, key):
+        """
+        获取委托信息
+
+        Args:
+            key: 跟踪键
+        Returns:
+            dict: 委托信息，未跟踪时返回None
+        """
+        with self.lock:
+            return self.orders.get(key)
+
+    def finish(self, order_id):
+        """
+        委托进入终态，移除跟踪（堆中的截止时间到期时自动丢弃）
+
+        Args:
+            order_id (int): 委托号
+        Returns:
+            dict: 委托信息，未跟踪时返回None
+        """
+        with self.lock:
+            return self.orders.pop(order_id, None)
+
+    def _count_pending(self, stock_code, delta):
+        """更新股票等待委托号的委托数（调用方持有锁）"""
+        count = self._pending.get(stock_code, 0) + delta
+        if count > 0:
+            self._pending[stock_code] = count
+        else:
+            self._pending.pop(stock_code, None)
+        self._pending_total += delta
+
+    def _schedule(self, key, record, timeout=None):
+        """登记超时截止时间（调用方持有锁），timeout为None时使用委托超时时间"""
+        timeout = self.timeout if timeout is None else timeout
+        if not timeout:
+            return
+        record['deadline'] = time.monotonic() + timeout
+        heapq.heappush(self._deadlines, (record['deadline'], next(self._counter), key))
+        # 新的截止时间早于原堆顶时唤醒超时线程重新计算等待时间
+        if self._deadlines[0][2] == key:
+            self.wakeup.notify()
+
+    def reschedule(self, order_id):
+        """
+        重新登记委托的超时截止时间（如撤单请求发送失败后）
+
+        Args:
+            order_id (int): 委托号
+        """
+        with self.lock:
+            record = self.orders.get(order_id)
+            if record is not None:
+                record['cancelling'] = False
+                self._schedule(order_id, record)
+
+    def start(self, on_expired):
+        """
+        启动超时线程（重复调用无副作用）
+
+        Args:
+            on_expired: 委托超时时的回调，参数为跟踪键（委托号，或等待委托号的委托的pending_key），在超时线程中调用
+        """
+        self._on_expired = on_expired
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='OrderTimeout', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        停止超时线程
+
+        Args:
+            timeout (float): 等待线程结束的最长时间（秒）
+        """
+        if self._thread is None:
+            return
+        with self.lock:
+            self._stopped = True
+            self.wakeup.notify()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _pop_expired(self, now):
+        """弹出所有已到期且仍在跟踪的委托的跟踪键（调用方持有锁）"""
+        expired = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._deadlines)
+            record = self.orders.get(key)
+            if record is not None and record['deadline'] == deadline and not record['cancelling']:
+                expired.append(key)
+        return expired
+
+    def _run(self):
+        """超时线程主循环：等待到堆顶的截止时间，取出到期委托后回调"""
+        while True:
+            with self.lock:
+                if self._stopped:
+                    break
+                now = time.monotonic()
+                expired = self._pop_expired(now)
+                if not expired:
+                    wait = self._deadlines[0][0] - now if self._deadlines else None
+                    self.wakeup.wait(wait)
+                    continue
+            for key in expired:
+                try:
+                    self._on_expired(key)
+                except Exception as e:
+                    self.logger.error(f"处理委托{key}超时出错: {str(e)}")
+
+    def stamp(self, key, stage):
+        """
+        记录委托首次到达某个阶段（如柜台确认、首笔成交）的时间
+
+        Args:
+            key: 跟踪键
+            stage (str): 阶段名称
+        Returns:
+            float: 距下单接口返回的耗时（秒），未跟踪的委托或非首次到达时返回None
+        """
+        now = time.perf_counter()
+        with self.lock:
+            record = self.orders.get(key)
+            if record is None or stage in record['stamps']:
+                return None
+            record['stamps'][stage] = now
+            return now - record['submit_time']
+
+    def has_pending(self, stock_code):
+        """
+        股票是否有等待委托号的异步委托
+
+        Args:
+            stock_code (str): 股票代码
+        Returns:
+            bool: 是否有等待委托号的委托
+        """
+        with self.lock:
+            return stock_code in self._pending
+
+    def pending_count(self):
+        """等待委托号的委托数量"""
+        with self.lock:
+            return self._pending_total
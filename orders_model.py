@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+from datetime import datetime
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, QTimer
+from PyQt5.QtWidgets import QTableView, QAbstractItemView, QHeaderView
+
+ORDER_HEADERS = ('订单编号', '报单时间', '股票代码', '交易类型', '委托价格', '数量', '委托状态', '策略名称')
+TIME_COLUMN = 1
+
+DEFAULT_ORDER_DIR = os.path.join(os.path.dirname(__file__), 'data', 'orders')
+
+
+class OrdersTableModel(QAbstractTableModel):
+    """
+    委托记录表格模型
+
+    按委托号建立到行号的索引，委托回报到达时直接定位到行原地更新，不再逐行比较第一列文本。
+    回报先放入待更新队列，每flush_interval毫秒合并一次：新委托一次性插入，
+    已有委托只对变化范围发出一次dataChanged。内存中最多保留max_rows行，
+    超出后把最早的page_size行追加写入当日的委托记录文件（data/orders/orders_YYYYMMDD.jsonl）。
+
+    Attributes:
+        max_rows (int): 内存中保留的最多行数
+        page_size (int): 每次转存到文件的行数
+        paged_out (int): 已转存到文件的行数
+    """
+
+    def __init__(self, max_rows=2000, page_size=500, flush_interval=100, store_dir=DEFAULT_ORDER_DIR, logger=None, parent=None):
+        """
+        初始化模型
+
+        Args:
+            max_rows (int): 内存中保留的最多行数
+            page_size (int): 每次转存到文件的行数
+            flush_interval (int): 合并刷新的间隔（毫秒）
+            store_dir (str): 委托记录文件目录
+            logger: 日志记录器，如果为None则使用默认logger
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.max_rows = max_rows
+        self.page_size = page_size
+        self.store_dir = store_dir
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self._rows = []         # 每行一个显示文本列表
+        self._ids = []          # 每行的委托号
+        self._index = {}        # 委托号 -> 绝对序号（行号 = 绝对序号 - _base）
+        self._base = 0          # 第0行的绝对序号
+        self._pending = {}      # 委托号 -> 待写入的显示文本（按到达顺序）
+        self.paged_out = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(flush_interval)
+        self._timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(ORDER_HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return QVariant()
+        return self._rows[index.row()][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return ORDER_HEADERS[section]
+        return QVariant()
+
+    def row_of(self, order_id):
+        """
+        委托号所在的行号
+
+        Args:
+            order_id: 委托号
+        Returns:
+            int: 行号，不在表格中（含已转存到文件）时返回-1
+        """
+        position = self._index.get(order_id)
+        return -1 if position is None else position - self._base
+
+    def upsert(self, order_id, values):
+        """
+        新增或更新一条委托（合并到下一次刷新）
+
+        Args:
+            order_id: 委托号
+            values (list): 各列显示文本，报单时间列为空时新行取当前时间、已有行保持原值
+        """
+        self._pending[order_id] = list(values)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """把待更新的委托写入表格"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        changed = []
+        added = []
+        for order_id, values in pending.items():
+            row = self.row_of(order_id)
+            if row >= 0:
+                if not values[TIME_COLUMN]:
+                    values[TIME_COLUMN] = self._rows[row][TIME_COLUMN]
+                if values != self._rows[row]:
+                    self._rows[row] = values
+                    changed.append(row)
+            else:
+                if not values[TIME_COLUMN]:
+                    values[TIME_COLUMN] = datetime.now().strftime('%H:%M:%S')
+                added.append((order_id, values))
+
+        if changed:
+            self.dataChanged.emit(self.index(min(changed), 0), self.index(max(changed), len(ORDER_HEADERS) - 1), [Qt.DisplayRole])
+        if added:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for order_id, values in added:
+                self._index[order_id] = self._base + len(self._rows)
+                self._ids.append(order_id)
+                self._rows.append(values)
+            self.endInsertRows()
+        if len(self._rows) > self.max_rows:
+            self.page_out(max(self.page_size, len(self._rows) - self.max_rows))
+
+    def page_out(self, count):
+        """
+        把最早的count行转存到当日的委托记录文件并从表格中移除
+
+        Args:
+            count (int): 转存的行数
+        """
+        count = min(count, len(self._rows))
+        if count <= 0:
+            return
+        self._write_store(self._ids[:count], self._rows[:count])
+        self.beginRemoveRows(QModelIndex(), 0, count - 1)
+        for order_id in self._ids[:count]:
+            del self._index[order_id]
+        del self._ids[:count]
+        del self._rows[:count]
+        self._base += count
+        self.endRemoveRows()
+        self.paged_out += count
+
+    def _write_store(self, order_ids, rows):
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            path = os.path.join(self.store_dir, f"orders_{datetime.now().strftime('%Y%m%d')}.jsonl")
+            with open(path, 'a', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(dict(zip(ORDER_HEADERS, row)), ensure_ascii=False) + '\n')
+        except Exception as e:
+            self.logger.error(f"转存委托记录失败: {str(e)}")
+
+    def save_all(self):
+        """把表格中的全部委托转存到文件（程序退出时调用）"""
+        self.flush()
+        if self._rows:
+            self._write_store(self._ids, self._rows)
+
+
+class OrdersTableView(QTableView):
+    """委托记录表格视图，有新委托时滚动到最新行"""
+
+    def __init__(self, model, parent=None):
+        """
+        初始化视图
+
+        Args:
+            model (OrdersTableModel): 委托记录模型
+            parent: 父控件
+        """
+        super().__init__(parent)
+        self.setModel(model)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.horizontalHeader().setStretchLastSection(True)  # 最后一列自动填充
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # 所有列自动调整
+        model.rowsInserted.connect(lambda *args: self.scrollToBottom())
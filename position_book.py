@@ -0,0 +1,249 @@
+import logging
+import threading
+
+# 委托终态：部撤、已撤、已成、废单
+FINAL_ORDER_STATUS = (53, 54, 56, 57)
+
+
+class PositionBook:
+    """
+    本地资金持仓账本
+
+    根据委托和成交回报增量维护资金和持仓，交易前检查直接读内存，不再等待柜台查询：
+        下单时：买入冻结资金（委托价*数量），卖出冻结可用持仓
+        成交时：按成交价更新资金和持仓，并释放对应的冻结
+        撤单/废单时：释放未成交部分的冻结
+    费用等无法在本地精确计算的差异，通过定期与柜台查询结果对账（reconcile）修正，并报告偏差。
+
+    Attributes:
+        cash (float): 可用资金
+        frozen_cash (float): 冻结资金
+        market_value (float): 持仓市值
+        total_asset (float): 总资产
+        positions (dict): 股票代码 -> {'volume', 'can_use_volume', 'open_price', 'market_value'}
+        orders (dict): 委托号 -> 未完结委托信息
+        last_drift (dict): 最近一次对账的偏差
+    """
+
+    def __init__(self, cash_tolerance=100.0, logger=None):
+        """
+        初始化账本
+
+        Args:
+            cash_tolerance (float): 对账时资金偏差超过该值才告警（元），低于该值视为费用误差
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self.cash_tolerance = cash_tolerance
+        self.lock = threading.RLock()
+        self.cash = 0.0
+        self.frozen_cash = 0.0
+        self.market_value = 0.0
+        self.total_asset = 0.0
+        self.positions = {}
+        self.orders = {}
+        self.last_drift = {}
+
+    def snapshot(self):
+        """
+        获取持仓的副本（供界面线程读取，不受回报线程同时修改的影响）
+
+        Returns:
+            dict: 股票代码 -> 持仓字典副本
+        """
+        with self.lock:
+            return {stock_code: dict(position) for stock_code, position in self.positions.items()}
+
+    def _position(self, stock_code):
+        """获取持仓记录，不存在时新建"""
+        position = self.positions.get(stock_code)
+        if position is None:
+            position = {'volume': 0, 'can_use_volume': 0, 'open_price': 0, 'market_value': 0}
+            self.positions[stock_code] = position
+        return position
+
+    def on_order_submitted(self, order_id, stock_code, direction, price, volume):
+        """
+        委托已提交：冻结资金或可用持仓
+
+        Args:
+            order_id: 委托号（异步委托取得委托号之前为临时键）
+            stock_code (str): 股票代码
+            direction (str): 'buy'或'sell'
+            price (float): 委托价
+            volume (int): 委托数量
+        """
+        with self.lock:
+            order = {
+                'stock_code': stock_code,
+                'direction': direction,
+                'price': price,
+                'volume': volume,
+                'filled': 0,            # 已收到成交回报的数量
+                'traded_volume': 0,     # 委托回报中的成交数量
+                'frozen': 0,            # 尚未释放的冻结（买入为资金，卖出为股数）
+                'closed': False,
+            }
+            if direction == 'buy':
+                amount = price * volume
+                order['frozen'] = amount
+                self.cash -= amount
+                self.frozen_cash += amount
+            else:
+                order['frozen'] = volume
+                self._position(stock_code)['can_use_volume'] -= volume
+            self.orders[order_id] = order
+
+    def rename_order(self, old_key, order_id):
+        """
+        异步委托取得委托号后改用委托号记录冻结
+
+        Args:
+            old_key: 下单时使用的临时键
+            order_id (int): 柜台返回的委托号
+        """
+        with self.lock:
+            order = self.orders.pop(old_key, None)
+            if order is not None:
+                self.orders[order_id] = order
+
+    def _release(self, order, volume):
+        """释放委托中volume股对应的冻结，返回实际释放的资金（卖出返回0）"""
+        if order['direction'] == 'buy':
+            amount = min(order['price'] * volume, order['frozen'])
+            order['frozen'] -= amount
+            self.frozen_cash -= amount
+            return amount
+        volume = min(volume, order['frozen'])
+        order['frozen'] -= volume
+        return 0
+
+    def on_trade(self, order_id, stock_code, direction, price, volume, is_t0=False):
+        """
+        成交回报：更新资金和持仓，释放成交部分的冻结
+
+        Args:
+            order_id (int): 委托号
+            stock_code (str): 股票代码
+            direction (str): 'buy'或'sell'
+            price (float): 成交价
+            volume (int): 成交数量
+            is_t0 (bool): 是否可以T+0交易（买入后当日可卖）
+        """
+        with self.lock:
+            order = self.orders.get(order_id)
+            position = self._position(stock_code)
+            amount = price * volume
+            if direction == 'buy':
+                if order is not None:
+                    self.cash += self._release(order, volume)
+                self.cash -= amount
+                old_volume = position['volume']
+                position['volume'] = old_volume + volume
+                if position['volume'] > 0:
+                    position['open_price'] = round((position['open_price'] * old_volume + amount) / position['volume'], 3)
+                if is_t0:
+                    position['can_use_volume'] += volume
+            else:
+                if order is not None:
+                    self._release(order, volume)
+                else:
+                    # 不是本程序的委托（如手工下单），可用持仓直接扣减
+                    position['can_use_volume'] -= volume
+                self.cash += amount
+                position['volume'] -= volume
+            position['market_value'] = position['volume'] * price
+            if order is not None:
+                order['filled'] += volume
+                self._close_if_done(order_id, order)
+
+    def on_order_status(self, order_id, status, traded_volume):
+        """
+        委托回报：委托进入终态时释放未成交部分的冻结
+
+        Args:
+            order_id (int): 委托号
+            status (int): 委托状态
+            traded_volume (int): 已成交数量
+        """
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order is None or order['closed']:
+                return
+            order['traded_volume'] = max(order['traded_volume'], traded_volume)
+            if status not in FINAL_ORDER_STATUS:
+                return
+            order['closed'] = True
+            unfilled = order['volume'] - order['traded_volume']
+            if unfilled > 0:
+                if order['direction'] == 'buy':
+                    self.cash += self._release(order, unfilled)
+                else:
+                    self._position(order['stock_code'])['can_use_volume'] += order['frozen'] - (order['traded_volume'] - order['filled'])
+                    order['frozen'] = order['traded_volume'] - order['filled']
+            self._close_if_done(order_id, order)
+
+    def _close_if_done(self, order_id, order):
+        """委托已进入终态且成交回报都已收到时移除"""
+        if order['closed'] and order['filled'] >= order['traded_volume']:
+            if order['direction'] == 'buy' and order['frozen'] > 0:
+                # 成交价低于委托价的部分
+                self.cash += self._release(order, order['volume'])
+            del self.orders[order_id]
+
+    def settle_day(self):
+        """
+        新交易日开始：按T+1结算，持仓全部变为可用（随后与柜台对账修正）
+        """
+        with self.lock:
+            for position in self.positions.values():
+                position['can_use_volume'] = position['volume']
+
+    def reconcile(self, asset, positions):
+        """
+        与柜台查询结果对账：计算本地账本与柜台的偏差，然后以柜台数据为准
+
+        Args:
+            asset: 柜台资金对象（query_stock_asset的返回值），None表示未查到
+            positions: 柜台持仓对象列表（query_stock_positions的返回值）
+        Returns:
+            dict: 偏差，{'cash': 资金偏差, 持仓代码: (持仓偏差, 可用偏差)}，只包含有偏差的项
+        """
+        with self.lock:
+            drift = {}
+            if asset:
+                cash_drift = self.cash - asset.cash
+                if abs(cash_drift) >= 0.01:
+                    drift['cash'] = round(cash_drift, 2)
+                self.cash = asset.cash
+                self.frozen_cash = asset.frozen_cash
+                self.market_value = asset.market_value
+                self.total_asset = asset.total_asset
+
+            if positions:
+                broker = {}
+                for pos in positions:
+                    broker[pos.stock_code] = {
+                        'volume': pos.volume,
+                        'can_use_volume': pos.can_use_volume,
+                        'open_price': round(pos.open_price, 3),
+                        'market_value': pos.market_value
+                    }
+                for stock_code in set(self.positions) | set(broker):
+                    local = self.positions.get(stock_code, {})
+                    remote = broker.get(stock_code, {})
+                    volume_drift = local.get('volume', 0) - remote.get('volume', 0)
+                    can_use_drift = local.get('can_use_volume', 0) - remote.get('can_use_volume', 0)
+                    if volume_drift or can_use_drift:
+                        drift[stock_code] = (volume_drift, can_use_drift)
+                # 原地替换，保证外部持有的positions引用仍然有效
+                self.positions.clear()
+                self.positions.update(broker)
+
+            self.last_drift = drift
+            significant = {k: v for k, v in drift.items() if k != 'cash' or abs(v) > self.cash_tolerance}
+            if significant:
+                self.logger.warning(f"本地账本与柜台对账存在偏差（本地-柜台）: {significant}，已按柜台数据修正")
+            elif drift:
+                self.logger.debug(f"本地账本与柜台对账偏差在容许范围内: {drift}")
+            return drift
@@ -0,0 +1,167 @@
+import math
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from PyQt5.QtWidgets import QTableView, QAbstractItemView, QHeaderView
+
+POSITION_HEADERS = ('股票代码', '股票名称', '持仓数量', '可用数量', '成本价', '市值')
+
+
+def _number(value):
+    """nan按0处理"""
+    if isinstance(value, float) and math.isnan(value):
+        return 0.0
+    return value
+
+
+class PositionsTableModel(QAbstractTableModel):
+    """
+    持仓表格模型
+
+    每行是一只股票格式化后的显示文本。set_positions()与当前内容逐格比较，
+    股票列表不变时只对变化的单元格发出dataChanged，视图只重绘这些单元格；
+    股票增减时才整表重置。股票名称按代码缓存，每只股票只查询一次。
+    """
+
+    def __init__(self, name_lookup, parent=None):
+        """
+        初始化模型
+
+        Args:
+            name_lookup: 按股票代码查询股票名称的函数
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self.name_lookup = name_lookup
+        self._names = {}
+        self._codes = []
+        self._rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(POSITION_HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return QVariant()
+        return self._rows[index.row()][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return POSITION_HEADERS[section]
+        return QVariant()
+
+    def _name(self, stock_code):
+        name = self._names.get(stock_code)
+        if name is None:
+            name = self.name_lookup(stock_code) or ''
+            if name:
+                self._names[stock_code] = name
+        return name
+
+    def _format(self, stock_code, pos):
+        """把一条持仓记录格式化为一行显示文本"""
+        volume = pos.get('volume', 0)
+        can_use_volume = pos.get('can_use_volume', volume)
+        open_price = _number(pos.get('open_price', 0.0))
+        market_value = _number(pos.get('market_value', 0.0))
+        return (
+            stock_code,
+            self._name(stock_code),
+            str(volume),
+            str(can_use_volume),
+            f"{open_price:.3f}",
+            f"{market_value:.2f}",
+        )
+
+    def set_positions(self, items):
+        """
+        更新表格内容
+
+        Args:
+            items (list): [(股票代码, 持仓字典), ...]，按显示顺序
+        Returns:
+            bool: 是否整表重置（股票增减时），重置后需要重新设置选中行
+        """
+        codes = [stock_code for stock_code, _ in items]
+        rows = [self._format(stock_code, pos) for stock_code, pos in items]
+        if codes != self._codes:
+            self.beginResetModel()
+            self._codes = codes
+            self._rows = rows
+            self.endResetModel()
+            return True
+        for row, (old, new) in enumerate(zip(self._rows, rows)):
+            if old == new:
+                continue
+            self._rows[row] = new
+            for column, (old_text, new_text) in enumerate(zip(old, new)):
+                if old_text != new_text:
+                    index = self.index(row, column)
+                    self.dataChanged.emit(index, index, [Qt.DisplayRole])
+        return False
+
+    def text(self, row, column):
+        """
+        获取单元格文本
+
+        Args:
+            row (int): 行号
+            column (int): 列号
+        Returns:
+            str: 单元格文本，行号无效时返回空字符串
+        """
+        if 0 <= row < len(self._rows):
+            return self._rows[row][column]
+        return ''
+
+
+class PositionsTableView(QTableView):
+    """
+    持仓表格视图
+
+    提供与QTableWidget相同的currentRow()/rowCount()，以及按行列读取文本的text()，
+    主窗口原来读取表格单元格的地方改为读模型中的显示文本。
+    """
+
+    def __init__(self, name_lookup, parent=None):
+        """
+        初始化视图
+
+        Args:
+            name_lookup: 按股票代码查询股票名称的函数
+            parent: 父控件
+        """
+        super().__init__(parent)
+        self.setModel(PositionsTableModel(name_lookup, self))
+        # 不可编辑、整行单选
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.horizontalHeader().setStretchLastSection(True)  # 最后一列自动填充
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)  # 所有列自动调整
+
+    def currentRow(self):
+        """当前行号，没有时返回-1"""
+        return self.currentIndex().row()
+
+    def rowCount(self):
+        """行数"""
+        return self.model().rowCount()
+
+    def text(self, row, column):
+        """按行列读取单元格文本"""
+        return self.model().text(row, column)
+
+    def set_positions(self, items):
+        """
+        更新表格内容，整表重置时保持原来的选中行
+
+        Args:
+            items (list): [(股票代码, 持仓字典), ...]
+        """
+        current_row = self.currentRow()
+        if current_row < 0 and items:
+            current_row = 0
+        if self.model().set_positions(items) and 0 <= current_row < len(items):
+            self.selectRow(current_row)
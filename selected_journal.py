@@ -0,0 +1,222 @@
+import glob
+import json
+import logging
+import os
+from datetime import datetime
+import pandas as pd
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+CODE_COLUMN = '代码'
+
+
+def _json_default(value):
+    """numpy数值等转换为Python内置类型，其他对象转为字符串"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class SelectedStocksJournal:
+    """
+    当日已选股票记录
+
+    已选股票保存在 selected_stocks_YYYYMMDD.csv（整理后的全量）和同名的.jsonl日志（之后的每次变化）中。
+    新增股票或更新下单状态时只向日志追加一行并更新内存，内存中按股票代码索引到行，
+    不再每次重写整个CSV。compact()把全量写回CSV并清空日志，在换日或程序退出时调用；
+    重启时先读CSV再按顺序重放日志即可恢复当日记录，之前日期遗留的日志（程序异常退出未整理）同时整理掉。
+
+    Attributes:
+        trade_date (str): 记录所属日期（YYYYMMDD）
+    """
+
+    def __init__(self, data_dir=DEFAULT_DATA_DIR, logger=None):
+        """
+        初始化已选股票记录
+
+        Args:
+            data_dir (str): 数据目录
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.data_dir = data_dir
+        self.logger = logger or logging.getLogger('mytrade')
+        self.trade_date = None
+        self._rows = []         # 每行一个字典
+        self._index = {}        # 股票代码 -> 行号
+        self._columns = []
+        self._frame = None      # 缓存的DataFrame，有变化时置为None
+        self._journal = None    # 追加写入的日志文件
+        self._opened_on = None  # 加载时的日期，日期变化后record()切换到新的一天
+
+    def csv_path(self, trade_date=None):
+        return os.path.join(self.data_dir, f'selected_stocks_{trade_date or self.trade_date}.csv')
+
+    def journal_path(self, trade_date=None):
+        return os.path.join(self.data_dir, f'selected_stocks_{trade_date or self.trade_date}.jsonl')
+
+    def _reset(self):
+        self._rows = []
+        self._index = {}
+        self._columns = []
+        self._frame = None
+
+    def _apply(self, code, fields):
+        """把一条记录合并到内存：已有的股票更新字段，没有的新增一行"""
+        row = self._index.get(code)
+        if row is None:
+            self._index[code] = len(self._rows)
+            self._rows.append({CODE_COLUMN: code, **fields})
+        else:
+            self._rows[row].update(fields)
+        for column in fields:
+            if column not in self._columns:
+                self._columns.append(column)
+        self._frame = None
+
+    def load(self, trade_date=None):
+        """
+        加载某日的已选股票：读CSV后重放日志，上一日的日志整理后不再追加
+
+        Args:
+            trade_date (str): 日期（YYYYMMDD），None表示今天
+        Returns:
+            int: 加载的股票数
+        """
+        self.close()
+        trade_date = trade_date or datetime.now().strftime('%Y%m%d')
+        self.compact_leftovers(trade_date)
+        return self._open(trade_date)
+
+    def compact_leftovers(self, before):
+        """
+        整理之前日期遗留的日志（程序异常退出时没有整理）
+
+        Args:
+            before (str): 只整理早于该日期（YYYYMMDD）的日志
+        Returns:
+            list: 整理的日期
+        """
+        dates = []
+        for path in sorted(glob.glob(os.path.join(self.data_dir, 'selected_stocks_*.jsonl'))):
+            trade_date = os.path.basename(path)[len('selected_stocks_'):-len('.jsonl')]
+            if trade_date < before:
+                journal = SelectedStocksJournal(self.data_dir, self.logger)
+                journal._open(trade_date)
+                journal.compact()
+                dates.append(trade_date)
+        return dates
+
+    def _open(self, trade_date):
+        """读CSV并重放日志，不整理其他日期"""
+        self.trade_date = trade_date
+        self._opened_on = datetime.now().strftime('%Y%m%d')
+        self._reset()
+        self._columns = [CODE_COLUMN]
+
+        csv_file = self.csv_path()
+        if os.path.exists(csv_file):
+            try:
+                df = pd.read_csv(csv_file, dtype={CODE_COLUMN: str})
+                records = df.where(df.notna(), None).to_dict('records')
+                for record in records:
+                    code = record.pop(CODE_COLUMN)
+                    self._apply(code, record)
+                self._columns = list(df.columns)
+                self.logger.info(f"已从{csv_file}文件读取今日已选股票数据")
+            except Exception as e:
+                self.logger.error(f"读取{csv_file}文件时出错: {e}")
+
+        replayed = 0
+        broken = False
+        journal_file = self.journal_path()
+        if os.path.exists(journal_file):
+            with open(journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        broken = True   # 程序中断时最后一行可能不完整
+                        break
+                    code = entry.pop(CODE_COLUMN)
+                    self._apply(code, entry)
+                    replayed += 1
+            if replayed:
+                self.logger.info(f"已重放{journal_file}中的{replayed}条已选股票变化")
+            if broken:
+                # 立即整理，避免之后的记录追加在不完整的行后面
+                self.compact()
+        return len(self._rows)
+
+    def record(self, code, **fields):
+        """
+        记录一只股票的新增或变化（追加到日志）
+
+        Args:
+            code (str): 股票代码
+            **fields: 变化的字段（如 下单状态='已下单'），新增股票时为全部字段
+        """
+        today = datetime.now().strftime('%Y%m%d')
+        if self.trade_date is None or self._opened_on != today:
+            # 换日：整理上一日的记录，从新的一天开始
+            self.compact()
+            self.load(today)
+        code = str(code)
+        self._apply(code, fields)
+        try:
+            if self._journal is None:
+                os.makedirs(self.data_dir, exist_ok=True)
+                self._journal = open(self.journal_path(), 'a', encoding='utf-8')
+            self._journal.write(json.dumps({CODE_COLUMN: code, **fields}, ensure_ascii=False, default=_json_default) + '\n')
+            self._journal.flush()
+        except Exception as e:
+            self.logger.error(f"写入已选股票日志时出错: {e}")
+
+    def __contains__(self, code):
+        return str(code) in self._index
+
+    def __len__(self):
+        return len(self._rows)
+
+    def records(self):
+        """
+        获取全部已选股票
+
+        Returns:
+            list: 每只股票一个字典（按选入顺序）
+        """
+        return [dict(row) for row in self._rows]
+
+    def frame(self):
+        """
+        获取全部已选股票的DataFrame（没有变化时返回缓存的同一个对象，调用方不应修改）
+
+        Returns:
+            pd.DataFrame: 已选股票
+        """
+        if self._frame is None:
+            self._frame = pd.DataFrame(self._rows, columns=self._columns if self._rows else None)
+        return self._frame
+
+    def compact(self):
+        """把全部记录写回CSV并清空日志"""
+        if self.trade_date is None:
+            return
+        self.close()
+        journal_file = self.journal_path()
+        if not os.path.exists(journal_file):
+            return
+        try:
+            if self._rows:
+                csv_file = self.csv_path()
+                temp = csv_file + '.tmp'
+                self.frame().to_csv(temp, index=False, encoding='utf-8-sig')
+                os.replace(temp, csv_file)
+                self.logger.info(f"已选股票数据已保存到文件: {csv_file}")
+            os.remove(journal_file)
+        except Exception as e:
+            self.logger.error(f"整理已选股票记录时出错: {e}")
+
+    def close(self):
+        """关闭日志文件"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -0,0 +1,200 @@
+from collections import namedtuple
+import math
+import numpy as np
+
+# 交易时段名称
+PHASE_CLOSED = 'closed'         # 不交易（开盘前、集合竞价、开盘初段、收盘前、收盘后）
+PHASE_OPEN = 'open'             # 早盘（9:31-9:59）
+PHASE_MORNING = 'morning'       # 上午（10:00-10:59）
+PHASE_REGULAR = 'regular'       # 盘中
+PHASE_TAIL_1 = 'tail_1'         # 尾盘第1阶段（13:31起）
+PHASE_TAIL_2 = 'tail_2'         # 尾盘第2阶段（14:01起）
+PHASE_TAIL_3 = 'tail_3'         # 尾盘第3阶段（14:31起）
+PHASE_TAIL_4 = 'tail_4'         # 尾盘第4阶段（14:46起）
+
+MINUTES_PER_DAY = 1440
+DAY_MS = 86400 * 1000
+BEIJING_OFFSET_MS = 8 * 3600 * 1000  # tick时间为UTC毫秒时间戳，A股按北京时间划分时段
+
+SessionSlot = namedtuple('SessionSlot', [
+    'phase',                # 时段名称
+    'tradable',             # 是否允许交易
+    'threshold_scale',      # 交易阈值相对于每日初始阈值的倍数
+    'limit_extra_ratio',    # 持仓上限 = 目标仓位 + 可用持仓 * 该比例
+    'keep_ratio',           # 保留仓位 = 目标仓位 * 该比例（保留仓位内不执行卖出）
+])
+
+DEFAULT_SLOT = SessionSlot(PHASE_REGULAR, True, 1.0, 0.0, 0.0)
+
+# 默认交易窗口：避开开盘和收盘前的波动时间，14:55后禁止交易
+# 【DeepSeek：70%的算法交易在收盘前30分钟停止新开市价单】
+DEFAULT_TRADING_WINDOWS = (('09:31', '14:55'),)
+
+# 早盘超买限制和尾盘平仓策略（缩小阈值加快交易频率，并控制卖出）
+EARLY_LIMIT_RULES = (
+    ('09:00', '09:59', {'phase': PHASE_OPEN, 'limit_extra_ratio': 1.0}),
+    ('10:00', '10:59', {'phase': PHASE_MORNING, 'limit_extra_ratio': 0.5}),
+)
+TAIL_SESSION_RULES = (
+    ('13:31', '23:59', {'phase': PHASE_TAIL_1, 'threshold_scale': 3 / 4, 'keep_ratio': 0.8}),
+    ('14:01', '23:59', {'phase': PHASE_TAIL_2, 'threshold_scale': 2 / 4, 'keep_ratio': 1.0}),
+    ('14:31', '23:59', {'phase': PHASE_TAIL_3, 'threshold_scale': 1 / 4, 'keep_ratio': 1.0}),
+    ('14:46', '23:59', {'phase': PHASE_TAIL_4, 'threshold_scale': 0.5 / 4, 'keep_ratio': 1.0}),
+)
+
+
+def _parse_clock(clock):
+    """把'HH:MM'转换为当日分钟序号"""
+    hour, minute = clock.split(':')
+    return int(hour) * 60 + int(minute)
+
+
+def day_index(time_ms):
+    """
+    毫秒时间戳对应的北京时间日序号（自1970-01-01起的天数），用于判断是否跨日
+
+    Args:
+        time_ms: tick时间（毫秒时间戳）
+    Returns:
+        int: 日序号
+    """
+    return int((time_ms + BEIJING_OFFSET_MS) // DAY_MS)
+
+
+def _round_lot(volume, ratio):
+    """按比例取数量，比例为1时取原值，否则向上取整到100股"""
+    if ratio >= 1:
+        return volume
+    if ratio <= 0:
+        return 0
+    return math.ceil(volume * ratio / 100) * 100
+
+
+class SessionSchedule:
+    """
+    日内交易时段表
+
+    把一天的1440分钟预先展开成查找表，每分钟对应一个SessionSlot，
+    tick到来时按分钟序号直接取表，不再逐tick判断小时和分钟。
+    各策略通过rules声明自己的时段规则，规则按顺序叠加，后面的覆盖前面的。
+
+    Attributes:
+        slots (list): 长度为1440的SessionSlot列表
+    """
+
+    def __init__(self, rules=(), trading_windows=DEFAULT_TRADING_WINDOWS, default=DEFAULT_SLOT):
+        """
+        初始化时段表
+
+        Args:
+            rules: (开始时间, 结束时间, 字段覆盖dict) 的序列，时间为'HH:MM'，首尾都包含
+            trading_windows: 允许交易的 (开始时间, 结束时间) 序列，首尾都包含
+            default (SessionSlot): 未被规则覆盖的分钟使用的默认值
+        """
+        fields = [dict(default._asdict()) for _ in range(MINUTES_PER_DAY)]
+        for start, end, overrides in rules:
+            for minute in range(_parse_clock(start), _parse_clock(end) + 1):
+                fields[minute].update(overrides)
+
+        tradable = np.zeros(MINUTES_PER_DAY, dtype=bool)
+        for start, end in trading_windows:
+            tradable[_parse_clock(start):_parse_clock(end) + 1] = True
+        for minute, item in enumerate(fields):
+            item['tradable'] = bool(tradable[minute])
+            if not item['tradable']:
+                item['phase'] = PHASE_CLOSED
+
+        # 相同的时段共用同一个SessionSlot对象，查表时不产生新对象
+        cache = {}
+        self.slots = []
+        for item in fields:
+            slot = SessionSlot(**item)
+            self.slots.append(cache.setdefault(slot, slot))
+
+        self.phases = np.array([slot.phase for slot in self.slots])
+        self.tradable = tradable
+        self.threshold_scale = np.array([slot.threshold_scale for slot in self.slots], dtype=float)
+        self.limit_extra_ratio = np.array([slot.limit_extra_ratio for slot in self.slots], dtype=float)
+        self.keep_ratio = np.array([slot.keep_ratio for slot in self.slots], dtype=float)
+
+    @staticmethod
+    def minute_of_day(time_ms):
+        """
+        毫秒时间戳对应的北京时间当日分钟序号
+
+        Args:
+            time_ms: tick时间（毫秒时间戳）
+        Returns:
+            int: 0~1439
+        """
+        return int((time_ms + BEIJING_OFFSET_MS) // 60000) % MINUTES_PER_DAY
+
+    def lookup(self, time_ms):
+        """
+        查询tick所在分钟的时段
+
+        Args:
+            time_ms: tick时间（毫秒时间戳）
+        Returns:
+            SessionSlot: 时段信息
+        """
+        return self.slots[self.minute_of_day(time_ms)]
+
+    def at(self, hour, minute):
+        """
+        按时钟查询时段（用于K线等非毫秒时间戳的数据）
+
+        Args:
+            hour (int): 小时
+            minute (int): 分钟
+        Returns:
+            SessionSlot: 时段信息
+        """
+        return self.slots[hour * 60 + minute]
+
+    def batch(self, times_ms):
+        """
+        对整段tick时间一次性查表（回测预计算用）
+
+        Args:
+            times_ms: 毫秒时间戳数组
+        Returns:
+            dict: 字段名到numpy数组的映射，长度与输入一致
+        """
+        times = np.asarray(times_ms, dtype=np.int64)
+        index = ((times + BEIJING_OFFSET_MS) // 60000) % MINUTES_PER_DAY
+        return {
+            'minute_of_day': index,
+            'phase': self.phases[index],
+            'tradable': self.tradable[index],
+            'threshold_scale': self.threshold_scale[index],
+            'limit_extra_ratio': self.limit_extra_ratio[index],
+            'keep_ratio': self.keep_ratio[index],
+        }
+
+    @staticmethod
+    def position_limit(slot, target_position, can_use_volume):
+        """
+        计算时段内的持仓上限
+
+        Args:
+            slot (SessionSlot): 时段信息
+            target_position (int): 目标仓位
+            can_use_volume (int): 当前可用持仓
+        Returns:
+            int: 持仓上限
+        """
+        return target_position + _round_lot(can_use_volume, slot.limit_extra_ratio)
+
+    @staticmethod
+    def position_keep(slot, target_position):
+        """
+        计算时段内的保留仓位
+
+        Args:
+            slot (SessionSlot): 时段信息
+            target_position (int): 目标仓位
+        Returns:
+            int: 保留仓位
+        """
+        return _round_lot(target_position, slot.keep_ratio)
@@ -0,0 +1,623 @@
+import argparse
+import heapq
+import importlib
+import itertools
+import logging
+import sys
+import threading
+import time
+import types
+from types import SimpleNamespace
+import numpy as np
+from session_schedule import DAY_MS, BEIJING_OFFSET_MS, day_index
+
+# 与xtconstant一致的常量
+STOCK_BUY = 23
+STOCK_SELL = 24
+LATEST_PRICE = 5
+FIX_PRICE = 11
+ORDER_UNREPORTED = 48
+ORDER_WAIT_REPORTING = 49
+ORDER_REPORTED = 50
+ORDER_REPORTED_CANCEL = 51
+ORDER_PARTSUCC_CANCEL = 52
+ORDER_PART_CANCEL = 53
+ORDER_CANCELED = 54
+ORDER_PART_SUCC = 55
+ORDER_SUCCEEDED = 56
+ORDER_JUNK = 57
+ORDER_UNKNOWN = 255
+
+
+class SimXtQuantTraderCallback:
+    """模拟的XtQuantTraderCallback，所有回调默认不处理"""
+
+    def on_disconnected(self):
+        pass
+
+    def on_account_status(self, status):
+        pass
+
+    def on_stock_asset(self, asset):
+        pass
+
+    def on_stock_order(self, order):
+        pass
+
+    def on_stock_trade(self, trade):
+        pass
+
+    def on_stock_position(self, position):
+        pass
+
+    def on_order_error(self, order_error):
+        pass
+
+    def on_cancel_error(self, cancel_error):
+        pass
+
+    def on_order_stock_async_response(self, response):
+        pass
+
+    def on_cancel_order_stock_async_response(self, response):
+        pass
+
+
+class SimStockAccount:
+    """模拟的StockAccount"""
+
+    def __init__(self, account_id, account_type='STOCK'):
+        self.account_id = account_id
+        self.account_type = account_type
+
+
+class SimTrader:
+    """
+    模拟交易接口
+
+    实现LiveEngine用到的XtQuantTrader子集（connect、subscribe、order_stock(_async)、
+    cancel_order_stock(_async)、query_stock_asset/positions），按最新行情撮合限价单：
+    买单价格不低于卖一价时按卖一价全部成交，卖单价格不高于买一价时按买一价全部成交，否则挂单等待后续行情。
+    委托、成交回报在单独的回调线程中按设定的延迟推送，模拟柜台往返。
+
+    Attributes:
+        latency (float): 下单/撤单到柜台确认的延迟（秒）
+        fill_latency (float): 柜台确认到成交回报的延迟（秒）
+        commission_rate (float): 佣金费率（卖出另收千分之0.5印花税）
+    """
+
+    def __init__(self, initial_cash=1000000.0, positions=None, latency=0.005, fill_latency=0.005,
+                 commission_rate=0.00025, logger=None):
+        """
+        初始化模拟交易接口
+
+        Args:
+            initial_cash (float): 初始资金
+            positions (dict): 初始持仓，股票代码 -> 股数（均为可用持仓）
+            latency (float): 下单/撤单到柜台确认的延迟（秒）
+            fill_latency (float): 柜台确认到成交回报的延迟（秒）
+            commission_rate (float): 佣金费率
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self.latency = latency
+        self.fill_latency = fill_latency
+        self.commission_rate = commission_rate
+        self.cash = float(initial_cash)
+        self.frozen_cash = 0.0
+        self.positions = {}
+        for stock_code, volume in (positions or {}).items():
+            self.positions[stock_code] = {'volume': volume, 'can_use_volume': volume, 'open_price': 0.0}
+        self.quotes = {}                # 股票代码 -> 最新行情
+        self.orders = {}                # 委托号 -> 委托对象
+        self.working = {}               # 股票代码 -> 未成交委托号列表
+        self.callback = None
+        self.lock = threading.RLock()
+        self._order_ids = itertools.count(1)
+        self._seqs = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._events = []               # (送达时间, 序号, 函数, 参数) 最小堆
+        self._event_counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    # ---- XtQuantTrader接口 ----
+
+    def start(self):
+        """启动回调线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='SimTraderCallback', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止回调线程"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def connect(self):
+        self.start()
+        return 0
+
+    def subscribe(self, account):
+        return 0
+
+    def register_callback(self, callback):
+        self.callback = callback
+
+    def order_stock(self, account, stock_code, order_type, order_volume, price_type, price,
+                    strategy_name='', order_remark=''):
+        """同步下单：等待一个柜台往返后返回委托号"""
+        time.sleep(self.latency)
+        order = self._new_order(stock_code, order_type, order_volume, price_type, price, strategy_name, order_remark)
+        self._accept(order, 0)
+        return order.order_id
+
+    def order_stock_async(self, account, stock_code, order_type, order_volume, price_type, price,
+                          strategy_name='', order_remark=''):
+        """异步下单：立即返回请求序号，延迟latency后推送异步下单回报"""
+        seq = next(self._seqs)
+        order = self._new_order(stock_code, order_type, order_volume, price_type, price, strategy_name, order_remark)
+        self._schedule(self.latency, self._accept_async, order, seq)
+        return seq
+
+    def cancel_order_stock(self, account, order_id):
+        """同步撤单：返回0表示成功，-1表示委托不可撤"""
+        time.sleep(self.latency)
+        return 0 if self._cancel(order_id, 0) else -1
+
+    def cancel_order_stock_async(self, account, order_id):
+        """异步撤单：立即返回请求序号，延迟latency后撤单"""
+        seq = next(self._seqs)
+        self._schedule(self.latency, self._cancel_async, order_id, seq)
+        return seq
+
+    def query_stock_asset(self, account):
+        with self.lock:
+            market_value = sum(p['volume'] * self._last_price(code) for code, p in self.positions.items())
+            return SimpleNamespace(
+                account_id=getattr(account, 'account_id', ''),
+                cash=self.cash,
+                frozen_cash=self.frozen_cash,
+                market_value=market_value,
+                total_asset=self.cash + self.frozen_cash + market_value,
+            )
+
+    def query_stock_positions(self, account):
+        with self.lock:
+            return [
+                SimpleNamespace(
+                    account_id=getattr(account, 'account_id', ''),
+                    stock_code=code,
+                    volume=p['volume'],
+                    can_use_volume=p['can_use_volume'],
+                    open_price=p['open_price'],
+                    market_value=p['volume'] * self._last_price(code),
+                )
+                for code, p in self.positions.items()
+            ]
+
+    # ---- 行情驱动撮合 ----
+
+    def on_quote(self, stock_code, tick):
+        """
+        更新最新行情并撮合该股票的挂单（由SimQuoteSource在推送行情前调用）
+
+        Args:
+            stock_code (str): 股票代码
+            tick (dict): 行情
+        """
+        with self.lock:
+            self.quotes[stock_code] = tick
+            for order_id in list(self.working.get(stock_code, ())):
+                self._match(self.orders[order_id], 0)
+
+    def settle(self):
+        """日终结算：当日买入的持仓转为可用"""
+        with self.lock:
+            for position in self.positions.values():
+                position['can_use_volume'] = position['volume']
+
+    # ---- 内部实现 ----
+
+    def _last_price(self, stock_code):
+        tick = self.quotes.get(stock_code)
+        return float(tick['lastPrice']) if tick else 0.0
+
+    def _new_order(self, stock_code, order_type, order_volume, price_type, price, strategy_name, order_remark):
+        return SimpleNamespace(
+            account_id='', stock_code=stock_code, order_id=next(self._order_ids), order_sysid='',
+            order_time=int(time.time()), order_type=order_type, order_volume=int(order_volume),
+            price_type=price_type, price=float(price), traded_volume=0, traded_price=0.0,
+            order_status=ORDER_UNREPORTED, status_msg='', strategy_name=strategy_name,
+            order_remark=order_remark, frozen=0.0,
+        )
+
+    def _accept_async(self, order, seq):
+        self._accept(order, seq)
+
+    def _accept(self, order, seq):
+        """柜台接受委托：检查资金/持仓并冻结，然后尝试撮合"""
+        with self.lock:
+            self.orders[order.order_id] = order
+            if order.order_type == STOCK_BUY:
+                amount = order.price * order.order_volume
+                if amount > self.cash:
+                    return self._reject(order, seq, '可用资金不足')
+                order.frozen = amount
+                self.cash -= amount
+                self.frozen_cash += amount
+            else:
+                position = self.positions.get(order.stock_code)
+                if position is None or position['can_use_volume'] < order.order_volume:
+                    return self._reject(order, seq, '可用持仓不足')
+                position['can_use_volume'] -= order.order_volume
+            if seq:
+                self._push(0, 'on_order_stock_async_response', SimpleNamespace(
+                    account_id=order.account_id, order_id=order.order_id, seq=seq,
+                    strategy_name=order.strategy_name, order_remark=order.order_remark, error_msg=''))
+            order.order_status = ORDER_REPORTED
+            self._push_order(order, 0)
+            self.working.setdefault(order.stock_code, []).append(order.order_id)
+            self._match(order, self.fill_latency)
+
+    def _reject(self, order, seq, message):
+        order.order_status = ORDER_JUNK
+        order.status_msg = message
+        if seq:
+            self._push(0, 'on_order_stock_async_response', SimpleNamespace(
+                account_id=order.account_id, order_id=-1, seq=seq,
+                strategy_name=order.strategy_name, order_remark=order.order_remark, error_msg=message))
+        else:
+            self._push_order(order, 0)
+
+    def _match(self, order, delay):
+        """按最新行情撮合一个挂单（调用方持有锁）"""
+        tick = self.quotes.get(order.stock_code)
+        if tick is None or order.order_status != ORDER_REPORTED:
+            return
+        if order.order_type == STOCK_BUY:
+            best = float(tick['askPrice'][0])
+            if not best or order.price < best:
+                return
+        else:
+            best = float(tick['bidPrice'][0])
+            if not best or order.price > best:
+                return
+
+        volume = order.order_volume
+        amount = best * volume
+        fee = amount * self.commission_rate
+        position = self.positions.setdefault(order.stock_code, {'volume': 0, 'can_use_volume': 0, 'open_price': 0.0})
+        if order.order_type == STOCK_BUY:
+            self.frozen_cash -= order.frozen
+            self.cash += order.frozen - amount - fee
+            total = position['volume'] + volume
+            position['open_price'] = (position['open_price'] * position['volume'] + amount) / total
+            position['volume'] = total
+        else:
+            self.cash += amount - fee - amount * 0.0005
+            position['volume'] -= volume
+        order.frozen = 0.0
+        order.traded_volume = volume
+        order.traded_price = best
+        order.order_status = ORDER_SUCCEEDED
+        self.working[order.stock_code].remove(order.order_id)
+
+        self._push(delay, 'on_stock_trade', SimpleNamespace(
+            account_id=order.account_id, stock_code=order.stock_code, order_type=order.order_type,
+            traded_id=str(next(self._trade_ids)), traded_time=int(time.time()), traded_price=best,
+            traded_volume=volume, traded_amount=amount, order_id=order.order_id, order_sysid='',
+            strategy_name=order.strategy_name, order_remark=order.order_remark))
+        self._push_order(order, delay)
+
+    def _cancel_async(self, order_id, seq):
+        ok = self._cancel(order_id, seq)
+        self._push(0, 'on_cancel_order_stock_async_response', SimpleNamespace(
+            account_id='', order_id=order_id, seq=seq, cancel_result=0 if ok else -1))
+        if not ok:
+            self._push(0, 'on_cancel_error', SimpleNamespace(
+                account_id='', order_id=order_id, error_id=-1, error_msg='委托不可撤'))
+
+    def _cancel(self, order_id, seq):
+        """撤销挂单并释放冻结"""
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order is None or order.order_status != ORDER_REPORTED:
+                return False
+            if order.order_type == STOCK_BUY:
+                self.frozen_cash -= order.frozen
+                self.cash += order.frozen
+                order.frozen = 0.0
+            else:
+                self.positions[order.stock_code]['can_use_volume'] += order.order_volume
+            order.order_status = ORDER_CANCELED
+            self.working[order.stock_code].remove(order_id)
+            self._push_order(order, 0)
+            return True
+
+    def _push_order(self, order, delay):
+        # 推送委托快照，避免回调线程读到之后的状态变化
+        self._push(delay, 'on_stock_order', SimpleNamespace(**vars(order)))
+
+    def _push(self, delay, name, data):
+        self._schedule(delay, self._deliver, name, data)
+
+    def _deliver(self, name, data):
+        if self.callback is not None:
+            getattr(self.callback, name)(data)
+
+    def _schedule(self, delay, func, *args):
+        with self._cond:
+            heapq.heappush(self._events, (time.perf_counter() + delay, next(self._event_counter), func, args))
+            self._cond.notify()
+
+    def _run(self):
+        """回调线程：按送达时间依次执行"""
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if self._events:
+                        wait = self._events[0][0] - time.perf_counter()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if self._stopped:
+                    break
+                _, _, func, args = heapq.heappop(self._events)
+            try:
+                func(*args)
+            except Exception as e:
+                self.logger.error(f"模拟交易回调出错: {str(e)}")
+
+
+class SimQuoteSource:
+    """
+    模拟行情源
+
+    实现xtdata的subscribe_quote、subscribe_whole_quote、unsubscribe_quote，
+    按N倍速回放录制的或合成的tick：先交给SimTrader撮合挂单，再按订阅方式推送给回调
+    （subscribe_quote推送 {代码: [tick]}，subscribe_whole_quote推送 {代码: tick}）。
+    """
+
+    def __init__(self, trader=None):
+        """
+        初始化行情源
+
+        Args:
+            trader (SimTrader): 撮合用的模拟交易接口，None表示只推送行情
+        """
+        self.trader = trader
+        self.subscriptions = {}  # 订阅号 -> (股票代码集合, 是否为全推, 回调)
+        self._seqs = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def subscribe_quote(self, stock_code, period='tick', start_time='', end_time='', count=0, callback=None):
+        seq = next(self._seqs)
+        with self.lock:
+            self.subscriptions[seq] = ({stock_code}, False, callback)
+        return seq
+
+    def subscribe_whole_quote(self, code_list, callback=None):
+        seq = next(self._seqs)
+        with self.lock:
+            self.subscriptions[seq] = (set(code_list), True, callback)
+        return seq
+
+    def unsubscribe_quote(self, seq):
+        with self.lock:
+            self.subscriptions.pop(seq, None)
+
+    def push(self, stock_code, tick):
+        """
+        推送一笔行情
+
+        Args:
+            stock_code (str): 股票代码
+            tick (dict): 行情
+        """
+        if self.trader is not None:
+            self.trader.on_quote(stock_code, tick)
+        with self.lock:
+            subscriptions = list(self.subscriptions.values())
+        for codes, whole, callback in subscriptions:
+            if callback is not None and stock_code in codes:
+                callback({stock_code: tick if whole else [tick]})
+
+    def replay(self, ticks, speed=1.0):
+        """
+        按时间顺序回放行情
+
+        Args:
+            ticks: (股票代码, tick) 序列，按tick['time']升序
+            speed (float): 回放倍速，0表示不等待、尽快推送
+        Returns:
+            int: 推送的行情数
+        """
+        count = 0
+        first_time = None
+        started = time.perf_counter()
+        for stock_code, tick in ticks:
+            if speed > 0:
+                if first_time is None:
+                    first_time = tick['time']
+                due = started + (tick['time'] - first_time) / 1000 / speed
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            self.push(stock_code, tick)
+            count += 1
+        return count
+
+
+def synthetic_ticks(stock_code, count, price=10.0, start_ms=None, interval_ms=3000, tick_size=0.01, seed=None):
+    """
+    生成随机游走的合成tick
+
+    Args:
+        stock_code (str): 股票代码
+        count (int): tick数量
+        price (float): 起始价格
+        start_ms (int): 第一笔tick的时间（毫秒时间戳），None表示当天北京时间9:31
+        interval_ms (int): tick间隔（毫秒）
+        tick_size (float): 最小报价单位
+        seed (int): 随机种子
+    Returns:
+        generator: (股票代码, tick) 序列
+    """
+    rng = np.random.default_rng(seed)
+    if start_ms is None:
+        start_ms = day_index(time.time() * 1000) * DAY_MS - BEIJING_OFFSET_MS + (9 * 60 + 31) * 60000
+    last_close = price
+    high = low = price
+    total_volume = 0
+    precision = len(str(tick_size).split('.')[-1])
+    for i in range(count):
+        price = max(tick_size, round(price + rng.choice((-1, 0, 0, 1)) * tick_size, precision))
+        high = max(high, price)
+        low = min(low, price)
+        total_volume += int(rng.integers(1, 200))
+        bid = [round(price - (level + 1) * tick_size, precision) for level in range(5)]
+        ask = [round(price + level * tick_size, precision) for level in range(5)]
+        yield stock_code, {
+            'time': start_ms + i * interval_ms,
+            'lastPrice': price,
+            'open': last_close,
+            'high': high,
+            'low': low,
+            'lastClose': last_close,
+            'volume': total_volume,
+            'amount': total_volume * 100 * price,
+            'bidPrice': bid,
+            'askPrice': ask,
+            'bidVol': [int(v) for v in rng.integers(10, 400, 5)],
+            'askVol': [int(v) for v in rng.integers(10, 400, 5)],
+        }
+
+
+def frame_ticks(stock_code, df):
+    """
+    把录制的tick DataFrame（xtdata的tick格式）转换为回放序列
+
+    Args:
+        stock_code (str): 股票代码
+        df (pd.DataFrame): tick数据，包含time、lastPrice和五档列
+    Returns:
+        generator: (股票代码, tick) 序列
+    """
+    for tick in df.to_dict('records'):
+        yield stock_code, tick
+
+
+def install(trader, quotes):
+    """
+    没有安装xtquant时，用模拟实现注册xtquant、xtquant.xttrader、xtquant.xttype、
+    xtquant.xtconstant、xtquant.xtdata模块，使live_engine等模块可以直接导入
+
+    Args:
+        trader (SimTrader): XtQuantTrader(...)返回的模拟交易接口
+        quotes (SimQuoteSource): xtdata的模拟实现
+    Returns:
+        bool: 是否注册了模拟模块（已安装xtquant时返回False）
+    """
+    try:
+        importlib.import_module('xtquant')
+        return False
+    except ImportError:
+        pass
+
+    package = types.ModuleType('xtquant')
+    package.__path__ = []
+
+    xttrader = types.ModuleType('xtquant.xttrader')
+    xttrader.XtQuantTrader = lambda path=None, session_id=None: trader
+    xttrader.XtQuantTraderCallback = SimXtQuantTraderCallback
+
+    xttype = types.ModuleType('xtquant.xttype')
+    xttype.StockAccount = SimStockAccount
+
+    xtconstant = types.ModuleType('xtquant.xtconstant')
+    for name, value in globals().items():
+        if name.startswith(('STOCK_', 'ORDER_')) or name in ('FIX_PRICE', 'LATEST_PRICE'):
+            setattr(xtconstant, name, value)
+
+    xtdata = types.ModuleType('xtquant.xtdata')
+    xtdata.enable_hello = False
+    xtdata.subscribe_quote = quotes.subscribe_quote
+    xtdata.subscribe_whole_quote = quotes.subscribe_whole_quote
+    xtdata.unsubscribe_quote = quotes.unsubscribe_quote
+
+    for module in (xttrader, xttype, xtconstant, xtdata):
+        setattr(package, module.__name__.split('.')[-1], module)
+        sys.modules[module.__name__] = module
+    sys.modules['xtquant'] = package
+    return True
+
+
+def run_benchmark(symbols, ticks, speed, latency, max_age):
+    """
+    用模拟交易接口和合成行情压测实盘链路（LiveEngine + 策略 + 回报分发）
+
+    Args:
+        symbols (int): 同时交易的股票数
+        ticks (int): 每只股票的tick数
+        speed (float): 回放倍速，0表示尽快推送
+        latency (float): 柜台往返延迟（秒）
+        max_age (float): 行情允许的最长等待时间（秒）
+    """
+    codes = [f"{600000 + i:06d}.SH" for i in range(symbols)]
+    trader = SimTrader(positions={code: 10000 for code in codes}, latency=latency, fill_latency=latency)
+    quotes = SimQuoteSource(trader)
+    install(trader, quotes)
+
+    from live_engine import LiveEngine
+    from order_book_strategy import OrderBookStrategy
+    from tick_mailbox import TickMailbox
+
+    logger = logging.getLogger('LiveTrade')
+    engine = LiveEngine(trader, 'SIM')
+    engine.connect()
+    engine.update_asset_positions()
+    for code in codes:
+        context = engine.add_symbol(code, target_position=10000)
+        context.set_strategy(OrderBookStrategy(context, bid_vol_threshold=500, ask_vol_threshold=300, logger=logger))
+
+    mailbox = TickMailbox(engine.on_tick, max_age=max_age, report_interval=0, logger=logger)
+    mailbox.start()
+    quotes.subscribe_whole_quote(codes, callback=mailbox.put_all)
+
+    streams = [synthetic_ticks(code, ticks, seed=i) for i, code in enumerate(codes)]
+    started = time.perf_counter()
+    pushed = quotes.replay(heapq.merge(*streams, key=lambda item: item[1]['time']), speed)
+    while mailbox.depth or engine.dispatcher.depth:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    mailbox.stop()
+
+    print(f"推送行情: {pushed}笔，耗时: {elapsed:.2f}秒，吞吐: {pushed / elapsed:.0f}笔/秒")
+    print(f"行情信箱: {mailbox.stats()}")
+    print(f"回报分发: {engine.dispatcher.stats()}")
+    for stock_code, metric, count, p50, p99, max_us in engine.latency.rows():
+        print(f"{stock_code} {metric:<14} n={count:<6} p50={p50:.0f}us p99={p99:.0f}us max={max_us:.0f}us")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='用模拟交易接口压测实盘链路')
+    parser.add_argument('--symbols', type=int, default=5, help='同时交易的股票数')
+    parser.add_argument('--ticks', type=int, default=2000, help='每只股票的tick数')
+    parser.add_argument('--speed', type=float, default=0, help='回放倍速，0表示尽快推送')
+    parser.add_argument('--latency', type=float, default=5, help='柜台往返延迟（毫秒）')
+    parser.add_argument('--max-age', type=float, default=3.0, help='行情允许的最长等待时间（秒）')
+    parser.add_argument('--log-level', default='WARNING', help='日志级别')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    run_benchmark(args.symbols, args.ticks, args.speed, args.latency / 1000, args.max_age)
@@ -0,0 +1,151 @@
+import builtins
+import logging
+import sys
+import threading
+import time
+
+PROFILE_FLAG = '--profile-startup'
+
+
+class StartupProfiler:
+    """
+    启动耗时统计
+
+    命令行带 --profile-startup 时启用：install_import_hook()之后主线程中的每个顶层导入按模块计时
+    （只记录最外层，被依赖模块的耗时计入导入它的模块），phase()按阶段记录初始化耗时，mark()记录
+    从程序启动到某个时刻（如首次绘制）的时间，report()输出按耗时排序的报告。未启用时各方法不做任何事。
+
+    Attributes:
+        enabled (bool): 是否启用
+        imports (list): [(模块名, 耗时（秒）), ...]
+        phases (list): [(阶段名, 耗时（秒）), ...]
+        marks (list): [(时刻名, 距启动的秒数), ...]
+    """
+
+    def __init__(self, enabled=False):
+        """
+        初始化启动耗时统计
+
+        Args:
+            enabled (bool): 是否启用
+        """
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.imports = []
+        self.phases = []
+        self.marks = []
+        self._original_import = None
+        self._thread = threading.get_ident()
+        self._depth = 0
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if threading.get_ident() != self._thread or (level == 0 and name in sys.modules):
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.imports.append((name, time.perf_counter() - started))
+
+    def install_import_hook(self):
+        """开始按模块记录导入耗时"""
+        if not self.enabled or self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def remove_import_hook(self):
+        """停止记录导入耗时"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def phase(self, name):
+        """
+        记录一个初始化阶段的耗时
+
+        Args:
+            name (str): 阶段名
+        Returns:
+            上下文管理器，with块内的耗时计入该阶段
+        """
+        return _Phase(self, name)
+
+    def mark(self, name):
+        """
+        记录从程序启动到当前的时间
+
+        Args:
+            name (str): 时刻名
+        """
+        if self.enabled:
+            self.marks.append((name, time.perf_counter() - self.started))
+
+    def report(self, logger=None, top=20):
+        """
+        输出启动耗时报告
+
+        Args:
+            logger: 日志记录器，如果为None则使用默认logger
+            top (int): 导入耗时最多列出的模块数
+        Returns:
+            list: 报告各行文本，未启用时为空
+        """
+        if not self.enabled:
+            return []
+        self.remove_import_hook()
+        lines = ["启动耗时统计："]
+        total_import = sum(elapsed for _, elapsed in self.imports)
+        lines.append(f"导入模块共{total_import:.3f}秒，耗时最多的{min(top, len(self.imports))}个：")
+        for name, elapsed in sorted(self.imports, key=lambda item: item[1], reverse=True)[:top]:
+            lines.append(f"  {name:<32}{elapsed:8.3f}秒")
+        lines.append("初始化阶段：")
+        for name, elapsed in self.phases:
+            lines.append(f"  {name:<32}{elapsed:8.3f}秒")
+        lines.append("启动时刻：")
+        for name, elapsed in self.marks:
+            lines.append(f"  {name:<32}{elapsed:8.3f}秒")
+        logger = logger or logging.getLogger('LiveTrade')
+        for line in lines:
+            logger.info(line)
+        return lines
+
+
+class _Phase:
+    """StartupProfiler.phase()返回的上下文管理器"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.profiler.enabled:
+            self.profiler.phases.append((self.name, time.perf_counter() - self.started))
+        return False
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    """
+    获取全局启动耗时统计实例（命令行带 --profile-startup 时启用）
+
+    Returns:
+        StartupProfiler: 启动耗时统计实例
+    """
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = StartupProfiler(enabled=PROFILE_FLAG in sys.argv)
+    return _profiler
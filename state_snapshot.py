@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+DEFAULT_SNAPSHOT_FILE = os.path.join(os.path.dirname(__file__), 'data', 'state', 'live_state.json')
+SNAPSHOT_VERSION = 1
+
+
+def _to_builtin(value):
+    """把numpy标量等对象转换为json可序列化的内置类型"""
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+class StateSnapshot:
+    """
+    实盘状态快照
+
+    引擎和策略状态变化时写一个小的json文件，重启交易线程或整个程序后从中恢复，
+    同一交易日内继续使用原来的买卖点、当日统计和单笔交易数量。
+    先写临时文件再替换，写到一半退出也不会留下损坏的快照。
+
+    Attributes:
+        path (str): 快照文件路径
+        saves (int): 写入次数
+    """
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_FILE, logger=None):
+        """
+        初始化快照
+
+        Args:
+            path (str): 快照文件路径
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.path = path
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self.saves = 0
+
+    def save(self, state):
+        """
+        原子写入快照
+
+        Args:
+            state (dict): 引擎状态（见LiveEngine.get_state）
+        Returns:
+            bool: 是否写入成功
+        """
+        data = dict(state, version=SNAPSHOT_VERSION, saved_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        temp = self.path + '.tmp'
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, default=_to_builtin)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, self.path)
+            self.saves += 1
+            return True
+        except Exception as e:
+            self.logger.error(f"写入状态快照失败: {str(e)}")
+            return False
+
+    def load(self):
+        """
+        读取快照
+
+        Returns:
+            dict: 快照内容，文件不存在、损坏或版本不符时返回None
+        """
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            self.logger.error(f"读取状态快照失败: {str(e)}")
+            return None
+        if data.get('version') != SNAPSHOT_VERSION:
+            return None
+        return data
+
+    def clear(self):
+        """删除快照文件"""
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except Exception as e:
+            self.logger.error(f"删除状态快照失败: {str(e)}")
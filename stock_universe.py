@@ -0,0 +1,236 @@
+import logging
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import pandas as pd
+from instrument_registry import get_registry, DEFAULT_CSV_FILE
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(__file__), 'data', 'stock_universe.pkl')
+UNIVERSE_COLUMNS = ['证券代码', '证券简称', '上市日期']
+
+
+def _fetch_sh():
+    import akshare as ak  # 导入很慢，只在需要联网获取时导入
+    df = ak.stock_info_sh_name_code()
+    return df[['证券代码', '证券简称', '上市日期']].copy()
+
+
+def _fetch_sz():
+    import akshare as ak
+    df = ak.stock_info_sz_name_code()
+    df = df[['A股代码', 'A股简称', 'A股上市日期']].copy()
+    return df.rename(columns={'A股代码': '证券代码', 'A股简称': '证券简称', 'A股上市日期': '上市日期'})
+
+
+def _fetch_bj():
+    import akshare as ak
+    df = ak.stock_info_bj_name_code()
+    return df[['证券代码', '证券简称', '上市日期']].copy()
+
+
+def _fetch_etf():
+    import akshare as ak
+    df = ak.fund_etf_spot_em()
+    df = df[['代码', '名称']].copy().rename(columns={'代码': '证券代码', '名称': '证券简称'})
+    df['上市日期'] = ''
+    return df
+
+
+# 数据源：名称 -> (获取函数, 缓存有效期（自然日）)
+# 有效期按日历日计算：1表示当天获取的才有效（前一天获取的过了零点即过期），与开盘前刷新的习惯一致
+DEFAULT_SOURCES = {
+    'sh': (_fetch_sh, 1),
+    'sz': (_fetch_sz, 1),
+    'bj': (_fetch_bj, 1),
+    'etf': (_fetch_etf, 3),   # ETF列表变化少，接口又最慢
+}
+
+
+class StockUniverse:
+    """
+    全市场股票和ETF列表
+
+    各数据源（沪、深、京、ETF）分别缓存并有各自的有效期，缓存为一个pickle文件（data/stock_universe.pkl）。
+    load()直接返回缓存（即使已过期），界面不用等待网络；refresh_async()在后台线程中并发获取过期的数据源，
+    完成后更新缓存、证券元数据注册表和兼容用的all_a_stocks.csv。只有第一次使用、没有任何缓存时才在load()中同步获取。
+
+    Attributes:
+        sources (dict): 数据源名称 -> (获取函数, 缓存有效期（自然日）)
+        cache_file (str): 缓存文件路径
+    """
+
+    def __init__(self, sources=None, cache_file=DEFAULT_CACHE_FILE, csv_file=DEFAULT_CSV_FILE, logger=None):
+        """
+        初始化股票列表
+
+        Args:
+            sources (dict): 数据源名称 -> (获取函数, 缓存有效期（自然日）)，None表示全部默认数据源
+            cache_file (str): 缓存文件路径
+            csv_file (str): 兼容用的股票列表CSV文件路径（回测等进程从这里加载证券元数据）
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.sources = sources or DEFAULT_SOURCES
+        self.cache_file = cache_file
+        self.csv_file = csv_file
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self._entries = {}      # 数据源名称 -> {'fetched_at': 时间戳, 'frame': DataFrame}
+        self._frame = None
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+        self._loaded = False
+
+    @property
+    def frame(self):
+        """合并后的股票列表（证券代码、证券简称、上市日期）"""
+        if not self._loaded:
+            self.load()
+        return self._frame
+
+    def _read_cache(self):
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            self.logger.error(f"读取{self.cache_file}文件时出错: {e}")
+            return {}
+
+    def _write_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            temp = self.cache_file + '.tmp'
+            with open(temp, 'wb') as f:
+                pickle.dump(self._entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self.cache_file)
+        except Exception as e:
+            self.logger.error(f"写入{self.cache_file}文件时出错: {e}")
+
+    def _rebuild(self):
+        """合并各数据源并更新证券元数据注册表"""
+        frames = [self._entries[name]['frame'] for name in self.sources if name in self._entries]
+        if not frames:
+            return
+        frame = pd.concat(frames, ignore_index=True)
+        frame['证券代码'] = frame['证券代码'].astype(str)
+        self._frame = frame
+        get_registry().load_frame(frame)
+
+    def load(self):
+        """
+        加载股票列表：优先使用缓存（过期或缺少部分数据源也先用），没有任何缓存时同步获取
+
+        Returns:
+            pd.DataFrame: 合并后的股票列表
+        """
+        with self._lock:
+            self._entries.update(self._read_cache())
+        if not self._entries:
+            if os.path.exists(self.csv_file):
+                # 还没有缓存文件时先用旧的CSV顶上，由后台刷新获取各数据源
+                try:
+                    self._frame = pd.read_csv(self.csv_file, dtype={'证券代码': str})
+                    get_registry().load_frame(self._frame)
+                    self._loaded = True
+                    self.logger.info(f"已从{self.csv_file}文件读取股票列表，后台更新中")
+                    return self._frame
+                except Exception as e:
+                    self.logger.error(f"读取{self.csv_file}文件时出错: {e}")
+            # 首次使用，没有任何缓存，只能同步获取
+            self.refresh(list(self.sources))
+        else:
+            with self._lock:
+                self._rebuild()
+            self.logger.info(f"已从{self.cache_file}文件读取股票列表，共{len(self._frame)}只")
+        self._loaded = True
+        return self._frame
+
+    def stale_sources(self):
+        """
+        获取缓存已过期或从未获取的数据源
+
+        获取日期距今天的天数达到有效期即过期，例如有效期1天时昨天23:59获取的缓存今天已过期。
+
+        Returns:
+            list: 数据源名称
+        """
+        today = date.today()
+        return [
+            name for name, (_, days) in self.sources.items()
+            if name not in self._entries
+            or (today - date.fromtimestamp(self._entries[name]['fetched_at'])).days >= days
+        ]
+
+    def _fetch(self, name):
+        fetch, _ = self.sources[name]
+        started = time.perf_counter()
+        frame = fetch()
+        frame = frame[UNIVERSE_COLUMNS].copy()
+        frame['证券代码'] = frame['证券代码'].astype(str)
+        return frame, time.perf_counter() - started
+
+    def refresh(self, names=None):
+        """
+        并发获取数据源并更新缓存，获取失败的数据源保留原来的缓存
+
+        Args:
+            names (list): 要获取的数据源名称，None表示全部过期的数据源
+        Returns:
+            list: 获取成功的数据源名称
+        """
+        names = self.stale_sources() if names is None else list(names)
+        if not names:
+            return []
+        updated = []
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix='StockUniverse') as executor:
+            futures = {name: executor.submit(self._fetch, name) for name in names}
+            results = {}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    self.logger.error(f"获取股票列表（{name}）失败: {e}")
+        with self._lock:
+            for name, (frame, elapsed) in results.items():
+                self._entries[name] = {'fetched_at': time.time(), 'frame': frame}
+                updated.append(name)
+                self.logger.info(f"已获取股票列表（{name}），共{len(frame)}只，耗时{elapsed:.1f}秒")
+            if updated:
+                self._rebuild()
+                self._write_cache()
+                try:
+                    self._frame.to_csv(self.csv_file, index=False, encoding='utf-8')
+                except Exception as e:
+                    self.logger.error(f"写入{self.csv_file}文件时出错: {e}")
+        return updated
+
+    def refresh_async(self):
+        """在后台线程中刷新过期的数据源（已有刷新在进行时不重复启动）"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        if not self.stale_sources():
+            return
+        self._refresh_thread = threading.Thread(target=self.refresh, name='StockUniverseRefresh', daemon=True)
+        self._refresh_thread.start()
+
+
+_universe = None
+_universe_lock = threading.Lock()
+
+
+def get_universe():
+    """
+    获取全局股票列表实例
+
+    Returns:
+        StockUniverse: 股票列表实例
+    """
+    global _universe
+    if _universe is None:
+        with _universe_lock:
+            if _universe is None:
+                _universe = StockUniverse()
+    return _universe
@@ -10,8 +10,14 @@ class StrategyBase(ABC):
     Attributes:
         engine: 交易引擎实例（回测或实盘）
         logger: 日志记录器
+        required_features (tuple): 策略需要的盘口特征列名（见order_book_features），
+            回测引擎加载数据后会预先计算这些列，实盘引擎每个tick计算一次
+        state_fields (tuple): 需要保存到实盘状态快照的属性名，重启后按快照恢复
     """
     
+    required_features = ()
+    state_fields = ()
+    
     def __init__(self, engine):
         """
         初始化策略
@@ -60,6 +66,34 @@ class StrategyBase(ABC):
         """
         pass
         
+    def get_state(self):
+        """
+        获取需要保存的策略状态
+        
+        Returns:
+            dict: 属性名 -> 值（只包含state_fields中的属性）
+        """
+        state = {}
+        for field in self.state_fields:
+            value = getattr(self, field, None)
+            state[field] = dict(value) if isinstance(value, dict) else value
+        return state
+        
+    def set_state(self, state):
+        """
+        从快照恢复策略状态
+        
+        Args:
+            state (dict): get_state()返回的状态
+        """
+        for field in self.state_fields:
+            if field in state:
+                setattr(self, field, state[field])
+        
+    def state_changed(self):
+        """通知引擎策略状态已变化（实盘引擎据此更新状态快照，回测引擎忽略）"""
+        self.engine.on_strategy_state_changed(self)
+        
     def buy(self, stock_code, price, volume, datetime):
         """买入接口"""
         return self.engine.buy(stock_code, price, volume, datetime)
@@ -80,6 +114,25 @@ class StrategyBase(ABC):
         """获取账户状态"""
         return self.engine.get_account_status()
         
+    def on_day_open(self, trading_date):
+        """
+        新交易日开始的回调方法（引擎在当日第一条行情之前调用，可选实现）
+        
+        回测引擎调用前已完成T+1可用持仓结算，实盘引擎调用前已从柜台刷新持仓。
+        Args:
+            trading_date (str): 交易日，格式YYYYMMDD
+        """
+        pass
+        
+    def on_day_close(self, trading_date):
+        """
+        交易日结束的回调方法（引擎切换到下一交易日或回测结束时调用，可选实现）
+        
+        Args:
+            trading_date (str): 交易日，格式YYYYMMDD
+        """
+        pass
+        
     def before_trading(self):
         """盘前处理（可选实现）"""
         pass
@@ -0,0 +1,59 @@
+class SymbolContext:
+    """
+    单只股票的交易上下文
+
+    一个LiveEngine同时交易多只股票时，每只股票有自己的上下文，策略把上下文当作engine使用：
+    股票代码、目标仓位、最新五档价格和策略实例属于上下文自己，
+    其余属性和方法（下单、资金持仓查询、交易日等）都转给共享的LiveEngine，
+    因此多只股票共用一个交易连接、一次行情订阅和一个本地资金持仓账本。
+
+    Attributes:
+        engine: 共享的LiveEngine
+        stock_code (str): 股票代码
+        target_position (int): 目标持仓量
+        strategy: 策略实例
+        bidPrices (list): 最新买五档价格（策略每个tick写入，下单定价时读取）
+        askPrices (list): 最新卖五档价格
+        book_features (dict): 最新tick的盘口特征
+    """
+
+    def __init__(self, engine, stock_code, target_position=0):
+        """
+        初始化上下文
+
+        Args:
+            engine: 共享的LiveEngine
+            stock_code (str): 股票代码
+            target_position (int): 目标持仓量
+        """
+        self.engine = engine
+        self.stock_code = stock_code
+        self.target_position = target_position
+        self.strategy = None
+        self.bidPrices = [0.0] * 5
+        self.askPrices = [0.0] * 5
+        self.book_features = {}
+
+    def __getattr__(self, name):
+        # 只有上下文自身没有的属性才会走到这里
+        if name == 'engine':
+            raise AttributeError(name)
+        return getattr(self.engine, name)
+
+    def set_strategy(self, strategy):
+        """
+        设置该股票的交易策略
+
+        Args:
+            strategy: 策略实例（创建时传入本上下文作为engine）
+        """
+        self.strategy = strategy
+
+    def set_target_position(self, target_position):
+        """
+        设置目标持仓量
+
+        Args:
+            target_position (int): 目标持仓量
+        """
+        self.target_position = target_position
@@ -0,0 +1,328 @@
+import glob
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from session_schedule import BEIJING_OFFSET_MS, MINUTES_PER_DAY, DAY_MS, day_index
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), 'data', 'ticks')
+
+# 按列存储的tick字段：标量列和五档列（每行5个值）
+SCALAR_FIELDS = ('time', 'lastPrice', 'open', 'high', 'low', 'lastClose', 'amount', 'volume',
+                 'pvolume', 'stockStatus', 'openInt', 'transactionNum', 'lastSettlementPrice')
+LEVEL_FIELDS = ('askPrice', 'bidPrice', 'askVol', 'bidVol')
+LEVELS = 5
+
+# 加载存档时只保留这段时间的tick，与下载数据的093000~150000一致（北京时间当日毫秒数）
+SESSION_START_MS = (9 * 3600 + 30 * 60) * 1000     # 09:30:00
+SESSION_END_MS = 15 * 3600 * 1000 + 999            # 15:00:00
+
+# 当日存档覆盖这段时间才视为完整，可以代替下载的数据用于回测
+COMPLETE_FROM = 9 * 60 + 31     # 09:31
+COMPLETE_TO = 14 * 60 + 55      # 14:55
+# 需要有tick的分钟（上午和下午的连续竞价时段），中间连续缺失超过MAX_GAP_MINUTES分钟视为记录中断
+REQUIRED_MINUTES = np.r_[COMPLETE_FROM:11 * 60 + 30, 13 * 60:COMPLETE_TO + 1]
+MAX_GAP_MINUTES = 2
+
+
+def _day_dir(root, trading_date):
+    return os.path.join(root, trading_date)
+
+
+def _trading_date(time_ms):
+    """毫秒时间戳对应的北京时间日期字符串YYYYMMDD"""
+    return (datetime(1970, 1, 1) + timedelta(days=day_index(time_ms))).strftime('%Y%m%d')
+
+
+def ticks_to_columns(ticks):
+    """
+    把tick列表转换为列数组
+
+    Args:
+        ticks (list): tick字典列表
+    Returns:
+        dict: 字段名 -> numpy数组（五档字段为 (N, 5) 数组）
+    """
+    columns = {}
+    for field in SCALAR_FIELDS:
+        dtype = np.int64 if field == 'time' else float
+        columns[field] = np.array([tick.get(field, 0) or 0 for tick in ticks], dtype=dtype)
+    for field in LEVEL_FIELDS:
+        matrix = np.zeros((len(ticks), LEVELS), dtype=float)
+        for i, tick in enumerate(ticks):
+            levels = list(tick.get(field) or ())[:LEVELS]
+            matrix[i, :len(levels)] = levels
+        columns[field] = matrix
+    return columns
+
+
+def _concat_columns(parts):
+    """合并多段列数组，按时间排序并去掉重复时间"""
+    columns = {field: np.concatenate([part[field] for part in parts]) for field in parts[0]}
+    _, first = np.unique(columns['time'], return_index=True)
+    return {field: values[first] for field, values in columns.items()}
+
+
+def _load_npz(path):
+    with np.load(path) as data:
+        return {field: data[field] for field in data.files}
+
+
+def load_day(stock_code, trading_date, root=DEFAULT_ARCHIVE_DIR):
+    """
+    读取一只股票一个交易日的存档（含尚未合并的分段文件）
+
+    Args:
+        stock_code (str): 股票代码，如'600000.SH'
+        trading_date (str): 交易日YYYYMMDD
+        root (str): 存档根目录
+    Returns:
+        dict: 字段名 -> numpy数组，没有存档时返回None
+    """
+    directory = _day_dir(root, trading_date)
+    paths = glob.glob(os.path.join(directory, f"{stock_code}.npz"))
+    paths += sorted(glob.glob(os.path.join(directory, f"{stock_code}.*.part.npz")))
+    if not paths:
+        return None
+    return _concat_columns([_load_npz(path) for path in paths])
+
+
+def trim_session(columns):
+    """
+    只保留09:30:00~15:00:00的tick（去掉集合竞价和盘后的数据）
+
+    Args:
+        columns (dict): 字段名 -> numpy数组
+    Returns:
+        dict: 裁剪后的列数组
+    """
+    ms_of_day = (columns['time'] + BEIJING_OFFSET_MS) % DAY_MS
+    mask = (ms_of_day >= SESSION_START_MS) & (ms_of_day <= SESSION_END_MS)
+    return {field: values[mask] for field, values in columns.items()}
+
+
+def is_complete_day(columns):
+    """
+    当日存档是否覆盖回测的交易时段
+
+    除了首尾时间，还要求连续竞价时段内每分钟都有tick，连续缺失不超过MAX_GAP_MINUTES分钟
+    （成交不活跃时偶尔一两分钟没有推送），中途断线漏记的存档不能代替下载的数据。
+    """
+    if columns is None or len(columns['time']) == 0:
+        return False
+    minutes = (columns['time'] + BEIJING_OFFSET_MS) // 60000 % MINUTES_PER_DAY
+    if minutes.min() > COMPLETE_FROM or minutes.max() < COMPLETE_TO:
+        return False
+    gap = 0
+    for covered in np.isin(REQUIRED_MINUTES, minutes):
+        gap = 0 if covered else gap + 1
+        if gap > MAX_GAP_MINUTES:
+            return False
+    return True
+
+
+def columns_to_frame(columns):
+    """
+    把列数组转换为与xtdata.get_market_data_ex相同格式的DataFrame（五档列每行一个列表）
+
+    Args:
+        columns (dict): 字段名 -> numpy数组
+    Returns:
+        pd.DataFrame: 以北京时间为索引的tick数据
+    """
+    data = {field: columns[field] for field in SCALAR_FIELDS}
+    for field in LEVEL_FIELDS:
+        data[field] = columns[field].tolist()
+    index = pd.to_datetime(columns['time'] + BEIJING_OFFSET_MS, unit='ms')
+    return pd.DataFrame(data, index=index)
+
+
+def load_ticks(stock_code, start_date, end_date, root=DEFAULT_ARCHIVE_DIR):
+    """
+    从本地存档加载一段时间的tick数据
+
+    区间内每个交易日都有完整存档时才返回数据，否则返回None，由调用方改为下载。
+    与下载的数据一样只保留每天09:30:00~15:00:00的tick。
+
+    Args:
+        stock_code (str): 股票代码，如'600000.SH'
+        start_date: 开始日期（date或datetime）
+        end_date: 结束日期（date或datetime）
+        root (str): 存档根目录
+    Returns:
+        pd.DataFrame: tick数据，存档不完整时返回None
+    """
+    from chncal import is_tradeday  # 导入较慢，加载存档时才导入，不拖慢实盘程序启动
+    days = []
+    day = pd.Timestamp(start_date).date()
+    last_day = pd.Timestamp(end_date).date()
+    while day <= last_day:
+        if is_tradeday(day):
+            columns = load_day(stock_code, day.strftime('%Y%m%d'), root)
+            if columns is not None:
+                columns = trim_session(columns)
+            if not is_complete_day(columns):
+                return None
+            days.append(columns)
+        day += timedelta(days=1)
+    if not days:
+        return None
+    return columns_to_frame(_concat_columns(days))
+
+
+def compact_day(stock_code, trading_date, root=DEFAULT_ARCHIVE_DIR):
+    """
+    把一个交易日的分段文件合并为一个文件
+
+    Args:
+        stock_code (str): 股票代码
+        trading_date (str): 交易日YYYYMMDD
+        root (str): 存档根目录
+    """
+    directory = _day_dir(root, trading_date)
+    parts = glob.glob(os.path.join(directory, f"{stock_code}.*.part.npz"))
+    if not parts:
+        return
+    columns = load_day(stock_code, trading_date, root)
+    target = os.path.join(directory, f"{stock_code}.npz")
+    temp = os.path.join(directory, f"{stock_code}.tmp.npz")
+    np.savez_compressed(temp, **columns)
+    os.replace(temp, target)
+    for path in parts:
+        os.remove(path)
+
+
+class TickRecorder:
+    """
+    实盘tick记录器
+
+    行情回调线程只把tick追加到内存缓冲区，后台线程每flush_interval秒按列写一个分段文件，
+    文件按交易日分目录（data/ticks/YYYYMMDD/代码.npz），交易日切换或停止时把分段合并为一个文件。
+    回测引擎加载tick数据时先读这里的存档，完整时不再下载。
+
+    Attributes:
+        root (str): 存档根目录
+        flush_interval (float): 写文件的间隔（秒）
+    """
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR, flush_interval=5.0, logger=None):
+        """
+        初始化记录器
+
+        Args:
+            root (str): 存档根目录
+            flush_interval (float): 写文件的间隔（秒）
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.root = root
+        self.flush_interval = flush_interval
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self._buffers = {}          # 股票代码 -> 待写入的tick列表
+        self._last_time = {}        # 股票代码 -> 最近记录的tick时间（去重）
+        self._open_days = set()     # 有未合并分段的 (股票代码, 交易日)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.recorded = 0
+
+    def start(self):
+        """启动后台写入线程（重复调用无副作用）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='TickRecorder', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """
+        写完缓冲区、合并当日分段后停止
+
+        Args:
+            timeout (float): 等待线程结束的最长时间（秒）
+        """
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, stock_code, tick):
+        """
+        记录一笔tick（在行情回调线程中调用，只做追加）
+
+        Args:
+            stock_code (str): 股票代码
+            tick (dict): tick数据
+        """
+        tick_time = tick['time']
+        with self._lock:
+            if tick_time <= self._last_time.get(stock_code, 0):
+                return
+            self._last_time[stock_code] = tick_time
+            self._buffers.setdefault(stock_code, []).append(tick)
+
+    def record_all(self, data):
+        """
+        记录按股票代码组织的行情推送
+
+        Args:
+            data (dict): 股票代码 -> tick列表（subscribe_quote）或tick（subscribe_whole_quote）
+        """
+        for stock_code, ticks in data.items():
+            if isinstance(ticks, list):
+                for tick in ticks:
+                    self.record(stock_code, tick)
+            else:
+                self.record(stock_code, ticks)
+
+    def flush(self):
+        """把缓冲区写成分段文件，交易日已切换的分段合并为一个文件"""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+        latest_day = None
+        for stock_code, ticks in buffers.items():
+            by_day = {}
+            for tick in ticks:
+                by_day.setdefault(_trading_date(tick['time']), []).append(tick)
+            for trading_date, day_ticks in by_day.items():
+                self._write_part(stock_code, trading_date, day_ticks)
+                latest_day = max(latest_day or trading_date, trading_date)
+        if latest_day is not None:
+            self.compact(before=latest_day)
+
+    def _write_part(self, stock_code, trading_date, ticks):
+        try:
+            directory = _day_dir(self.root, trading_date)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{stock_code}.{ticks[0]['time']}.part.npz")
+            np.savez(path, **ticks_to_columns(ticks))
+            self._open_days.add((stock_code, trading_date))
+            self.recorded += len(ticks)
+        except Exception as e:
+            self.logger.error(f"股票代码：{stock_code}，写入tick存档失败: {str(e)}")
+
+    def compact(self, before=None):
+        """
+        合并分段文件
+
+        Args:
+            before (str): 只合并早于该交易日的分段，None表示全部合并
+        """
+        for stock_code, trading_date in sorted(self._open_days):
+            if before is not None and trading_date >= before:
+                continue
+            try:
+                compact_day(stock_code, trading_date, self.root)
+                self._open_days.discard((stock_code, trading_date))
+            except Exception as e:
+                self.logger.error(f"股票代码：{stock_code}，合并{trading_date}的tick存档失败: {str(e)}")
+
+    def _run(self):
+        """后台写入线程主循环"""
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+        self.compact()
+        self.logger.info(f"tick记录器已停止，共记录{self.recorded}笔tick")
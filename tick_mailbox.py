@@ -0,0 +1,165 @@
+import collections
+import logging
+import threading
+import time
+
+
+class TickMailbox:
+    """
+    行情信箱
+
+    行情回调线程只把每只股票的最新行情放进信箱就返回，策略线程逐只股票取出处理。
+    策略处理或下单阻塞期间同一股票到达的多笔行情只保留最新一笔（中间行情被合并），
+    避免回调堆积后策略在过时的价格上做决策；取出时行情在信箱中停留超过max_age秒则跳过。
+
+    Attributes:
+        name (str): 策略线程名称
+        max_age (float): 行情允许的最长等待时间（秒），0表示不检查
+        report_interval (float): 统计日志的输出间隔（秒）
+    """
+
+    def __init__(self, handler, name='TickWorker', max_age=3.0, report_interval=60, logger=None):
+        """
+        初始化信箱
+
+        Args:
+            handler: 行情处理函数，参数为 ({股票代码: 行情}, 收到行情的perf_counter时间)
+            name (str): 策略线程名称
+            max_age (float): 行情允许的最长等待时间（秒），0表示不检查
+            report_interval (float): 统计日志的输出间隔（秒），0表示不输出
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.handler = handler
+        self.name = name
+        self.max_age = max_age
+        self.report_interval = report_interval
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self._slots = {}                        # 股票代码 -> (行情, 收到时间)
+        self._ready = collections.deque()       # 有新行情的股票代码，按到达顺序
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._reset_stats()
+
+    def _reset_stats(self):
+        """清空统计信息"""
+        self.received = 0       # 收到的行情数
+        self.processed = 0      # 交给策略处理的行情数
+        self.coalesced = 0      # 被后续行情覆盖的行情数
+        self.stale = 0          # 等待超过max_age被跳过的行情数
+        self.errors = 0         # 处理出错的行情数
+        self.max_age_seen = 0.0  # 最长等待时间（秒）
+        self._last_report = time.monotonic()
+
+    def start(self):
+        """启动策略线程（重复调用无副作用）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        停止策略线程，未处理的行情直接丢弃
+
+        Args:
+            timeout (float): 等待线程结束的最长时间（秒）
+        """
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopped = True
+            self._slots.clear()
+            self._ready.clear()
+            self._cond.notify()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def put(self, stock_code, tick):
+        """
+        放入一只股票的最新行情（在行情回调线程中调用，不阻塞）
+
+        Args:
+            stock_code (str): 股票代码
+            tick: 行情数据
+        """
+        received = time.perf_counter()
+        with self._cond:
+            self.received += 1
+            if stock_code in self._slots:
+                self.coalesced += 1
+            else:
+                self._ready.append(stock_code)
+            self._slots[stock_code] = (tick, received)
+            self._cond.notify()
+
+    def put_all(self, data):
+        """
+        放入按股票代码组织的行情推送
+
+        Args:
+            data (dict): 股票代码 -> 行情
+        """
+        for stock_code, tick in data.items():
+            self.put(stock_code, tick)
+
+    @property
+    def depth(self):
+        """等待处理的股票数"""
+        return len(self._ready)
+
+    def stats(self):
+        """
+        获取统计信息
+
+        Returns:
+            dict: 收到、处理、合并、过期跳过的行情数和最长等待时间（毫秒）
+        """
+        return {
+            'depth': self.depth,
+            'received': self.received,
+            'processed': self.processed,
+            'coalesced': self.coalesced,
+            'stale': self.stale,
+            'errors': self.errors,
+            'max_age_ms': self.max_age_seen * 1000,
+        }
+
+    def log_stats(self):
+        """输出统计日志"""
+        s = self.stats()
+        self.logger.info(
+            f"{self.name}统计: 收到行情={s['received']}, 已处理={s['processed']}, 合并={s['coalesced']}, "
+            f"过期跳过={s['stale']}, 出错={s['errors']}, 最长等待={s['max_age_ms']:.1f}ms"
+        )
+
+    def _run(self):
+        """策略线程主循环"""
+        while True:
+            with self._cond:
+                while not self._ready and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    break
+                stock_code = self._ready.popleft()
+                tick, received = self._slots.pop(stock_code)
+
+            now = time.perf_counter()
+            age = now - received
+            if age > self.max_age_seen:
+                self.max_age_seen = age
+            if self.max_age and age > self.max_age:
+                self.stale += 1
+                self.logger.warning(f"股票代码：{stock_code}，行情等待{age:.1f}秒已过时，跳过本次决策")
+            else:
+                try:
+                    self.handler({stock_code: tick}, received)
+                except Exception as e:
+                    self.errors += 1
+                    self.logger.error(f"股票代码：{stock_code}，处理行情出错: {str(e)}")
+                self.processed += 1
+
+            if self.report_interval and time.monotonic() - self._last_report >= self.report_interval:
+                self._last_report = time.monotonic()
+                self.log_stats()
@@ -0,0 +1,231 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+# 连续竞价时段（北京时间），时段外不检查断流
+WATCH_SESSIONS = (('09:30', '11:30'), ('13:00', '15:00'))
+
+# 断流后的处理
+ACTION_RESUBSCRIBE = 'resubscribe'  # 重新订阅行情
+ACTION_RESTART = 'restart'          # 重启交易线程
+
+
+def _parse_clock(clock):
+    """把'HH:MM'转换为当日分钟序号"""
+    hour, minute = clock.split(':')
+    return int(hour) * 60 + int(minute)
+
+
+class _SymbolWatch:
+    """单只股票的行情到达记录"""
+
+    __slots__ = ('last_tick', 'interval', 'gap_start', 'level', 'next_action',
+                 'gaps', 'gap_seconds', 'max_gap', 'resubscribes', 'restarts')
+
+    def __init__(self, now, interval):
+        self.last_tick = now        # 最近一次收到行情的monotonic时间
+        self.interval = interval    # 平均行情间隔（秒）
+        self.gap_start = None       # 本次断流开始时间，None表示正常
+        self.level = 0              # 本次断流已执行的处理级别
+        self.next_action = 0.0      # 下一次处理的最早时间
+        self.gaps = 0
+        self.gap_seconds = 0.0
+        self.max_gap = 0.0
+        self.resubscribes = 0
+        self.restarts = 0
+
+
+class TickWatchdog:
+    """
+    按股票检测行情断流
+
+    行情回调线程每收到一笔行情调用feed()记录到达时间，并按指数平均估计该股票的正常行情间隔；
+    界面定时调用check()，连续竞价时段内某只股票超过 gap_factor 倍正常间隔（不少于min_gap秒）
+    没有行情即判定断流，先重新订阅行情，仍无行情再重启交易线程，之后等待cooldown秒再重新尝试。
+    只有全部股票都断流时才重启交易线程；其他股票行情正常时断流的股票多半是停牌或成交清淡，
+    只在每个cooldown重新订阅一次，不因一只股票打断所有股票的交易。
+    是否交易日和交易时段每天只计算一次，展开成按分钟的查找表。
+
+    Attributes:
+        gap_factor (float): 断流判定为正常行情间隔的倍数
+        min_gap (float): 断流判定的最短时间（秒）
+        cooldown (float): 重启交易线程后再次处理的间隔（秒）
+    """
+
+    def __init__(self, gap_factor=5, min_gap=10, expected_interval=3.0, cooldown=300, logger=None):
+        """
+        初始化断流检测
+
+        Args:
+            gap_factor (float): 断流判定为正常行情间隔的倍数
+            min_gap (float): 断流判定的最短时间（秒）
+            expected_interval (float): 尚无统计时假定的行情间隔（秒）
+            cooldown (float): 重启交易线程后再次处理的间隔（秒）
+            logger: 日志记录器，如果为None则使用默认logger
+        """
+        self.gap_factor = gap_factor
+        self.min_gap = min_gap
+        self.expected_interval = expected_interval
+        self.cooldown = cooldown
+        self.logger = logger or logging.getLogger('LiveTrade')
+        self._symbols = {}
+        self._lock = threading.Lock()
+        self._calendar_date = None
+        self._in_session = [False] * 1440
+
+    def _refresh_calendar(self, now):
+        """交易日变化时重新生成当日按分钟的交易时段表"""
+        today = now.date()
+        if today == self._calendar_date:
+            return
+        from chncal import is_tradeday  # 导入较慢，首次检查时才导入，不拖慢启动
+        self._calendar_date = today
+        table = [False] * 1440
+        if is_tradeday(today):
+            for start, end in WATCH_SESSIONS:
+                for minute in range(_parse_clock(start), _parse_clock(end)):
+                    table[minute] = True
+        self._in_session = table
+
+    def in_session(self, now=None):
+        """
+        当前是否处于需要检查断流的交易时段
+
+        Args:
+            now (datetime): 当前时间，None表示系统时间
+        Returns:
+            bool: 是否处于交易时段
+        """
+        now = now or datetime.now()
+        self._refresh_calendar(now)
+        return self._in_session[now.hour * 60 + now.minute]
+
+    def feed(self, stock_code):
+        """
+        记录一只股票收到行情（在行情回调线程中调用）
+
+        Args:
+            stock_code (str): 股票代码
+        """
+        now = time.monotonic()
+        with self._lock:
+            watch = self._symbols.get(stock_code)
+            if watch is None:
+                self._symbols[stock_code] = _SymbolWatch(now, self.expected_interval)
+                return
+            elapsed = now - watch.last_tick
+            watch.last_tick = now
+            if watch.gap_start is not None:
+                duration = elapsed
+                watch.gap_start = None
+                watch.level = 0
+                watch.next_action = 0.0
+                watch.gap_seconds += duration
+                if duration > watch.max_gap:
+                    watch.max_gap = duration
+                self.logger.info(f"股票代码：{stock_code}，行情恢复，断流约{duration:.1f}秒")
+            else:
+                watch.interval += 0.1 * (min(elapsed, 60.0) - watch.interval)
+
+    def feed_all(self, data):
+        """
+        记录按股票代码组织的行情推送
+
+        Args:
+            data (dict): 股票代码 -> 行情
+        """
+        for stock_code in data:
+            self.feed(stock_code)
+
+    def _threshold(self, watch):
+        return max(self.min_gap, self.gap_factor * watch.interval)
+
+    def check(self, stock_codes, now=None):
+        """
+        检查断流，返回需要执行的处理
+
+        Args:
+            stock_codes (list): 正在交易、应当有行情的股票代码
+            now (datetime): 当前时间，None表示系统时间
+        Returns:
+            list: [(股票代码, 处理), ...]，处理为ACTION_RESUBSCRIBE或ACTION_RESTART
+        """
+        mono = time.monotonic()
+        session = self.in_session(now)
+        actions = []
+        with self._lock:
+            all_silent = all(
+                stock_code in self._symbols
+                and mono - self._symbols[stock_code].last_tick >= self._threshold(self._symbols[stock_code])
+                for stock_code in stock_codes
+            )
+            for stock_code in stock_codes:
+                watch = self._symbols.get(stock_code)
+                if watch is None:
+                    watch = self._symbols[stock_code] = _SymbolWatch(mono, self.expected_interval)
+                if not session:
+                    # 非交易时段（含午休）不计断流，交易时段开始时从头计时
+                    watch.last_tick = mono
+                    watch.gap_start = None
+                    watch.level = 0
+                    continue
+                threshold = self._threshold(watch)
+                silent = mono - watch.last_tick
+                if silent < threshold or mono < watch.next_action:
+                    continue
+                if watch.gap_start is None:
+                    watch.gap_start = mono
+                    watch.gaps += 1
+                if watch.level == 0:
+                    watch.level = 1
+                    watch.resubscribes += 1
+                    watch.next_action = mono + threshold
+                    actions.append((stock_code, ACTION_RESUBSCRIBE))
+                    self.logger.warning(f"股票代码：{stock_code}，{silent:.1f}秒未收到行情（正常间隔约{watch.interval:.1f}秒），重新订阅行情")
+                elif all_silent:
+                    watch.level = 0
+                    watch.restarts += 1
+                    watch.next_action = mono + self.cooldown
+                    actions.append((stock_code, ACTION_RESTART))
+                    self.logger.warning(f"股票代码：{stock_code}，重新订阅后{silent:.1f}秒仍未收到行情，重启交易线程")
+                else:
+                    watch.resubscribes += 1
+                    watch.next_action = mono + self.cooldown
+                    actions.append((stock_code, ACTION_RESUBSCRIBE))
+                    self.logger.warning(
+                        f"股票代码：{stock_code}，重新订阅后{silent:.1f}秒仍未收到行情，其他股票行情正常（可能停牌），"
+                        f"不重启交易线程，{self.cooldown}秒后再重新订阅"
+                    )
+        return actions
+
+    def forget(self, stock_code):
+        """
+        停止检查一只股票
+
+        Args:
+            stock_code (str): 股票代码
+        """
+        with self._lock:
+            self._symbols.pop(stock_code, None)
+
+    def rows(self):
+        """
+        获取断流统计
+
+        Returns:
+            list: [(股票代码, 正常间隔秒数, 断流次数, 断流总秒数, 最长断流秒数, 重新订阅次数, 重启次数), ...]
+        """
+        with self._lock:
+            return [
+                (code, w.interval, w.gaps, w.gap_seconds, w.max_gap, w.resubscribes, w.restarts)
+                for code, w in sorted(self._symbols.items())
+            ]
+
+    def log_stats(self):
+        """输出断流统计日志"""
+        for code, interval, gaps, gap_seconds, max_gap, resubscribes, restarts in self.rows():
+            self.logger.info(
+                f"股票代码：{code}，行情间隔约{interval:.1f}秒，断流{gaps}次共{gap_seconds:.1f}秒，"
+                f"最长{max_gap:.1f}秒，重新订阅{resubscribes}次，重启交易线程{restarts}次"
+            )
@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
 import logging
+from datetime import datetime, timedelta
+from instrument_registry import get_registry
+from session_schedule import DAY_MS, BEIJING_OFFSET_MS
 
 class TradeEngine(ABC):
     """
@@ -38,6 +41,12 @@ class TradeEngine(ABC):
         self.market_value = 0.0
         self.total_asset = 0.0
         
+        # 交易日相关（由引擎在每个交易日的第一条行情前切换）
+        self.trading_date = None    # 当前交易日，格式YYYYMMDD
+        self.day_index = None       # 当前交易日的日序号
+        self._day_start_ms = 0      # 当前交易日零点（北京时间）的毫秒时间戳
+        self._time_prefix = ''      # 当前交易日的时间字符串前缀
+        
         # 日志设置
         self.logger = logging.getLogger(self.__class__.__name__)
         
@@ -48,6 +57,42 @@ class TradeEngine(ABC):
     def on_trade(self, trade):
         """处理成交回报"""
         pass
+
+    def begin_trading_day(self, day_index):
+        """
+        切换到新的交易日，预先生成当日的日期字符串
+        
+        Args:
+            day_index (int): 日序号（见session_schedule.day_index）
+        """
+        day = datetime(1970, 1, 1) + timedelta(days=day_index)
+        self.day_index = day_index
+        self._day_start_ms = day_index * DAY_MS - BEIJING_OFFSET_MS
+        self.trading_date = day.strftime('%Y%m%d')
+        self._time_prefix = day.strftime('%Y-%m-%d ')
+
+    def format_tick_time(self, time_ms):
+        """
+        把当日的tick时间格式化为'YYYY-MM-DD HH:MM:SS'（只做整数运算，不构造datetime）
+        
+        Args:
+            time_ms: tick时间（毫秒时间戳）
+        Returns:
+            str: 时间字符串
+        """
+        seconds = int(time_ms - self._day_start_ms) // 1000
+        return f"{self._time_prefix}{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+    def get_instrument(self, stock_code):
+        """
+        获取证券元数据（最小报价单位、价格精度、T+0、费用类型、涨跌幅限制）
+        
+        Args:
+            stock_code (str): 股票代码
+        Returns:
+            Instrument: 证券元数据
+        """
+        return get_registry().get(stock_code)
         
     @abstractmethod
     def buy(self, stock_code, price, volume, datetime):
@@ -125,6 +170,15 @@ class TradeEngine(ABC):
         self.strategy = strategy
         self.logger.info(f"设置策略: {strategy.__class__.__name__}")
 
+    def on_strategy_state_changed(self, strategy):
+        """
+        策略状态变化的回调（实盘引擎保存状态快照，默认不处理）
+        
+        Args:
+            strategy: 状态变化的策略实例
+        """
+        pass
+        
     def setup_logger(self):
         """设置日志器"""
         logger = logging.getLogger('TradeEngine')
@@ -275,16 +329,12 @@ class TradeEngine(ABC):
             return None
         
         # 确保符合最小报价单位
-        if base_slippage == 0.001:
-            ret = round(round(price / 0.001) * 0.001, 3)
-        else:
-            ret = round(round(price / 0.01) * 0.01, 2)
+        instrument = self.get_instrument(stock_code)
+        ret = round(round(price / instrument.tick_size) * instrument.tick_size, instrument.precision)
 
         
         direction_str = "买入" if direction == 'buy' else "卖出"
-        if stock_code.startswith(('1', '5')):
-            self.logger.info(f"股票代码：{stock_code}，{direction_str}，最新买价：{best_bid:.3f}，最新卖价：{best_ask:.3f}，智能定价：{ret:.3f}")        
-        else:
-            self.logger.info(f"股票代码：{stock_code}，{direction_str}，最新买价：{best_bid:.2f}，最新卖价：{best_ask:.2f}，智能定价：{ret:.2f}")        
+        p = instrument.precision
+        self.logger.info(f"股票代码：{stock_code}，{direction_str}，最新买价：{best_bid:.{p}f}，最新卖价：{best_ask:.{p}f}，智能定价：{ret:.{p}f}")        
         
         return ret